@@ -0,0 +1,276 @@
+"""
+Front door for multi-worker mode.
+
+One server process handles every websocket on one event loop, so one CPU core
+caps the number of sessions. The front door starts N worker processes (each a
+normal ``api/main.py`` server on 127.0.0.1:base_port + i) and proxies client
+connections to them at the TCP level, so websockets and plain HTTP pass
+through unchanged.
+
+Routing is by session affinity: sessions live in the memory of the worker that
+created them, and that worker records them in the shared session index
+(ai_whisperer.services.cluster.shared_state). A connection whose request
+carries ``?sessionId=...`` goes to the worker that owns the session; any other
+connection goes to the live worker with the fewest open connections. Workers
+share the mailbox and channel history through the same SQLite database.
+
+Crashed workers are restarted after ``restart_delay``; their sessions are
+dropped from the index because they were lost with the process.
+
+Key Components:
+- WorkerProcess: One supervised worker
+- FrontDoor: Worker supervision and the affinity-routing TCP proxy
+- main(): Command line entry point
+
+Usage:
+    python api/frontdoor.py --workers 4 --port 8000 --config config/main.yaml
+    # Arguments after "--" are passed to every worker
+    python api/frontdoor.py --workers 4 -- --debbie-monitor
+
+Configuration (config/main.yaml):
+    cluster:
+      workers: 4
+      base_port: 8100
+      shared_state_path: .mindswarm/shared_state.db
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+# Ensure we're using modules from the current worktree directory
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from ai_whisperer.services.cluster.shared_state import (
+    SHARED_STATE_ENV,
+    WORKER_ID_ENV,
+    ClusterConfig,
+    SharedStateStore,
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = Path(__file__).with_name("main.py")
+MAX_REQUEST_HEAD = 64 * 1024  # Bytes of request line and headers read to route a connection
+PIPE_CHUNK = 64 * 1024
+
+
+class WorkerProcess:
+    """One worker server process, restarted by the front door when it exits."""
+
+    def __init__(self, worker_id: str, port: int, argv: List[str], env: Dict[str, str]):
+        self.worker_id = worker_id
+        self.port = port
+        self.argv = argv
+        self.env = env
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.ready = False  # Accepting connections
+        self.connections = 0  # Open proxied connections
+        self.restarts = 0
+
+    async def start(self, timeout: float) -> None:
+        self.ready = False
+        self.process = await asyncio.create_subprocess_exec(*self.argv, env=self.env)
+        logger.info(f"Started worker {self.worker_id} (pid {self.process.pid}) on port {self.port}")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.returncode is not None:
+                raise RuntimeError(f"Worker {self.worker_id} exited with code {self.process.returncode} during startup")
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", self.port)
+            except OSError:
+                await asyncio.sleep(0.2)
+                continue
+            writer.close()
+            self.ready = True
+            return
+        raise RuntimeError(f"Worker {self.worker_id} did not accept connections within {timeout}s")
+
+    async def stop(self) -> None:
+        self.ready = False
+        if self.process is None or self.process.returncode is not None:
+            return
+        self.process.terminate()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=10)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+
+
+class FrontDoor:
+    """Supervises the workers and routes client connections to them."""
+
+    def __init__(self, config: ClusterConfig, config_path: str, worker_args: Optional[List[str]] = None):
+        self.config = config
+        self.store = SharedStateStore(config.shared_state_path, config.busy_timeout)
+        self.workers: Dict[str, WorkerProcess] = {}
+        self._stopping = False
+        self._monitors: List[asyncio.Task] = []
+        for index in range(config.workers):
+            worker_id = f"w{index}"
+            port = config.base_port + index
+            argv = [sys.executable, str(WORKER_SCRIPT), "--host", "127.0.0.1", "--port", str(port),
+                    "--config", config_path, *(worker_args or [])]
+            env = dict(os.environ)
+            env[WORKER_ID_ENV] = worker_id
+            env[SHARED_STATE_ENV] = str(Path(config.shared_state_path).resolve())
+            self.workers[worker_id] = WorkerProcess(worker_id, port, argv, env)
+
+    async def start_workers(self) -> None:
+        # Sessions of a previous run died with its workers
+        for worker_id in await self.store.run(self.store.session_counts):
+            await self.store.run(self.store.drop_worker_sessions, worker_id)
+        await asyncio.gather(*(worker.start(self.config.startup_timeout) for worker in self.workers.values()))
+        self._monitors = [asyncio.create_task(self._supervise(worker)) for worker in self.workers.values()]
+
+    async def _supervise(self, worker: WorkerProcess) -> None:
+        while not self._stopping:
+            code = await worker.process.wait()
+            worker.ready = False
+            if self._stopping:
+                return
+            dropped = await self.store.run(self.store.drop_worker_sessions, worker.worker_id)
+            logger.error(f"Worker {worker.worker_id} exited with code {code}; dropped {dropped} sessions, "
+                         f"restarting in {self.config.restart_delay}s")
+            await asyncio.sleep(self.config.restart_delay)
+            try:
+                worker.restarts += 1
+                await worker.start(self.config.startup_timeout)
+            except Exception as e:
+                logger.error(f"Failed to restart worker {worker.worker_id}: {e}")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        for monitor in self._monitors:
+            monitor.cancel()
+        await asyncio.gather(*(worker.stop() for worker in self.workers.values()), return_exceptions=True)
+
+    async def route(self, target: str) -> List[WorkerProcess]:
+        """Live workers to try for a request target, best first."""
+        live = [worker for worker in self.workers.values() if worker.ready]
+        live.sort(key=lambda worker: worker.connections)
+        session_ids = parse_qs(urlsplit(target).query).get("sessionId")
+        if session_ids:
+            owner = self.workers.get(await self.store.run(self.store.session_worker, session_ids[0]) or "")
+            if owner is not None and owner.ready:
+                live.remove(owner)
+                live.insert(0, owner)
+        return live
+
+    async def handle_client(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_writer.close()
+            return
+        request_line, _, headers = head.partition(b"\r\n")
+        parts = request_line.split(b" ")
+        target = parts[1].decode("latin-1") if len(parts) == 3 else "/"
+        peer = client_writer.get_extra_info("peername")
+        if peer:
+            request_line += f"\r\nX-Forwarded-For: {peer[0]}".encode("latin-1")
+        head = request_line + b"\r\n" + headers
+
+        for worker in await self.route(target):
+            try:
+                worker_reader, worker_writer = await asyncio.open_connection("127.0.0.1", worker.port)
+            except OSError:
+                continue
+            worker.connections += 1
+            try:
+                worker_writer.write(head)
+                await asyncio.gather(_pipe(client_reader, worker_writer), _pipe(worker_reader, client_writer))
+            finally:
+                worker.connections -= 1
+                worker_writer.close()
+                client_writer.close()
+            return
+
+        client_writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        try:
+            await client_writer.drain()
+        except ConnectionError:
+            pass
+        client_writer.close()
+
+
+async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Copy bytes until EOF, then half-close the other side."""
+    try:
+        while True:
+            data = await reader.read(PIPE_CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except (ConnectionError, OSError):
+        writer.close()
+
+
+async def serve(front_door: FrontDoor, host: str, port: int) -> None:
+    await front_door.start_workers()
+    server = await asyncio.start_server(front_door.handle_client, host, port, limit=MAX_REQUEST_HEAD)
+    logger.info(f"Front door listening on {host}:{port} with {len(front_door.workers)} workers")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        await front_door.stop()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    worker_args: List[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, worker_args = argv[:split], argv[split + 1:]
+
+    parser = argparse.ArgumentParser(description="AIWhisperer multi-worker front door")
+    parser.add_argument("--config", default=os.environ.get("AIWHISPERER_CONFIG", "config/main.yaml"),
+                        help="Configuration file path (also passed to the workers)")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind to")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind to")
+    parser.add_argument("--workers", type=int, help="Number of worker processes (default: cluster.workers)")
+    parser.add_argument("--base-port", type=int, help="Port of the first worker (default: cluster.base_port)")
+    parser.add_argument("--shared-state", help="Shared state database (default: cluster.shared_state_path)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    try:
+        from ai_whisperer.core.config import load_config
+        app_config = load_config(args.config)
+    except Exception as e:
+        logger.warning(f"Failed to load configuration, using cluster defaults: {e}")
+        app_config = {}
+    config = ClusterConfig.from_dict(app_config.get("cluster"))
+    if args.workers is not None:
+        config.workers = args.workers
+    if args.base_port is not None:
+        config.base_port = args.base_port
+    if args.shared_state:
+        config.shared_state_path = args.shared_state
+
+    asyncio.run(serve(FrontDoor(config, args.config, worker_args), args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -74,6 +74,12 @@ import re
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from ai_whisperer.core.config import load_config
+from ai_whisperer.services.execution.outbound_queue import (
+    OutboundQueue,
+    all_outbound_queues,
+    attach_outbound_queue,
+    get_outbound_queue,
+)
 from .stateless_session_manager import StatelessSessionManager
 from .message_models import (
     StartSessionRequest, StartSessionResponse, SendUserMessageRequest, SendUserMessageResponse,
@@ -261,6 +267,118 @@ def initialize_server(cli_args=None):
         logging.error(f"Failed to load configuration: {e}")
         app_config = {}
 
+    # Open the state shared with the other workers when started by the front door
+    try:
+        from ai_whisperer.services.cluster.shared_state import configure_shared_state
+        configure_shared_state(settings=app_config.get("cluster"))
+    except Exception as e:
+        logger.error(f"Failed to open shared worker state: {e}")
+
+    # Configure the shared HTTP client pool used by all AI services
+    try:
+        from ai_whisperer.services.ai.http_pool import configure_http_pool
+        configure_http_pool(app_config.get("openrouter", {}).get("http_pool"))
+    except Exception as e:
+        logger.error(f"Failed to configure HTTP client pool: {e}")
+
+    # Point AI services at a different OpenRouter-compatible endpoint if configured
+    try:
+        from ai_whisperer.services.ai.openrouter import configure_base_url
+        configure_base_url(app_config.get("openrouter", {}).get("base_url"))
+    except Exception as e:
+        logger.error(f"Failed to configure OpenRouter base URL: {e}")
+
+    # Configure rate limits and priorities for AI requests
+    try:
+        from ai_whisperer.services.ai.request_scheduler import configure_request_scheduler
+        configure_request_scheduler(app_config.get("openrouter", {}).get("scheduler"))
+    except Exception as e:
+        logger.error(f"Failed to configure AI request scheduler: {e}")
+
+    # Configure hedged requests to fallback models on slow first tokens
+    try:
+        from ai_whisperer.services.ai.hedging import configure_hedging
+        configure_hedging(app_config.get("openrouter", {}).get("hedging"))
+    except Exception as e:
+        logger.error(f"Failed to configure request hedging: {e}")
+
+    # Configure the opt-in completion cache for deterministic requests
+    try:
+        from ai_whisperer.services.ai.completion_cache import configure_completion_cache
+        configure_completion_cache(app_config.get("openrouter", {}).get("completion_cache"))
+    except Exception as e:
+        logger.error(f"Failed to configure completion cache: {e}")
+
+    # Configure the thread pool and timeouts for tool calls
+    try:
+        from ai_whisperer.services.execution.tool_executor import configure_tool_executor
+        configure_tool_executor(app_config.get("tool_execution"))
+    except Exception as e:
+        logger.error(f"Failed to configure tool executor: {e}")
+
+    # Configure the per-session cache of read-only tool results
+    try:
+        from ai_whisperer.services.execution.tool_result_cache import configure_tool_result_cache
+        configure_tool_result_cache(app_config.get("tool_result_cache"))
+    except Exception as e:
+        logger.error(f"Failed to configure tool result cache: {e}")
+
+    # Configure how streamed deltas are batched before reaching websocket clients
+    try:
+        from ai_whisperer.services.execution.stream_buffer import configure_stream_coalescing
+        configure_stream_coalescing(app_config.get("stream_coalescing"))
+    except Exception as e:
+        logger.error(f"Failed to configure stream coalescing: {e}")
+
+    # Configure how conversations are fitted into the model's context window
+    try:
+        from ai_whisperer.context.context_budget import configure_context_budget
+        configure_context_budget(app_config.get("context_budget"))
+    except Exception as e:
+        logger.error(f"Failed to configure context budget: {e}")
+
+    # Configure per-turn latency metrics
+    try:
+        from ai_whisperer.services.execution.turn_metrics import configure_turn_metrics
+        configure_turn_metrics(app_config.get("turn_metrics"))
+    except Exception as e:
+        logger.error(f"Failed to configure turn metrics: {e}")
+
+    # Configure where and how often the session index journal is written
+    try:
+        from ai_whisperer.services.agents.session_journal import configure_session_journal
+        configure_session_journal(app_config.get("session_journal"))
+    except Exception as e:
+        logger.error(f"Failed to configure session journal: {e}")
+
+    # Configure hibernation of idle sessions
+    try:
+        from ai_whisperer.services.agents.hibernation import configure_session_hibernation
+        configure_session_hibernation(app_config.get("session_hibernation"))
+    except Exception as e:
+        logger.error(f"Failed to configure session hibernation: {e}")
+
+    # Configure the warm pool of agent templates
+    try:
+        from ai_whisperer.services.agents.agent_pool import configure_agent_pool
+        configure_agent_pool(app_config.get("agent_pool"))
+    except Exception as e:
+        logger.error(f"Failed to configure agent pool: {e}")
+
+    # Configure the watermarks of per-connection outbound websocket queues
+    try:
+        from ai_whisperer.services.execution.outbound_queue import configure_outbound_queue
+        configure_outbound_queue(app_config.get("outbound_queue"))
+    except Exception as e:
+        logger.error(f"Failed to configure outbound queues: {e}")
+
+    # Configure the framing options websocket clients may negotiate
+    try:
+        from ai_whisperer.services.execution.ws_transport import configure_ws_transport
+        configure_ws_transport(app_config.get("ws_transport"))
+    except Exception as e:
+        logger.error(f"Failed to configure websocket transport: {e}")
+
     # Initialize Debbie observer if monitoring is enabled
     debbie_observer = None
     if cli_args.debbie_monitor:
@@ -441,6 +559,10 @@ async def send_user_message_handler(params, websocket=None):
         session = session_manager.get_session(model.sessionId)
     logging.info(f"[send_user_message_handler] Found session: {session.session_id if session else 'None'}, active agent: {session.active_agent if session else 'None'}")
     if not session:
+        owner = await session_manager.get_session_worker(model.sessionId)
+        if owner is not None:
+            raise ValueError(f"Session {model.sessionId} is served by worker {owner}: "
+                             f"reconnect to /ws?sessionId={model.sessionId}")
         raise ValueError(f"Invalid session: {getattr(model, 'sessionId', None)}")
 
     try:
@@ -614,7 +736,11 @@ async def debbie_send_alert_notification(websocket, alert_data):
     }
     
     try:
-        await websocket.send_text(json.dumps(notification))
+        queue = get_outbound_queue(websocket)
+        if queue is not None:
+            queue.send(notification)
+        else:
+            await websocket.send_text(json.dumps(notification))
         logger.debug(f"Sent Debbie alert notification: {alert_data['pattern']}")
     except Exception as e:
         logger.error(f"Failed to send Debbie alert notification: {e}")
@@ -636,7 +762,7 @@ async def channel_get_history_handler(params, websocket=None):
         raise ValueError(f"Session {request.sessionId} not found")
     
     # Get history from channel integration
-    history = session.channel_integration.get_channel_history(
+    history = await session.channel_integration.aget_channel_history(
         session_id=request.sessionId,
         channels=request.channels,
         limit=request.limit,
@@ -686,9 +812,93 @@ async def channel_get_stats_handler(params, websocket=None):
     if not session:
         raise ValueError(f"Session {session_id} not found")
     
-    stats = session.channel_integration.get_session_stats(session_id)
+    stats = await session.channel_integration.aget_session_stats(session_id)
     return stats
 
+async def ai_stats_handler(params, websocket=None):
+    """Get AI service transport, cache and tool execution statistics"""
+    from ai_whisperer.services.ai.completion_cache import get_completion_cache
+    from ai_whisperer.services.ai.hedging import get_hedging_policy
+    from ai_whisperer.services.ai.http_pool import get_http_pool
+    from ai_whisperer.services.ai.request_scheduler import get_request_scheduler
+    from ai_whisperer.services.execution.tool_executor import get_tool_executor
+    from ai_whisperer.context.context_budget import get_context_budget
+    from ai_whisperer.services.agents.agent_pool import get_agent_pool
+
+    return {
+        "http_pool": get_http_pool().get_stats(),
+        "completion_cache": get_completion_cache().get_stats(),
+        "scheduler": get_request_scheduler().get_stats(),
+        "hedging": get_hedging_policy().get_stats(),
+        "tools": get_tool_executor().get_stats(),
+        "context_budget": get_context_budget().get_stats(),
+        "agent_pool": get_agent_pool().get_stats(),
+    }
+
+
+async def ai_latency_handler(params, websocket=None):
+    """Get per-turn latency histograms by model and agent, and recent turn breakdowns"""
+    from ai_whisperer.services.execution.turn_metrics import get_turn_metrics
+
+    params = params or {}
+    return get_turn_metrics().get_stats(
+        model=params.get("model"),
+        agent=params.get("agent"),
+        session_id=params.get("sessionId"),
+        recent=int(params.get("recent", 10)),
+    )
+
+
+async def connection_stats_handler(params, websocket=None):
+    """Get the outbound queue depth and send lag of this connection (or of all connections)"""
+    queue = get_outbound_queue(websocket)
+    params = params or {}
+    result = {"connection": queue.get_stats() if queue is not None else None}
+    if params.get("all"):
+        result["connections"] = all_outbound_queues()
+    return result
+
+
+async def server_stats_handler(params, websocket=None):
+    """Get resident memory, event loop lag and session counts of this server process"""
+    from ai_whisperer.services.agents.hibernation import process_rss_mb
+    from ai_whisperer.services.execution.loop_monitor import get_loop_monitor
+
+    params = params or {}
+    monitor = get_loop_monitor()
+    result = {
+        "rss_mb": round(process_rss_mb() or 0.0, 1),
+        "loop_lag_ms": monitor.get_stats(),
+        "sessions": session_manager.get_active_sessions_count(),
+        "hibernated": len(session_manager.hibernated),
+        "connections": len(all_outbound_queues()),
+    }
+    if params.get("reset"):
+        monitor.reset()
+    return result
+
+
+async def transport_negotiate_handler(params, websocket=None):
+    """Negotiate compact framing (msgpack, delta frames) for the frames sent after this response"""
+    from ai_whisperer.services.execution.ws_transport import (
+        FrameEncoder,
+        TransportOptions,
+        get_ws_transport_config,
+        negotiate_transport,
+    )
+
+    queue = get_outbound_queue(websocket)
+    if queue is None:
+        return {"error": "Transport options need a websocket connection"}
+    options = negotiate_transport(params)
+    # The response is queued after the encoder is set, so it already uses the new framing
+    queue.set_encoder(FrameEncoder(options) if options != TransportOptions() else None)
+    extensions = websocket.headers.get("sec-websocket-extensions", "") if hasattr(websocket, "headers") else ""
+    return {
+        **options.to_dict(),
+        "permessageDeflate": get_ws_transport_config().permessage_deflate and "permessage-deflate" in extensions,
+    }
+
 
 # Handler registry
 from ai_whisperer.interfaces.cli.commands.registry import CommandRegistry
@@ -734,6 +944,12 @@ HANDLERS = {
     "channel.history": channel_get_history_handler,
     "channel.updateVisibility": channel_update_visibility_handler,
     "channel.stats": channel_get_stats_handler,
+    # AI service monitoring
+    "ai.stats": ai_stats_handler,
+    "ai.latency": ai_latency_handler,
+    "connection.stats": connection_stats_handler,
+    "server.stats": server_stats_handler,
+    "transport.negotiate": transport_negotiate_handler,
     # Project management handlers
     **PROJECT_HANDLERS,
     # Plan management handlers
@@ -839,6 +1055,15 @@ async def handle_websocket_message(websocket, data):
             "error": {"code": -32600, "message": "Invalid Request"}
         }
     
+    # Bring the session back from hibernation before a handler looks it up
+    if session_manager is not None:
+        params = msg.get("params")
+        try:
+            await session_manager.resume_session(
+                websocket, params.get("sessionId") if isinstance(params, dict) else None)
+        except Exception as e:
+            logging.error(f"[handle_websocket_message] Failed to resume session: {e}")
+    
     if "id" in msg:
         # Request - process and return response
         try:
@@ -920,11 +1145,60 @@ def validate_ai_response(response_data):
     return response_data
 
 
+async def _send_websocket_response(websocket: WebSocket, response) -> None:
+    """Validate and send a JSON-RPC response (nothing for notifications)."""
+    if response:  # Only send response for requests (not notifications)
+        # Validate the response before sending to ensure no raw JSON structures
+        validated_response = validate_ai_response(response)
+        queue = get_outbound_queue(websocket)
+        if queue is not None:
+            # Queued behind the notifications the request produced, so they arrive first
+            if not queue.send(validated_response):
+                raise RuntimeError("Websocket closed: outbound queue is closed")
+            logging.debug(f"[websocket_endpoint] Queued response for request {validated_response.get('id')}")
+            return
+        response_text = json.dumps(validated_response)
+        logging.debug(f"[websocket_endpoint] Sending response: {response_text}")
+        await websocket.send_text(response_text)
+        logging.debug("[websocket_endpoint] Response sent successfully")
+    else:
+        logging.debug("[websocket_endpoint] No response to send (notification)")
+
+
+async def _handle_turn_request(websocket: WebSocket, data: str, request_id) -> None:
+    """
+    Handle a sendUserMessage request in its own task, so the connection keeps
+    reading while the turn runs: a new message can supersede it and a closed
+    socket cancels it.
+    """
+    try:
+        response = await handle_websocket_message(websocket, data)
+    except asyncio.CancelledError:
+        logging.info(f"[websocket_endpoint] Request {request_id} cancelled")
+        if request_id is None:
+            return
+        response = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {"code": -32800, "message": "Request cancelled"}
+        }
+    try:
+        await _send_websocket_response(websocket, response)
+    except Exception as e:
+        logging.debug(f"[websocket_endpoint] Could not send response for request {request_id}: {e}")
+
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logging.debug("[websocket_endpoint] WebSocket accepted.")
+    # Frames to this client go through a queue and its writer task, so a slow client never stalls a turn
+    client = getattr(websocket, "client", None)
+    outbound = OutboundQueue(websocket.send_text, name=f"{client.host}:{client.port}" if client else "",
+                             on_overflow=websocket.close, send_bytes=websocket.send_bytes)
+    attach_outbound_queue(websocket, outbound)
     websocket_closed = False
+    turn_tasks = set()  # sendUserMessage requests in flight on this connection
     
     while True:
         try:
@@ -933,6 +1207,7 @@ async def websocket_endpoint(websocket: WebSocket):
             logging.error(f"[websocket_endpoint] CRITICAL: Received message: {data}")
             
             # Debug: Check if this is a notification
+            parsed_data = None
             try:
                 parsed_data = json.loads(data)
                 if isinstance(parsed_data, dict) and "method" in parsed_data and "id" not in parsed_data:
@@ -940,18 +1215,17 @@ async def websocket_endpoint(websocket: WebSocket):
             except:
                 pass
             
+            # Turns run concurrently with reading the socket (see _handle_turn_request)
+            if isinstance(parsed_data, dict) and parsed_data.get("method") == "sendUserMessage":
+                task = asyncio.ensure_future(_handle_turn_request(websocket, data, parsed_data.get("id")))
+                turn_tasks.add(task)
+                task.add_done_callback(turn_tasks.discard)
+                continue
+            
             response = await handle_websocket_message(websocket, data)
             logging.error(f"[websocket_endpoint] CRITICAL: Generated response: {response}")
             
-            if response:  # Only send response for requests (not notifications)
-                # Validate the response before sending to ensure no raw JSON structures
-                validated_response = validate_ai_response(response)
-                response_text = json.dumps(validated_response)
-                logging.debug(f"[websocket_endpoint] Sending response: {response_text}")
-                await websocket.send_text(response_text)
-                logging.debug("[websocket_endpoint] Response sent successfully")
-            else:
-                logging.debug("[websocket_endpoint] No response to send (notification)")
+            await _send_websocket_response(websocket, response)
                 
         except Exception as e:
             # Not valid JSON or not JSON-RPC or handler error
@@ -970,13 +1244,21 @@ async def websocket_endpoint(websocket: WebSocket):
             
             # Note: We don't remove the session itself - it may be reconnected
             # But we should mark it as disconnected
+            session_manager.detach_websocket(session_id)
+            logging.info(f"[websocket_endpoint] Cleared WebSocket reference for session {session_id}")
             if session_id in session_manager.sessions:
                 session = session_manager.sessions[session_id]
-                session.websocket = None  # Clear the WebSocket reference
-                logging.info(f"[websocket_endpoint] Cleared WebSocket reference for session {session_id}")
+                # Nobody is left to read the turn in flight: stop its stream and tools
+                if session.cancel_turn("websocket closed"):
+                    logging.info(f"[websocket_endpoint] Cancelled the turn in flight for session {session_id}")
     except Exception as cleanup_error:
         logging.error(f"[websocket_endpoint] Error during session cleanup: {cleanup_error}")
     
+    # Requests that had not reached a session yet
+    for task in list(turn_tasks):
+        task.cancel()
+    await outbound.aclose()
+    
     logging.debug("[websocket_endpoint] WebSocket endpoint exiting, closing websocket.")
     if not websocket_closed:
         try:
@@ -1028,12 +1310,27 @@ async def startup_event():
 @app.on_event("startup")
 async def on_startup():
     """FastAPI startup event."""
+    from ai_whisperer.services.execution.loop_monitor import get_loop_monitor
+    get_loop_monitor().start()
     await startup_event()
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """FastAPI shutdown event."""
+    from ai_whisperer.services.ai.http_pool import get_http_pool
+    from ai_whisperer.services.execution.loop_monitor import get_loop_monitor
+    await get_loop_monitor().stop()
+    await get_http_pool().aclose()
+    if session_manager.journal is not None:
+        await session_manager.journal.aclose()
+
+
 if __name__ == "__main__":
     import uvicorn
     # CLI args are already parsed in the initialization above
     logger.info(f"Starting server on {cli_args.host}:{cli_args.port} with Debbie monitoring: {cli_args.debbie_monitor}")
     
-    uvicorn.run(app, host=cli_args.host, port=cli_args.port)
+    from ai_whisperer.services.execution.ws_transport import get_ws_transport_config
+    uvicorn.run(app, host=cli_args.host, port=cli_args.port,
+                ws_per_message_deflate=get_ws_transport_config().permessage_deflate)
@@ -8,7 +8,9 @@ import logging
 import uuid
 import json
 import re
-from typing import Dict, Optional, Any
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Any, Tuple
 from pathlib import Path
 from datetime import datetime
 
@@ -17,11 +19,22 @@ from ai_whisperer.services.agents.stateless import StatelessAgent
 from ai_whisperer.services.agents.config import AgentConfig
 from ai_whisperer.services.agents.factory import AgentFactory
 from ai_whisperer.context.agent_context import AgentContext
+from ai_whisperer.context.context_budget import get_context_budget
 from ai_whisperer.services.execution.ai_loop import StatelessAILoop
 from ai_whisperer.services.execution.ai_config import AIConfig
+from ai_whisperer.services.cluster.shared_state import current_worker_id, get_shared_state
+from ai_whisperer.services.execution.cancellation import CancellationToken, cancellation_scope
+from ai_whisperer.services.execution.partial_json import IncrementalJSONParser, JSONEventType, parse_json_prefix
+from ai_whisperer.services.execution.stream_buffer import StreamBuffer
+from ai_whisperer.services.execution.outbound_queue import get_outbound_queue
+from ai_whisperer.services.execution.turn_metrics import finish_turn_timer, start_turn_timer, timed_span
 from ai_whisperer.services.ai.openrouter import OpenRouterAIService
+from ai_whisperer.services.agents.agent_pool import get_agent_pool
 from ai_whisperer.services.agents.ai_loop_manager import AILoopManager
+from ai_whisperer.services.agents.hibernation import get_session_hibernator
+from ai_whisperer.services.agents.session_journal import SessionJournal
 from ai_whisperer.services.execution.context import ContextManager
+from ai_whisperer.context.context_item import ContextItem
 from ai_whisperer.context.context_manager import AgentContextManager
 from ai_whisperer.utils.path import PathManager
 from .message_models import AIMessageChunkNotification, ContinuationProgressNotification
@@ -32,6 +45,9 @@ from ai_whisperer.core.agent_logger import get_agent_logger
 
 logger = logging.getLogger(__name__)
 
+# Tool registry that the interactive session tools were registered with
+_session_tools_registry = None
+
 
 def clean_malformed_json(response: str) -> str:
     """
@@ -46,31 +62,13 @@ def clean_malformed_json(response: str) -> str:
     if not response.strip().startswith('{'):
         return response
     
-    # Try to find the first complete JSON object
-    brace_count = 0
-    first_json_end = -1
-    
-    for i, char in enumerate(response):
-        if char == '{':
-            brace_count += 1
-        elif char == '}':
-            brace_count -= 1
-            if brace_count == 0:
-                first_json_end = i
-                break
-    
-    if first_json_end > 0:
-        # Extract just the first JSON object
-        first_json = response[:first_json_end + 1]
-        try:
-            # Validate it's proper JSON
-            json.loads(first_json)
-            return first_json
-        except json.JSONDecodeError:
-            pass
-    
-    # If we can't extract clean JSON, return original
-    return response
+    # Keep just the first complete JSON object
+    try:
+        _, end = parse_json_prefix(response)
+    except json.JSONDecodeError:
+        # If we can't extract clean JSON, return original
+        return response
+    return response[:end]
 
 
 def normalize_response_to_json(response: str, is_structured: bool = False) -> Dict[str, Any]:
@@ -84,18 +82,18 @@ def normalize_response_to_json(response: str, is_structured: bool = False) -> Di
     Returns:
         Dictionary with analysis/commentary/final structure
     """
-    # Clean up potentially malformed JSON first
-    if isinstance(response, str) and response.strip().startswith('{'):
-        response = clean_malformed_json(response)
-    
     # If already valid JSON with expected structure, return as-is
     if is_structured or (isinstance(response, str) and response.strip().startswith('{')):
         try:
-            data = json.loads(response)
-            if isinstance(data, dict) and all(key in data for key in ['analysis', 'commentary', 'final']):
-                return data
+            data, end = parse_json_prefix(response)
         except json.JSONDecodeError:
             pass
+        else:
+            if isinstance(data, dict) and all(key in data for key in ['analysis', 'commentary', 'final']):
+                return data
+            if isinstance(data, dict):
+                # Clean up malformed JSON: drop objects concatenated to the first one
+                response = response[:end]
     
     # Check for marker-based format
     if '[FINAL]' in response or '[ANALYSIS]' in response or '[COMMENTARY]' in response:
@@ -183,6 +181,10 @@ class StatelessInteractiveSession:
         
         # Session state
         self.is_started = False
+        self.last_activity = time.monotonic()  # Idle sessions are hibernated, see StatelessSessionManager
+        
+        # Turn in flight: its cancellation token and the task running it
+        self._current_turn: Optional[Tuple[CancellationToken, asyncio.Task]] = None
         
         # Lock for thread-safe operations
         self._lock = asyncio.Lock()
@@ -217,18 +219,25 @@ class StatelessInteractiveSession:
     
     def _register_tools(self):
         """Register all tools needed for interactive sessions."""
+        global _session_tools_registry
         from ai_whisperer.tools.tool_registration import register_all_tools
+        from ai_whisperer.tools.tool_registry import get_tool_registry
         
         # Get PathManager instance for tools that need it
         path_manager = PathManager()
         if self.project_path:
             path_manager.initialize(config_values={'workspace_path': self.project_path})
         
+        # The registry is process-wide and the tools only hold the PathManager
+        # singleton, so the first session registers them. Re-registering on every
+        # session would recompile their dispatch and drop the cached definitions.
+        if get_tool_registry() is _session_tools_registry:
+            return
+        
         # Register all tools
         register_all_tools(path_manager)
         
         # Also register mailbox and async agent tools explicitly 
-        from ai_whisperer.tools.tool_registry import get_tool_registry
         from ai_whisperer.tools.send_mail_tool import SendMailTool
         from ai_whisperer.tools.send_mail_with_switch_tool import SendMailWithSwitchTool
         from ai_whisperer.tools.check_mail_tool import CheckMailTool
@@ -245,6 +254,7 @@ class StatelessInteractiveSession:
         tool_registry.register_tool(SwitchAgentTool())
         tool_registry.register_tool(AgentSleepTool())
         tool_registry.register_tool(AgentWakeTool())
+        _session_tools_registry = tool_registry
         
         logger.info("Registered all tools for interactive session including mailbox and agent switching tools")
     
@@ -264,7 +274,7 @@ class StatelessInteractiveSession:
         async with self._lock:
             return await self._create_agent_internal(agent_id, system_prompt, config)
     
-    async def _create_agent_internal(self, agent_id: str, system_prompt: str, config: Optional[AgentConfig] = None, agent_registry_info=None) -> StatelessAgent:
+    async def _create_agent_internal(self, agent_id: str, system_prompt: str, config: Optional[AgentConfig] = None, agent_registry_info=None, loop_config=None) -> StatelessAgent:
         """Internal method to create agent - assumes lock is already held"""
         if agent_id in self.agents:
             raise ValueError(f"Agent '{agent_id}' already exists in session")
@@ -293,7 +303,8 @@ class StatelessInteractiveSession:
         ai_loop = self.ai_loop_manager.get_or_create_ai_loop(
             agent_id=agent_id,
             agent_config=config,
-            fallback_config=self.config
+            fallback_config=self.config,
+            loop_config=loop_config
         )
         
         # Create stateless agent with registry info for tool filtering
@@ -398,134 +409,11 @@ class StatelessInteractiveSession:
                 
                 logger.info(f"Found agent info: {agent_info.name}")
                 
-                # Load the agent's prompt from the prompt system
-                system_prompt = f"You are {agent_info.name}, {agent_info.description}"  # Better fallback
-                prompt_source = "fallback"  # Track where the prompt came from
-                
-                if self.prompt_system and agent_info.prompt_file:
-                    logger.info(f"Attempting to load prompt file: {agent_info.prompt_file}")
-                    try:
-                        # Try with prompt system first to get proper tool instructions
-                        prompt_name = agent_info.prompt_file
-                        if prompt_name.endswith('.prompt.md'):
-                            prompt_name = prompt_name[:-10]  # Remove '.prompt.md'
-                        elif prompt_name.endswith('.md'):
-                            prompt_name = prompt_name[:-3]  # Remove '.md'
-                        
-                        logger.info(f"Trying to load prompt via PromptSystem with tools: agents/{prompt_name}")
-                        try:
-                            # Enable continuation feature for all agents
-                            self.prompt_system.enable_feature('continuation_protocol')
-                            
-                            # Enable mailbox debug mode for Debbie
-                            if agent_id.lower() in ['d', 'debbie']:
-                                logger.info(f"Enabling force_mailbox_tool debug mode for Debbie")
-                                # First enable the debug_options feature
-                                self.prompt_system.enable_feature('debug_options')
-                                # Then enable the specific debug option
-                                self.prompt_system.enable_debug_option('force_mailbox_tool')
-                            
-                            # Get model name for capability checking
-                            model_name = None
-                            if agent_info.ai_config and agent_info.ai_config.get("model"):
-                                model_name = agent_info.ai_config.get("model")
-                            else:
-                                model_name = self.config.get("openrouter", {}).get("model")
-                            
-                            # Include tools for debugging agents like Debbie
-                            include_tools = agent_id.lower() in ['d', 'debbie'] or 'debug' in agent_info.name.lower()
-                            
-                            # Get formatted prompt with model name for structured output support
-                            prompt = self.prompt_system.get_formatted_prompt(
-                                "agents", 
-                                prompt_name, 
-                                include_tools=include_tools,
-                                model_name=model_name
-                            )
-                            system_prompt = prompt
-                            prompt_source = f"prompt_system:agents/{prompt_name}" + (" (with_tools)" if include_tools else "")
-                            logger.info(f"✅ Successfully loaded prompt via PromptSystem for {agent_id} (tools included: {include_tools})")
-                            
-                            # Clear debug options after loading prompt to avoid affecting other agents
-                            if agent_id.lower() in ['d', 'debbie']:
-                                self.prompt_system.disable_debug_option('force_mailbox_tool')
-                                # Also disable the debug_options feature if no other debug options are active
-                                if not self.prompt_system.get_debug_options():
-                                    self.prompt_system.disable_feature('debug_options')
-                        except Exception as e1:
-                            logger.warning(f"⚠️ PromptSystem failed: {e1}, trying direct file read")
-                            # Try direct file read as fallback
-                            from pathlib import Path
-                            prompt_file = Path("prompts") / "agents" / agent_info.prompt_file
-                            if prompt_file.exists():
-                                with open(prompt_file, 'r', encoding='utf-8') as f:
-                                    base_prompt = f.read()
-                                
-                                # Add tool instructions manually for debugging agents
-                                if agent_id.lower() in ['d', 'debbie'] or 'debug' in agent_info.name.lower():
-                                    try:
-                                        from ai_whisperer.tools.tool_registry import get_tool_registry
-                                        tool_registry = get_tool_registry()
-                                        tool_instructions = tool_registry.get_all_ai_prompt_instructions()
-                                        if tool_instructions:
-                                            system_prompt = base_prompt + "\n\n## AVAILABLE TOOLS\n" + tool_instructions
-                                            prompt_source = f"direct_file:{prompt_file} (with_tools)"
-                                            logger.info(f"✅ Added tool instructions to direct file prompt for {agent_id}")
-                                        else:
-                                            system_prompt = base_prompt
-                                            prompt_source = f"direct_file:{prompt_file} (no_tools)"
-                                            logger.warning(f"⚠️ No tool instructions available for {agent_id}")
-                                    except Exception as e2:
-                                        logger.warning(f"⚠️ Failed to add tool instructions: {e2}")
-                                        system_prompt = base_prompt
-                                        prompt_source = f"direct_file:{prompt_file} (tools_failed)"
-                                else:
-                                    system_prompt = base_prompt
-                                    prompt_source = f"direct_file:{prompt_file}"
-                                
-                                logger.info(f"✅ Successfully loaded prompt via direct file read for {agent_id}: {prompt_file}")
-                            else:
-                                logger.warning(f"❌ Prompt file not found: {prompt_file}")
-                                logger.warning(f"❌ FALLBACK ACTIVATED: Using basic fallback prompt for {agent_info.name}")
-                                prompt_source = "basic_fallback"
-                                # Keep the fallback prompt
-                    except Exception as e:
-                        logger.error(f"❌ Failed to load prompt for agent {agent_id}: {e}")
-                        logger.error(f"❌ FALLBACK ACTIVATED: Using basic fallback prompt for {agent_info.name}")
-                        prompt_source = "error_fallback"
-                else:
-                    logger.warning(f"⚠️ No prompt system or prompt file configured for {agent_id}, using basic fallback")
-                    prompt_source = "no_config_fallback"
-                
-                # Create agent config with AI settings if available
-                agent_config = None
-                if agent_info.ai_config:
-                    # Create AgentConfig with agent-specific AI settings
-                    openrouter_config = self.config.get("openrouter", {})
-                    agent_config = AgentConfig(
-                        name=agent_info.name,
-                        description=agent_info.description,
-                        system_prompt=system_prompt,
-                        model_name=agent_info.ai_config.get("model", openrouter_config.get("model", "openai/gpt-3.5-turbo")),
-                        provider=agent_info.ai_config.get("provider", "openrouter"),
-                        api_settings={
-                            "api_key": openrouter_config.get("api_key"),
-                            **agent_info.ai_config.get("api_settings", {})
-                        },
-                        generation_params={
-                            **openrouter_config.get("params", {}),
-                            **agent_info.ai_config.get("generation_params", {})
-                        },
-                        tool_permissions=[],
-                        tool_limits={},
-                        context_settings=agent_info.ai_config.get("context_settings", {"max_context_messages": 50})
-                    )
-                    logger.info(f"Created agent config with custom AI settings: model={agent_config.model_name}")
-                
-                # Create the agent with the loaded prompt and registry info
-                logger.info(f"📝 Agent {agent_id} ({agent_info.name}) prompt loaded from: {prompt_source}")
-                logger.info(f"About to create agent with prompt: {system_prompt[:200]}...")
-                await self._create_agent_internal(agent_id, system_prompt, config=agent_config, agent_registry_info=agent_info)
+                # Prompt, configs and tool definitions come prebuilt from the warm agent pool
+                template = get_agent_pool().acquire(agent_id, agent_info, self.prompt_system, self.config)
+                logger.info(f"📝 Agent {agent_id} ({agent_info.name}) prompt loaded from: {template.prompt_source}")
+                await self._create_agent_internal(agent_id, template.system_prompt, config=template.new_agent_config(),
+                                                  agent_registry_info=agent_info, loop_config=template.new_loop_config())
                 logger.info(f"Created agent '{agent_id}' from registry with system prompt")
             
             # Verify agent exists now
@@ -573,6 +461,14 @@ class StatelessInteractiveSession:
         if not self.is_started or not self.active_agent:
             raise RuntimeError(f"Session {self.session_id} is not started or no active agent")
         
+        # A new message supersedes the turn in flight; continuations (and messages
+        # sent from within the turn's own task) belong to it
+        owns_turn = self._current_turn is None or not (
+            is_continuation or self._current_turn[1] is asyncio.current_task())
+        cancellation = await self._start_turn() if owns_turn else self._current_turn[0]
+        # Latency breakdown of the turn; the agent fills in its model
+        timer = start_turn_timer(session_id=self.session_id, agent_id=self.active_agent) if owns_turn else None
+        
         try:
             if self.active_agent not in self.agents:
                 logger.error(f"Active agent '{self.active_agent}' not found in agents dict")
@@ -640,129 +536,101 @@ class StatelessInteractiveSession:
             # Note: Don't reset streaming sequences - let router handle sequence numbering naturally
             
             # Create streaming callback - parse structured JSON before sending
-            chunk_buffer = []  # Buffer for accumulating chunks
-            is_json_format = False  # Track if we detect JSON format
+            chunk_buffer = StreamBuffer()  # Buffer for accumulating plain text chunks
+            json_parser = IncrementalJSONParser()  # Parses structured responses chunk by chunk
+            is_json_format = None  # Whether the response is a JSON object, once known
             last_display_content = ""  # Track last sent content to avoid duplicates
             detected_structured = False  # Track if we've detected structured output format
+            has_final = False  # The structured response has reached its final field
+            contains_tool_calls = False  # The structured response carries tool calls
             
             async def send_chunk(chunk: str):
                 """Send a chunk of AI response to the client"""
-                nonlocal is_json_format, last_display_content, detected_structured
+                nonlocal is_json_format, last_display_content, detected_structured, has_final, contains_tool_calls
                 try:
                     # Check if WebSocket is still connected
                     if self.websocket is None:
                         logger.warning(f"WebSocket disconnected for session {self.session_id}, skipping chunk")
                         return
                     
-                    # Accumulate chunks
-                    chunk_buffer.append(chunk)
-                    accumulated_content = ''.join(chunk_buffer)
-                    
-                    # Try to detect format from accumulated content
-                    if not is_json_format and accumulated_content.strip():
-                        is_json_format = accumulated_content.strip().startswith('{')
+                    # Detect the format from the first non-whitespace text
+                    if is_json_format is None and chunk.strip():
+                        is_json_format = chunk.lstrip().startswith('{')
                     
-                    # Check if this response contains tool calls - if so, don't stream (backend-only operation)
-                    contains_tool_calls = (
-                        '"tool_calls"' in accumulated_content or 
-                        '"function_calls"' in accumulated_content
-                    )
-                    
-                    if contains_tool_calls:
-                        # Tool calls are backend-only - don't stream to frontend
-                        logger.debug("Suppressing streaming for tool call response")
-                        return
-                    
-                    # Parse structured content if it looks like JSON
-                    if is_json_format or detected_structured:
-                        content_stripped = accumulated_content.strip()
+                    # Parse structured content incrementally (deltas arrive coalesced, see ChunkCoalescer)
+                    if is_json_format:
+                        if json_parser.error is not None:
+                            return
+                        try:
+                            events = json_parser.feed(chunk)
+                        except json.JSONDecodeError as e:
+                            # Never send raw JSON chunks to avoid exposing internal structure
+                            logger.debug(f"Suppressing malformed structured output: {e}")
+                            return
                         
-                        # Check if this looks like our structured format
-                        if not detected_structured and ('"analysis"' in content_stripped or '"commentary"' in content_stripped or '"final"' in content_stripped):
-                            detected_structured = True
-                            logger.debug("Detected structured output format")
+                        final_changed = False
+                        for event in events:
+                            if event.type is JSONEventType.KEY:
+                                if event.value in ('tool_calls', 'function_calls'):
+                                    contains_tool_calls = True
+                                elif len(event.path) == 1 and event.value in ('analysis', 'commentary', 'final'):
+                                    if not detected_structured:
+                                        detected_structured = True
+                                        logger.debug("Detected structured output format")
+                                    has_final = has_final or event.value == 'final'
+                            elif event.path == ('final',):
+                                final_changed = True
                         
-                        if detected_structured:
-                            # CRITICAL: If we have analysis/commentary but NO final field, this is likely
-                            # a response that's building up to tool calls. Don't stream it.
-                            if '"final"' not in content_stripped:
-                                logger.debug("Suppressing structured content without final field (likely tool call preparation)")
-                                return
-                            
-                            try:
-                                # For partial responses, try to fix incomplete JSON
-                                open_braces = content_stripped.count('{')
-                                close_braces = content_stripped.count('}')
-                                if open_braces > close_braces:
-                                    test_content = content_stripped + '}' * (open_braces - close_braces)
-                                else:
-                                    test_content = content_stripped
-                                
-                                # Try to parse
-                                data = json.loads(test_content)
-                                
-                                # Check if it has our expected structure
-                                if 'analysis' in data or 'commentary' in data or 'final' in data:
-                                    # This is structured output - extract only the final content
-                                    display_content = data.get('final', '')
-                                    
-                                    # Only send if we have new content to display
-                                    if display_content and display_content != last_display_content:
-                                        await self.websocket.send_json({
-                                            "jsonrpc": "2.0",
-                                            "method": "StreamingUpdate",
-                                            "params": {
-                                                "type": "streaming_chunk",
-                                                "content": display_content,  # Send only the 'final' field
-                                                "sessionId": self.session_id,
-                                                "agentId": self.active_agent,
-                                                "isPartial": True,
-                                                "format": "text",  # Always text for display
-                                                "isStructured": True,  # Flag that this came from structured output
-                                                "metadata": {
-                                                    "analysis": data.get('analysis', ''),
-                                                    "commentary": data.get('commentary', '')
-                                                }
-                                            }
-                                        })
-                                        last_display_content = display_content
-                                    return
-                            except json.JSONDecodeError:
-                                # For incomplete JSON during streaming, try to extract partial final field
-                                import re
-                                final_match = re.search(r'"final"\s*:\s*"([^"]*)', content_stripped)
-                                if final_match:
-                                    display_content = final_match.group(1)
-                                    # Unescape JSON string
-                                    display_content = display_content.replace('\\n', '\n').replace('\\"', '"')
-                                    if display_content and display_content != last_display_content:
-                                        await self.websocket.send_json({
-                                            "jsonrpc": "2.0",
-                                            "method": "StreamingUpdate",
-                                            "params": {
-                                                "type": "streaming_chunk",
-                                                "content": display_content,
-                                                "sessionId": self.session_id,
-                                                "agentId": self.active_agent,
-                                                "isPartial": True,
-                                                "format": "text",
-                                                "isStructured": True
-                                            }
-                                        })
-                                        last_display_content = display_content
-                                    return
-                                else:
-                                    # If we can't extract final yet, don't send anything
-                                    return
+                        if contains_tool_calls:
+                            # Tool calls are backend-only - don't stream to frontend
+                            logger.debug("Suppressing streaming for tool call response")
+                            return
+                        
+                        # CRITICAL: If we have analysis/commentary but NO final field, this is likely
+                        # a response that's building up to tool calls. Don't stream it.
+                        if not has_final:
+                            logger.debug("Suppressing structured content without final field (likely tool call preparation)")
+                            return
+                        if not final_changed:
+                            return
+                        
+                        # This is structured output - extract only the final content
+                        data = json_parser.value
+                        display_content = data.get('final', '')
+                        
+                        # Only send if we have new content to display
+                        if isinstance(display_content, str) and display_content and display_content != last_display_content:
+                            await self._send_frame({
+                                "jsonrpc": "2.0",
+                                "method": "StreamingUpdate",
+                                "params": {
+                                    "type": "streaming_chunk",
+                                    "content": display_content,  # Send only the 'final' field
+                                    "sessionId": self.session_id,
+                                    "agentId": self.active_agent,
+                                    "isPartial": True,
+                                    "format": "text",  # Always text for display
+                                    "isStructured": True,  # Flag that this came from structured output
+                                    "metadata": {
+                                        "analysis": data.get('analysis', ''),
+                                        "commentary": data.get('commentary', '')
+                                    }
+                                }
+                            }, supersedes=f"stream:{self.active_agent}")
+                            last_display_content = display_content
+                        return
                     
-                    # IMPORTANT: If we detected JSON format but haven't processed it above,
-                    # don't send raw JSON chunks to avoid exposing internal structure
-                    if is_json_format:
-                        logger.debug("Suppressing raw JSON chunk to prevent wrapper exposure")
+                    # Accumulate plain text chunks
+                    chunk_buffer.append(chunk)
+                    accumulated_content = chunk_buffer.getvalue()
+                    
+                    # Check if this response contains tool calls - if so, don't stream (backend-only operation)
+                    if '"tool_calls"' in accumulated_content or '"function_calls"' in accumulated_content:
+                        logger.debug("Suppressing streaming for tool call response")
                         return
                     
                     # For non-structured content, send as-is
-                    await self.websocket.send_json({
+                    await self._send_frame({
                         "jsonrpc": "2.0",
                         "method": "StreamingUpdate",
                         "params": {
@@ -774,7 +642,7 @@ class StatelessInteractiveSession:
                             "format": "text",
                             "rawContent": True
                         }
-                    })
+                    }, supersedes=f"stream:{self.active_agent}")
                     
                     # Reduce debug spam - only log significant chunks
                     if len(accumulated_content) % 100 == 0:  # Log every 100 chars
@@ -815,7 +683,9 @@ class StatelessInteractiveSession:
             
             # Process message with streaming
             logger.debug(f"[send_user_message] Calling agent.process_message")
-            result = await agent.process_message(message, on_stream_chunk=send_chunk, **kwargs)
+            with cancellation_scope(cancellation):
+                result = await agent.process_message(message, on_stream_chunk=send_chunk,
+                                                     cancellation=cancellation, **kwargs)
             logger.debug(f"[send_user_message] Agent processing completed")
             
             # Defensive: ensure result is a dict
@@ -892,13 +762,14 @@ class StatelessInteractiveSession:
                         final_channel_messages = []  # Don't send anything to channels
                     else:
                         # Process through channel integration as plain text
-                        final_channel_messages = self.channel_integration.process_ai_response(
-                            self.session_id,
-                            display_content,
-                            agent_id=self.active_agent,
-                            is_partial=False,
-                            is_structured=False  # Plain text content
-                        )
+                        with timed_span("channel_routing"):
+                            final_channel_messages = self.channel_integration.process_ai_response(
+                                self.session_id,
+                                display_content,
+                                agent_id=self.active_agent,
+                                is_partial=False,
+                                is_structured=False  # Plain text content
+                            )
                         
                         # Enhance metadata with structured response data
                         for msg in final_channel_messages:
@@ -908,13 +779,14 @@ class StatelessInteractiveSession:
                                 msg['metadata']['commentary'] = normalized_response.get('commentary', '')
                 else:
                     # For plain text responses, send as-is
-                    final_channel_messages = self.channel_integration.process_ai_response(
-                        self.session_id,
-                        str(normalized_response) if not isinstance(normalized_response, str) else normalized_response,
-                        agent_id=self.active_agent,
-                        is_partial=False,
-                        is_structured=False
-                    )
+                    with timed_span("channel_routing"):
+                        final_channel_messages = self.channel_integration.process_ai_response(
+                            self.session_id,
+                            str(normalized_response) if not isinstance(normalized_response, str) else normalized_response,
+                            agent_id=self.active_agent,
+                            is_partial=False,
+                            is_structured=False
+                        )
                 
                 # Send final channel messages with proper sequence numbers
                 for channel_msg in final_channel_messages:
@@ -925,7 +797,7 @@ class StatelessInteractiveSession:
                                 channel_msg['metadata']['responseFormat'] = 'json'
                                 channel_msg['metadata']['fullResponse'] = normalized_response
                             
-                            await self.websocket.send_json({
+                            await self._send_frame({
                                 "jsonrpc": "2.0",
                                 "method": "ChannelMessageNotification",
                                 "params": channel_msg
@@ -1010,12 +882,14 @@ class StatelessInteractiveSession:
                 # Now call the AI to process the tool results
                 # We use process_messages to avoid adding a user message
                 messages = agent.context.retrieve_messages()
-                tool_response_result = await agent.ai_loop.process_messages(
-                    messages=messages,
-                    on_stream_chunk=send_chunk,
-                    tools=agent._get_agent_tools(),
-                    **kwargs
-                )
+                with cancellation_scope(cancellation):
+                    tool_response_result = await agent.ai_loop.process_messages(
+                        messages=messages,
+                        on_stream_chunk=send_chunk,
+                        tools=agent._get_agent_tools(),
+                        cancellation=cancellation,
+                        **kwargs
+                    )
                 
                 # Parse structured output if needed
                 if tool_response_result.get('used_structured_output') and isinstance(tool_response_result.get('response'), str):
@@ -1034,13 +908,14 @@ class StatelessInteractiveSession:
                 # Normalize the tool response through channel integration
                 if tool_response_result.get('response'):
                     normalized_tool_response = normalize_response_to_json(tool_response_result['response'])
-                    tool_channel_messages = self.channel_integration.process_ai_response(
-                        self.session_id,
-                        json.dumps(normalized_tool_response),
-                        agent_id=self.active_agent,
-                        is_partial=False,
-                        is_structured=True
-                    )
+                    with timed_span("channel_routing"):
+                        tool_channel_messages = self.channel_integration.process_ai_response(
+                            self.session_id,
+                            json.dumps(normalized_tool_response),
+                            agent_id=self.active_agent,
+                            is_partial=False,
+                            is_structured=True
+                        )
                     
                     # Send tool response channel messages
                     for channel_msg in tool_channel_messages:
@@ -1051,7 +926,7 @@ class StatelessInteractiveSession:
                                     channel_msg['metadata']['responseFormat'] = 'json'
                                     channel_msg['metadata']['fullResponse'] = normalized_tool_response
                                 
-                                await self.websocket.send_json({
+                                await self._send_frame({
                                     "jsonrpc": "2.0",
                                     "method": "ChannelMessageNotification",
                                     "params": channel_msg
@@ -1178,6 +1053,55 @@ class StatelessInteractiveSession:
                 logger.debug("Resetting continuation depth due to error")
                 self._continuation_depth = 0
             raise
+        except asyncio.CancelledError:
+            logger.info(f"Turn of agent '{self.active_agent}' in session {self.session_id} cancelled: "
+                        f"{cancellation.reason}")
+            self._continuation_depth = 0
+            raise
+        finally:
+            finish_turn_timer(timer)
+            if owns_turn and self._current_turn is not None and self._current_turn[0] is cancellation:
+                self._current_turn = None
+            self.last_activity = time.monotonic()
+    
+    async def _send_frame(self, payload: Dict[str, Any], supersedes: Optional[str] = None) -> None:
+        """
+        Send a JSON-RPC frame to the client, timed as a websocket_send span of the turn.
+
+        With an outbound queue on the websocket the frame is only queued, so a slow
+        client does not stall the turn; ``supersedes`` marks a partial frame that a
+        newer one with the same key may replace while the queue is under pressure.
+        """
+        with timed_span("websocket_send"):
+            queue = get_outbound_queue(self.websocket)
+            if queue is None:
+                await self.websocket.send_json(payload)
+            elif not queue.send(payload, supersedes=supersedes):
+                raise RuntimeError("Websocket closed: outbound queue is closed")
+    
+    async def _start_turn(self) -> CancellationToken:
+        """Register the current task as the new turn, then cancel the turn in flight and wait for it to unwind."""
+        previous = self._current_turn
+        token = CancellationToken()
+        token.bind_task(asyncio.current_task())
+        self._current_turn = (token, asyncio.current_task())
+        if previous is not None:
+            previous_token, previous_task = previous
+            previous_token.cancel("superseded by a new message")
+            if not previous_task.done():
+                await asyncio.wait({previous_task})
+        return token
+    
+    def cancel_turn(self, reason: str = "cancelled") -> bool:
+        """
+        Cancel the turn in flight, if any: its AI stream is closed and its pending tools are cancelled.
+        
+        Returns:
+            True if a turn was cancelled
+        """
+        if self._current_turn is None:
+            return False
+        return self._current_turn[0].cancel(reason)
     
     async def _agent_introduction(self):
         """
@@ -1240,7 +1164,8 @@ class StatelessInteractiveSession:
                     "context_settings": agent.config.context_settings
                 },
                 "context": {
-                    "messages": agent.context.retrieve_messages(),
+                    # Stored messages only: the system prompt is restored from the config
+                    "messages": agent.context.get_conversation_history(),
                     "metadata": agent.context._metadata if hasattr(agent.context, '_metadata') else {}
                 }
             }
@@ -1261,12 +1186,15 @@ class StatelessInteractiveSession:
             config_data = agent_state["config"]
             config = AgentConfig(**config_data)
             
-            # Create agent with config
-            agent = await self.create_agent(
-                agent_id, 
-                config.system_prompt,
-                config
-            )
+            # Create agent with config, and with its registry entry for tool filtering
+            agent_info = self.agent_registry.get_agent(agent_id.upper()) if self.agent_registry else None
+            async with self._lock:
+                agent = await self._create_agent_internal(
+                    agent_id, 
+                    config.system_prompt,
+                    config,
+                    agent_registry_info=agent_info
+                )
             
             # Restore context
             context_data = agent_state.get("context", {})
@@ -1467,6 +1395,62 @@ class StatelessInteractiveSession:
         logger.debug(f"Optimized continuation config for {agent_type}/{model_name}: {base_config}")
         return base_config
     
+    @property
+    def is_idle(self) -> bool:
+        """No turn is in flight and no agent is being created or switched."""
+        return self._current_turn is None and not self._lock.locked()
+    
+    async def hibernate(self) -> Dict[str, Any]:
+        """
+        Release the agents, AI loops, file contexts and channel data of an idle session.
+        
+        Returns:
+            The state to pass to rehydrate()
+        """
+        # A summary finishing after get_state() would be lost with the context
+        await self._cancel_compactions()
+        state = await self.get_state()
+        for agent_state in state["agents"].values():
+            # The API key is taken from the config again on rehydration
+            agent_state["config"]["api_settings"] = {
+                k: v for k, v in (agent_state["config"]["api_settings"] or {}).items() if k != "api_key"}
+        state["context_items"] = {
+            agent_id: [item.to_dict() for item in items]
+            for agent_id, items in self.context_manager.contexts.items()
+        }
+        state["channels"] = self.channel_integration.hibernate_session(self.session_id)
+        
+        self.agents.clear()
+        self.active_agent = None
+        self.ai_loop_manager.cleanup()
+        self.context_manager.contexts.clear()
+        if self.observer:
+            self.observer.stop_observing(self.session_id)
+        logger.info(f"Hibernated session {self.session_id}")
+        return state
+    
+    async def rehydrate(self, state: Dict[str, Any]) -> None:
+        """Restore a session from the state returned by hibernate(), without notifying the client."""
+        websocket, self.websocket = self.websocket, None
+        try:
+            api_key = self.config.get("openrouter", {}).get("api_key")
+            for agent_state in state.get("agents", {}).values():
+                if api_key:
+                    agent_state["config"]["api_settings"].setdefault("api_key", api_key)
+            await self.restore_state(state)
+        finally:
+            self.websocket = websocket
+        for agent_id, items in state.get("context_items", {}).items():
+            self.context_manager.contexts[agent_id] = [ContextItem.from_dict(item) for item in items]
+        self.channel_integration.rehydrate_session(self.session_id, state.get("channels", {}))
+        logger.info(f"Rehydrated session {self.session_id} with {len(self.agents)} agents")
+    
+    async def _cancel_compactions(self) -> None:
+        """Cancel the background context compactions of this session's agents."""
+        budget = get_context_budget()
+        for agent in self.agents.values():
+            await budget.cancel_compaction(agent.context)
+    
     async def stop_ai_session(self) -> None:
         """
         Stop the AI session gracefully.
@@ -1480,6 +1464,12 @@ class StatelessInteractiveSession:
         """
         logger.info(f"Cleaning up session {self.session_id}")
         
+        # Stop the turn in flight
+        self.cancel_turn("session closed")
+        
+        # Stop summarizing history nobody will read
+        await self._cancel_compactions()
+        
         # Stop AI session
         await self.stop_ai_session()
         
@@ -1515,7 +1505,7 @@ class StatelessInteractiveSession:
                 "params": params
             }
             try:
-                await self.websocket.send_json(notification)
+                await self._send_frame(notification)
             except Exception as e:
                 logger.error(f"Failed to send notification to client: {e}")
     
@@ -2023,9 +2013,21 @@ class StatelessInteractiveSession:
             return None
 
 
+@dataclass
+class HibernatedSession:
+    """What stays in memory of a hibernated session."""
+    session_id: str
+    websocket: Optional[WebSocket]
+    project_path: Optional[str]
+    hibernated_at: float = field(default_factory=time.time)
+
+
 class StatelessSessionManager:
     """
     Manages multiple stateless interactive sessions for WebSocket connections.
+    
+    Idle sessions are hibernated to disk (see ai_whisperer.services.agents.hibernation)
+    and rehydrated by resume_session() when their next request arrives.
     """
     
     def __init__(self, config: dict, agent_registry=None, prompt_system=None, observer=None):
@@ -2044,11 +2046,23 @@ class StatelessSessionManager:
         self.observer = observer
         self.sessions: Dict[str, StatelessInteractiveSession] = {}
         self.websocket_sessions: Dict[WebSocket, str] = {}
+        self.hibernated: Dict[str, HibernatedSession] = {}
+        self._hibernating: set = set()  # Sessions being written to disk
         self._lock = asyncio.Lock()
+        self.hibernator = get_session_hibernator()
+        self.hibernator.purge()
+        self._hibernation_task: Optional[asyncio.Task] = None
+        # Session index shared with the other workers in multi-worker mode
+        self.shared_state = get_shared_state()
+        # Workers share the session index instead of each keeping a journal
+        self.journal = SessionJournal() if self.shared_state is None else None
         
         # Register tools with the tool registry
         self._register_tools()
         
+        # Build the agent templates that sessions clone when they switch agents
+        get_agent_pool().prewarm(agent_registry, prompt_system, config)
+        
         # Load persisted sessions
         self._load_sessions()
     
@@ -2168,29 +2182,15 @@ class StatelessSessionManager:
         logger.info(f"Registered {len(tool_registry.get_all_tools())} tools with ToolRegistry")
         
     def _load_sessions(self):
-        """Load persisted session IDs from file"""
+        """Replay the session journal"""
+        if self.journal is None:
+            return
         try:
-            session_file = Path("sessions.json")
-            if session_file.exists():
-                with open(session_file, 'r') as f:
-                    data = json.load(f)
-                    logger.info(f"Loaded {len(data.get('sessions', []))} persisted sessions")
+            previous = self.journal.load()
+            logger.info(f"{len(previous)} sessions were left open by the previous process ({self.journal.path})")
         except Exception as e:
             logger.error(f"Failed to load sessions: {e}")
     
-    def _save_sessions(self):
-        """Save current session IDs to file"""
-        try:
-            data = {
-                "sessions": list(self.sessions.keys()),
-                "timestamp": datetime.now().isoformat()
-            }
-            with open("sessions.json", 'w') as f:
-                json.dump(data, f, indent=2)
-            logger.info(f"Saved {len(self.sessions)} sessions to sessions.json")
-        except Exception as e:
-            logger.error(f"Failed to save sessions: {e}")
-    
     async def create_session(self, websocket: WebSocket, project_path: Optional[str] = None) -> str:
         """
         Create a new session for a WebSocket connection.
@@ -2216,11 +2216,15 @@ class StatelessSessionManager:
             
             self.sessions[session_id] = session
             self.websocket_sessions[websocket] = session_id
+            if self.shared_state is not None:
+                await self.shared_state.run(self.shared_state.register_session, session_id, current_worker_id())
+            self._start_hibernation_sweeps()
             
             logger.info(f"Created session {session_id} for WebSocket connection with project: {project_path}")
             
-            # Save sessions
-            self._save_sessions()
+            # Journal the session; written by a background task, never on this path
+            if self.journal is not None:
+                self.journal.record_created(session_id)
             
             return session_id
     
@@ -2272,6 +2276,12 @@ class StatelessSessionManager:
         """Get a session by ID"""
         return self.sessions.get(session_id)
     
+    async def get_session_worker(self, session_id: str) -> Optional[str]:
+        """The worker serving a session in multi-worker mode, None if unknown or single-process."""
+        if self.shared_state is None or not session_id:
+            return None
+        return await self.shared_state.run(self.shared_state.session_worker, session_id)
+    
     def get_session_by_websocket(self, websocket: WebSocket) -> Optional[StatelessInteractiveSession]:
         """Get a session by WebSocket connection"""
         session_id = self.websocket_sessions.get(websocket)
@@ -2279,6 +2289,127 @@ class StatelessSessionManager:
             return self.sessions.get(session_id)
         return None
     
+    async def resume_session(self, websocket: Optional[WebSocket] = None,
+                             session_id: Optional[str] = None) -> Optional[StatelessInteractiveSession]:
+        """
+        Mark the session of a request as active, rehydrating it first if it is hibernated.
+        
+        Called for every request before its handler runs, so handlers never see
+        a hibernated session.
+        
+        Args:
+            websocket: The connection the request came from
+            session_id: The sessionId parameter of the request, if any
+        """
+        session_id = self.websocket_sessions.get(websocket) or session_id
+        if not session_id:
+            return None
+        if session_id in self.hibernated or session_id in self._hibernating:
+            async with self._lock:
+                if session_id in self.hibernated:
+                    await self._rehydrate_session(session_id)
+        session = self.sessions.get(session_id)
+        if session:
+            session.last_activity = time.monotonic()
+        return session
+    
+    async def _rehydrate_session(self, session_id: str) -> None:
+        """Rebuild a hibernated session from its state file - assumes lock is held"""
+        stub = self.hibernated.pop(session_id)
+        session = StatelessInteractiveSession(
+            session_id,
+            stub.websocket,
+            self.config,
+            self.agent_registry,
+            self.prompt_system,
+            project_path=stub.project_path,
+            observer=self.observer
+        )
+        try:
+            await session.rehydrate(await self.hibernator.read_state(session_id))
+        except Exception as e:
+            # The conversation is lost, but the session stays usable
+            logger.error(f"Failed to rehydrate session {session_id}, starting it afresh: {e}")
+            if not session.is_started:
+                await session.start_ai_session()
+        self.sessions[session_id] = session
+    
+    async def hibernate_idle_sessions(self) -> int:
+        """
+        Hibernate the sessions chosen by the hibernation policy.
+        
+        Returns:
+            Number of sessions hibernated
+        """
+        candidates = {
+            session_id: session.last_activity
+            for session_id, session in self.sessions.items()
+            if session.is_idle
+        }
+        hibernated = 0
+        for session_id in self.hibernator.select(candidates):
+            if await self.hibernate_session(session_id):
+                hibernated += 1
+        if hibernated:
+            logger.info(f"Hibernated {hibernated} idle sessions ({len(self.sessions)} remain in memory)")
+        return hibernated
+    
+    async def hibernate_session(self, session_id: str) -> bool:
+        """
+        Write an idle session to disk and drop it from memory.
+        
+        Returns:
+            False if the session is not in memory or not idle
+        """
+        async with self._lock:
+            session = self.sessions.get(session_id)
+            if session is None or not session.is_idle:
+                return False
+            # Requests arriving meanwhile wait on the lock, then rehydrate the session
+            self._hibernating.add(session_id)
+            try:
+                state = await session.hibernate()
+                try:
+                    await self.hibernator.write_state(session_id, state)
+                except Exception as e:
+                    logger.error(f"Failed to hibernate session {session_id}: {e}")
+                    await session.rehydrate(state)
+                    return False
+                del self.sessions[session_id]
+                self.hibernated[session_id] = HibernatedSession(session_id, session.websocket, session.project_path)
+                return True
+            finally:
+                self._hibernating.discard(session_id)
+    
+    def detach_websocket(self, session_id: str) -> None:
+        """Forget the websocket of a session whose connection closed (the session may be reconnected)."""
+        if session_id in self.hibernated:
+            self.hibernated[session_id].websocket = None
+        elif session_id in self.sessions:
+            self.sessions[session_id].websocket = None
+    
+    def _start_hibernation_sweeps(self) -> None:
+        if not self.hibernator.config.enabled:
+            return
+        if self._hibernation_task is None or self._hibernation_task.done():
+            self._hibernation_task = asyncio.create_task(self._hibernation_loop())
+    
+    async def _hibernation_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.hibernator.config.check_interval)
+            try:
+                await self.hibernate_idle_sessions()
+            except Exception as e:
+                logger.error(f"Error while hibernating idle sessions: {e}")
+    
+    def get_hibernation_stats(self) -> Dict[str, Any]:
+        """Sessions in memory and hibernated, and hibernation counters."""
+        return {
+            "active_sessions": len(self.sessions),
+            "hibernated_sessions": len(self.hibernated),
+            **self.hibernator.stats,
+        }
+    
     async def cleanup_session(self, session_id: str) -> None:
         """
         Clean up a session and remove it from tracking.
@@ -2287,6 +2418,19 @@ class StatelessSessionManager:
             session_id: The session ID to clean up
         """
         async with self._lock:
+            stub = self.hibernated.pop(session_id, None)
+            if stub:
+                self.hibernator.discard(session_id)
+                get_channel_integration().clear_session(session_id)
+                if self.shared_state is not None:
+                    await self.shared_state.run(self.shared_state.unregister_session, session_id)
+                if stub.websocket in self.websocket_sessions:
+                    del self.websocket_sessions[stub.websocket]
+                logger.info(f"Cleaned up hibernated session {session_id}")
+                if self.journal is not None:
+                    self.journal.record_closed(session_id)
+                return
+            
             session = self.sessions.get(session_id)
             if session:
                 try:
@@ -2296,6 +2440,8 @@ class StatelessSessionManager:
                     # Continue with cleanup even if session cleanup fails
                 
                 del self.sessions[session_id]
+                if self.shared_state is not None:
+                    await self.shared_state.run(self.shared_state.unregister_session, session_id)
                 
                 # Remove WebSocket mapping
                 ws_to_remove = None
@@ -2308,8 +2454,8 @@ class StatelessSessionManager:
                 
                 logger.info(f"Cleaned up session {session_id}")
                 
-                # Save sessions
-                self._save_sessions()
+                if self.journal is not None:
+                    self.journal.record_closed(session_id)
     
     async def cleanup_websocket(self, websocket: WebSocket) -> None:
         """
@@ -2324,9 +2470,13 @@ class StatelessSessionManager:
     
     async def cleanup_all(self) -> None:
         """Clean up all sessions"""
-        session_ids = list(self.sessions.keys())
+        if self._hibernation_task is not None:
+            self._hibernation_task.cancel()
+        session_ids = list(self.sessions.keys()) + list(self.hibernated.keys())
         for session_id in session_ids:
             await self.cleanup_session(session_id)
+        if self.journal is not None:
+            await self.journal.aclose()
     
     def get_active_sessions_count(self) -> int:
         """Get the count of active sessions"""
@@ -0,0 +1,161 @@
+"""
+Benchmark: concurrent sessions per core in multi-worker mode.
+
+Starts the mock OpenRouter server and the front door (api/frontdoor.py) with W
+workers pointed at it, then ramps the number of concurrent websocket sessions.
+Each session sends ``--turns`` messages one after another; a turn is timed from
+sendUserMessage to its JSON-RPC response (the whole agent turn, including the
+streamed notifications). A level passes when no turn failed and the p95 turn
+latency is within ``--slo-ms``. The highest passing level divided by the number
+of workers is the sessions-per-core figure (one worker per core).
+
+Run it with --workers 1 and --workers N on the same box to see how the front
+door scales.
+
+Usage:
+    python benchmarks/bench_sessions_per_core.py --workers 4 --levels 16,32,64,128 --slo-ms 5000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import aiohttp
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+async def _wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+async def _call(ws, ids, method: str, params: dict) -> dict:
+    """Send a JSON-RPC request and skip notifications until its response arrives."""
+    request_id = next(ids)
+    await ws.send_json({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+    while True:
+        message = await ws.receive()
+        if message.type != aiohttp.WSMsgType.TEXT:
+            raise RuntimeError(f"Websocket closed during {method}")
+        frame = json.loads(message.data)
+        if frame.get("id") == request_id:
+            if "error" in frame:
+                raise RuntimeError(f"{method} failed: {frame['error']}")
+            return frame.get("result") or {}
+
+
+async def _session(http: aiohttp.ClientSession, url: str, turns: int, latencies: list) -> int:
+    """Run one session; returns the number of failed turns."""
+    ids = itertools.count(1)
+    failures = 0
+    try:
+        async with http.ws_connect(url, max_msg_size=0) as ws:
+            started = await _call(ws, ids, "startSession", {"userId": "bench", "sessionParams": {"language": "en"}})
+            for turn in range(turns):
+                begin = time.perf_counter()
+                try:
+                    await _call(ws, ids, "sendUserMessage",
+                                {"sessionId": started["sessionId"], "message": f"Benchmark message {turn}"})
+                    latencies.append(time.perf_counter() - begin)
+                except RuntimeError:
+                    failures += 1
+    except (aiohttp.ClientError, RuntimeError, KeyError):
+        failures += turns
+    return failures
+
+
+async def _run_level(url: str, sessions: int, turns: int, slo_ms: float) -> dict:
+    latencies: list = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        started = time.perf_counter()
+        failures = sum(await asyncio.gather(*(_session(http, url, turns, latencies) for _ in range(sessions))))
+        wall = time.perf_counter() - started
+    latencies.sort()
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000 if latencies else float("inf")
+    return {
+        "sessions": sessions,
+        "turns": len(latencies),
+        "failed_turns": failures,
+        "turn_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        "turn_p95_ms": round(p95, 2) if latencies else None,
+        "turns_per_s": round(len(latencies) / wall, 2),
+        "wall_s": round(wall, 3),
+        "passed": failures == 0 and p95 <= slo_ms,
+    }
+
+
+async def main(args):
+    env = dict(os.environ)
+    env["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}/api/v1"
+    env.setdefault("OPENROUTER_API_KEY", "bench")
+
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "ai_whisperer.services.ai.mock_openrouter", "--port", str(args.mock_port),
+         "--tokens-per-second", str(args.tokens_per_second), "--ttft-ms", str(args.ttft_ms),
+         "--tool-call-probability", "0"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    state_dir = tempfile.TemporaryDirectory()
+    front_door = subprocess.Popen(
+        [sys.executable, str(REPO_ROOT / "api" / "frontdoor.py"), "--workers", str(args.workers),
+         "--port", str(args.port), "--base-port", str(args.base_port), "--config", args.config,
+         "--shared-state", str(Path(state_dir.name) / "shared_state.db")],
+        env=env, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    results = []
+    try:
+        await _wait_for_port(args.mock_port, 30)
+        await _wait_for_port(args.port, 60 + 30 * args.workers)
+        url = f"http://127.0.0.1:{args.port}/ws"
+        for sessions in (int(level) for level in args.levels.split(",")):
+            result = await _run_level(url, sessions, args.turns, args.slo_ms)
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+            if not result["passed"]:
+                break
+    finally:
+        front_door.terminate()
+        front_door.wait(timeout=30)
+        mock.terminate()
+        state_dir.cleanup()
+
+    best = max((r["sessions"] for r in results if r["passed"]), default=0)
+    print(json.dumps({
+        "workers": args.workers,
+        "cpu_count": os.cpu_count(),
+        "slo_p95_ms": args.slo_ms,
+        "max_sessions": best,
+        "sessions_per_core": round(best / args.workers, 1),
+        "levels": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--levels", default="8,16,32,64,128", help="Comma-separated session counts, ramped in order")
+    parser.add_argument("--turns", type=int, default=3, help="Messages per session")
+    parser.add_argument("--slo-ms", type=float, default=5000, help="p95 turn latency a level must stay within")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Mock model generation speed")
+    parser.add_argument("--ttft-ms", type=float, default=100, help="Mock model time-to-first-token")
+    parser.add_argument("--config", default="config/main.yaml")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--base-port", type=int, default=8910)
+    parser.add_argument("--mock-port", type=int, default=8787)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,199 @@
+"""
+Benchmark: SSE decoding of long chat-completion streams.
+
+Replays a recorded stream (a raw SSE byte capture) split into network-sized
+reads and decodes it with:
+
+- lines:   the previous approach (incremental UTF-8 decode, split into str
+           lines, slice off "data: ", json.loads, one AIStreamChunk per event)
+- decoder: ai_whisperer.services.ai.sse.SSEDecoder on the raw bytes, one
+           AIStreamChunk per event
+- coalesced: SSEDecoder plus coalesce_deltas() per read, as used by
+           OpenRouterAIService.stream_chat_completion
+
+Without --recording a synthetic OpenRouter-style recording is generated
+(reasoning deltas, keep-alive comments, a streamed tool call, content tokens).
+Reports decode throughput, chunks handed to the consumer and the cost of
+forwarding each chunk as a StreamingUpdate notification, as JSON.
+
+Usage:
+    python benchmarks/bench_sse_decoder.py --tokens 20000 --repeat 5
+    python benchmarks/bench_sse_decoder.py --recording captured_stream.sse
+"""
+
+import argparse
+import codecs
+import json
+import random
+import statistics
+import time
+
+from ai_whisperer.services.ai.base import AIStreamChunk
+from ai_whisperer.services.ai.sse import SSEDecoder, SSE_DONE, coalesce_deltas
+
+
+def _event(delta: dict, finish_reason=None) -> bytes:
+    chunk = {
+        "id": "gen-bench",
+        "provider": "bench",
+        "model": "bench/model",
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+def build_recording(tokens: int, seed: int) -> bytes:
+    """Build a synthetic OpenRouter stream with ``tokens`` content deltas."""
+    rng = random.Random(seed)
+    words = ["the", "agent", "reads", "file", "and", "writes", "a", "plan", "é", "→", "\n"]
+    parts = [b": OPENROUTER PROCESSING\n\n"]
+    for i in range(tokens // 10):
+        parts.append(_event({"role": "assistant", "content": "", "reasoning": f"step {i} "}))
+    args = json.dumps({"path": "src/main.py", "limit": 200})
+    parts.append(_event({"tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                                         "function": {"name": "read_file", "arguments": ""}}]}))
+    for i in range(0, len(args), 4):
+        parts.append(_event({"tool_calls": [{"index": 0, "function": {"arguments": args[i:i + 4]}}]}))
+    for i in range(tokens):
+        if i % 500 == 0:
+            parts.append(b": OPENROUTER PROCESSING\n\n")
+        parts.append(_event({"role": "assistant", "content": rng.choice(words) + " "}))
+    parts.append(_event({}, "stop"))
+    parts.append(b"data: [DONE]\n\n")
+    return b"".join(parts)
+
+
+def split_reads(recording: bytes, read_size: int, seed: int) -> list:
+    """Split the recording into reads of random size up to ``read_size`` bytes."""
+    rng = random.Random(seed)
+    reads, pos = [], 0
+    while pos < len(recording):
+        size = rng.randint(1, read_size)
+        reads.append(recording[pos:pos + size])
+        pos += size
+    return reads
+
+
+def _to_chunk(data: dict) -> AIStreamChunk:
+    choice = data["choices"][0]
+    delta = choice.get("delta", {})
+    return AIStreamChunk(
+        delta_content=delta.get("content"),
+        delta_tool_call_part=delta.get("tool_calls"),
+        finish_reason=choice.get("finish_reason"),
+        delta_reasoning=delta.get("reasoning"),
+    )
+
+
+def run_lines(reads: list) -> list:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    out = []
+    for data in reads:
+        text = pending + decoder.decode(data)
+        lines = text.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.startswith("data: "):
+                json_str = line[6:].strip()
+                if json_str == "[DONE]":
+                    return out
+                out.append(_to_chunk(json.loads(json_str)))
+    return out
+
+
+def run_decoder(reads: list, coalesce: bool) -> list:
+    decoder = SSEDecoder()
+    out = []
+    for data in reads:
+        batch = []
+        done = False
+        for payload in decoder.feed(data):
+            if payload is SSE_DONE:
+                done = True
+                break
+            batch.append(json.loads(payload.decode("utf-8")))
+        if coalesce:
+            batch = coalesce_deltas(batch)
+        out.extend(_to_chunk(c) for c in batch)
+        if done:
+            break
+    return out
+
+
+def _text(chunks: list) -> str:
+    return "".join(c.delta_content or "" for c in chunks)
+
+
+def forward(chunks: list) -> int:
+    """Serialize each chunk the way send_chunk forwards it to the websocket."""
+    sent = 0
+    for i, chunk in enumerate(chunks):
+        if chunk.delta_content:
+            sent += len(json.dumps({
+                "jsonrpc": "2.0",
+                "method": "StreamingUpdate",
+                "params": {"sessionId": "bench", "content": chunk.delta_content,
+                           "index": i, "is_final": False},
+            }))
+    return sent
+
+
+def measure(name: str, fn, reads: list, repeat: int, total_bytes: int, reference: str) -> dict:
+    decode_timings = []
+    forward_timings = []
+    chunks = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = fn(reads)
+        decoded = time.perf_counter()
+        forward(chunks)
+        decode_timings.append(decoded - started)
+        forward_timings.append(time.perf_counter() - decoded)
+    assert _text(chunks) == reference, f"{name} produced different content"
+    best = min(decode_timings)
+    return {
+        "decoder": name,
+        "chunks_emitted": len(chunks),
+        "decode_best_ms": round(best * 1000, 2),
+        "decode_median_ms": round(statistics.median(decode_timings) * 1000, 2),
+        "decode_mb_per_s": round(total_bytes / best / (1024 * 1024), 1),
+        "forward_best_ms": round(min(forward_timings) * 1000, 2),
+    }
+
+
+def main(args):
+    if args.recording:
+        with open(args.recording, "rb") as f:
+            recording = f.read()
+    else:
+        recording = build_recording(args.tokens, args.seed)
+    if args.save_recording:
+        with open(args.save_recording, "wb") as f:
+            f.write(recording)
+
+    reads = split_reads(recording, args.read_size, args.seed)
+    reference = _text(run_lines(reads))
+
+    results = {
+        "recording_bytes": len(recording),
+        "reads": len(reads),
+        "results": [
+            measure("lines", run_lines, reads, args.repeat, len(recording), reference),
+            measure("decoder", lambda r: run_decoder(r, False), reads, args.repeat, len(recording), reference),
+            measure("coalesced", lambda r: run_decoder(r, True), reads, args.repeat, len(recording), reference),
+        ],
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000, help="Content deltas in the synthetic recording")
+    parser.add_argument("--read-size", type=int, default=4096, help="Maximum bytes per simulated network read")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--recording", help="Replay a raw SSE capture instead of a synthetic stream")
+    parser.add_argument("--save-recording", help="Write the replayed recording to this path")
+    main(parser.parse_args())
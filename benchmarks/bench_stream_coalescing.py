@@ -0,0 +1,154 @@
+"""
+Benchmark: forwarding long streamed responses to a websocket client.
+
+Streams a synthetic response through StatelessAILoop._process_stream into a
+callback shaped like send_chunk in api/stateless_session_manager.py (append
+the delta, serialize the accumulated content as a StreamingUpdate frame) and
+compares:
+
+- per_delta: the previous behaviour, one callback and frame per delta, with
+             the accumulated content rebuilt by ''.join on every delta
+- coalesced: StreamBuffer accumulation plus ChunkCoalescer batching deltas
+             on a time/byte window (stream_coalescing config)
+
+Tokens arrive in network-sized bursts at a fixed rate. Reports frames sent,
+bytes serialized, CPU time and event loop lag as JSON.
+
+Usage:
+    python benchmarks/bench_stream_coalescing.py --tokens 20000 --tokens-per-second 4000
+    python benchmarks/bench_stream_coalescing.py --window-ms 16 --max-bytes 256
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from ai_whisperer.services.ai.base import AIStreamChunk
+from ai_whisperer.services.execution.ai_config import AIConfig
+from ai_whisperer.services.execution.ai_loop import StatelessAILoop
+from ai_whisperer.services.execution.stream_buffer import StreamBuffer, StreamCoalescerConfig, configure_stream_coalescing
+
+
+async def synthetic_stream(tokens: int, tokens_per_second: float, burst: int, seed: int):
+    """Yield content deltas in bursts of ``burst`` tokens at ``tokens_per_second``."""
+    rng = random.Random(seed)
+    words = ["the", "agent", "reads", "file", "and", "writes", "a", "plan", "é", "→", "\n"]
+    interval = burst / tokens_per_second
+    for i in range(tokens):
+        yield AIStreamChunk(delta_content=rng.choice(words) + " ")
+        if (i + 1) % burst == 0:
+            await asyncio.sleep(interval)
+    yield AIStreamChunk(finish_reason="stop")
+
+
+class FrameSink:
+    """Stand-in for send_chunk: accumulates and serializes one frame per call."""
+
+    def __init__(self, lazy: bool):
+        self.lazy = lazy
+        self.buffer = StreamBuffer() if lazy else []
+        self.frames = 0
+        self.bytes_sent = 0
+
+    async def __call__(self, chunk: str):
+        self.buffer.append(chunk)
+        accumulated = self.buffer.getvalue() if self.lazy else "".join(self.buffer)
+        frame = json.dumps({
+            "jsonrpc": "2.0",
+            "method": "StreamingUpdate",
+            "params": {"type": "streaming_chunk", "content": accumulated, "sessionId": "bench",
+                       "isPartial": True, "format": "text", "rawContent": True},
+        })
+        self.frames += 1
+        self.bytes_sent += len(frame)
+
+
+async def _lag_monitor(samples: list, interval: float = 0.005):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def run_mode(name: str, args) -> dict:
+    configure_stream_coalescing({
+        "enabled": name == "coalesced",
+        "window_ms": args.window_ms,
+        "max_bytes": args.max_bytes,
+    })
+    loop = StatelessAILoop(AIConfig(api_key="bench", model_id="bench/model"), ai_service=None)
+    sink = FrameSink(lazy=name == "coalesced")
+    lag = []
+    monitor = asyncio.ensure_future(_lag_monitor(lag))
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    result = await loop._process_stream(
+        synthetic_stream(args.tokens, args.tokens_per_second, args.burst, args.seed),
+        on_stream_chunk=sink,
+    )
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+    monitor.cancel()
+    lag.sort()
+    return {
+        "mode": name,
+        "response_chars": len(result["response"] or ""),
+        "frames": sink.frames,
+        "bytes_serialized": sink.bytes_sent,
+        "wall_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 3),
+        "loop_lag_p99_ms": round(lag[int(len(lag) * 0.99)] * 1000, 2) if lag else None,
+        "loop_lag_max_ms": round(lag[-1] * 1000, 2) if lag else None,
+    }
+
+
+def bench_accumulation(tokens: int, repeat: int) -> dict:
+    """Cost of accumulate-and-read per delta: list + join versus StreamBuffer."""
+    deltas = ["token "] * tokens
+    timings = {}
+    for name in ("join_per_delta", "stream_buffer"):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            if name == "join_per_delta":
+                parts = []
+                for delta in deltas:
+                    parts.append(delta)
+                    "".join(parts)
+            else:
+                buffer = StreamBuffer()
+                for i, delta in enumerate(deltas):
+                    buffer.append(delta)
+                    if i % 32 == 0:  # Read once per coalesced flush
+                        buffer.getvalue()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name + "_ms"] = round(best * 1000, 2)
+    return timings
+
+
+async def main(args):
+    results = [await run_mode("per_delta", args), await run_mode("coalesced", args)]
+    baseline, coalesced = results
+    print(json.dumps({
+        "tokens": args.tokens,
+        "tokens_per_second": args.tokens_per_second,
+        "window_ms": args.window_ms,
+        "max_bytes": args.max_bytes,
+        "results": results,
+        "frame_reduction": round(baseline["frames"] / max(coalesced["frames"], 1), 1),
+        "accumulation": bench_accumulation(args.tokens, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=20000)
+    parser.add_argument("--tokens-per-second", type=float, default=4000.0)
+    parser.add_argument("--burst", type=int, default=8, help="Tokens delivered per network read")
+    parser.add_argument("--window-ms", type=float, default=StreamCoalescerConfig.window_ms)
+    parser.add_argument("--max-bytes", type=int, default=StreamCoalescerConfig.max_bytes)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
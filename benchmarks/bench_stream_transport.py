@@ -0,0 +1,174 @@
+"""
+Benchmark: OpenRouter streaming transport (thread-per-request vs native asyncio).
+
+Starts a local SSE server that mimics /api/v1/chat/completions and runs N
+concurrent streamed completions through:
+
+- threaded: the previous transport (blocking requests.post(stream=True) in a
+  daemon thread, chunks handed back with loop.call_soon_threadsafe)
+- native:   OpenRouterAIService._stream_internal on the pooled httpx.AsyncClient
+
+The server runs in a separate process. Reports peak thread count, time-to-first-
+token (p50/p95), wall time and, with --trace-memory, peak traced memory.
+
+Usage:
+    python benchmarks/bench_stream_transport.py --concurrency 200 --tokens 200
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import threading
+import time
+import tracemalloc
+
+import requests
+from aiohttp import web
+
+from ai_whisperer.services.ai.http_pool import get_http_pool
+from ai_whisperer.services.ai.openrouter import OpenRouterAIService
+from ai_whisperer.services.execution.ai_config import AIConfig
+
+
+async def _sse_handler(request: web.Request) -> web.StreamResponse:
+    params = request.app["params"]
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    await asyncio.sleep(params["ttft"])
+    for i in range(params["tokens"]):
+        chunk = {"choices": [{"delta": {"content": f"tok{i} "}, "finish_reason": None}]}
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if params["interval"]:
+            await asyncio.sleep(params["interval"])
+    final = {"choices": [{"delta": {}, "finish_reason": "stop"}]}
+    await response.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+    return response
+
+
+def _serve(port: int, params: dict) -> None:
+    """Run the SSE server in its own process so it does not share the client's loop."""
+    app = web.Application()
+    app["params"] = params
+    app.router.add_post("/api/v1/chat/completions", _sse_handler)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+async def _wait_for_server(url: str) -> None:
+    for _ in range(100):
+        try:
+            await asyncio.to_thread(requests.get, url, timeout=0.5)
+            return
+        except requests.exceptions.ConnectionError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError(f"Benchmark server did not start at {url}")
+
+
+async def _threaded_stream(url: str, payload: dict):
+    """Reproduction of the previous thread-per-request transport."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def run_sync():
+        try:
+            response = requests.post(url, json=payload, stream=True, timeout=60)
+            for line in response.iter_lines():
+                if line and line.startswith(b"data: "):
+                    json_str = line.decode("utf-8")[6:].strip()
+                    if json_str == "[DONE]":
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, json.loads(json_str))
+            loop.call_soon_threadsafe(queue.put_nowait, StopAsyncIteration)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    threading.Thread(target=run_sync, daemon=True).start()
+    while True:
+        item = await queue.get()
+        if item is StopAsyncIteration:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+
+
+async def _run_transport(name: str, make_stream, concurrency: int, trace_memory: bool) -> dict:
+    peak_threads = threading.active_count()
+    stop = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not stop.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.005)
+
+    async def one():
+        start = time.perf_counter()
+        ttft = None
+        async for _ in make_stream():
+            if ttft is None:
+                ttft = time.perf_counter() - start
+        return ttft
+
+    sampler = asyncio.create_task(sample_threads())
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    ttfts = await asyncio.gather(*(one() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    peak_mem = 0
+    if trace_memory:
+        _, peak_mem = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    stop.set()
+    await sampler
+
+    ttfts = sorted(t for t in ttfts if t is not None)
+    return {
+        "transport": name,
+        "concurrency": concurrency,
+        "peak_threads": peak_threads,
+        "peak_traced_mb": round(peak_mem / (1024 * 1024), 2),
+        "ttft_p50_ms": round(statistics.median(ttfts) * 1000, 2),
+        "ttft_p95_ms": round(ttfts[int(len(ttfts) * 0.95) - 1] * 1000, 2),
+        "wall_s": round(wall, 3),
+    }
+
+
+async def main(args):
+    params = {"tokens": args.tokens, "ttft": args.ttft, "interval": args.interval}
+    server = multiprocessing.Process(target=_serve, args=(args.port, params), daemon=True)
+    server.start()
+    url = f"http://127.0.0.1:{args.port}/api/v1/chat/completions"
+    await _wait_for_server(url)
+
+    service = OpenRouterAIService(AIConfig(api_key="bench", model_id="bench/model",
+                                           base_url=url.rsplit("/chat/completions", 1)[0]))
+    payload = service._build_payload([{"role": "user", "content": "hi"}])
+    payload["stream"] = True
+
+    try:
+        results = [
+            await _run_transport("threaded", lambda: _threaded_stream(url, payload),
+                                 args.concurrency, args.trace_memory),
+            await _run_transport("native", lambda: service._stream_internal(payload),
+                                 args.concurrency, args.trace_memory),
+        ]
+    finally:
+        await get_http_pool().aclose()
+        server.terminate()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--ttft", type=float, default=0.05, help="Server time-to-first-token (s)")
+    parser.add_argument("--interval", type=float, default=0.001, help="Delay between tokens (s)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record peak traced memory (slows both transports considerably)")
+    asyncio.run(main(parser.parse_args()))
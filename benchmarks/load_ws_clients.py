@@ -0,0 +1,291 @@
+"""
+Load test: N simulated websocket clients against one interactive server.
+
+Starts the mock OpenRouter server and ``api/main.py`` pointed at it (or uses
+the server at ``--url``), then opens ``--clients`` websocket connections,
+ramped up over ``--ramp-s``. Each client starts a session and plays a scripted
+conversation ``--rounds`` times: user messages, agent switches and
+channel-history calls. Every JSON-RPC call is timed from request to response;
+every frame the clients receive (responses and notifications) is counted.
+
+A separate connection samples the server's ``server.stats`` every
+``--sample-interval`` seconds for its resident memory and event loop lag.
+
+The report is JSON (stdout, and ``--output`` if given) with p50/p95/p99 latency
+per method, frames and bytes per second, and the server's RSS and loop lag, so
+runs can be compared.
+
+Scripts are JSON: a list of conversations, each a list of steps, one of
+{"say": "text"}, {"switch": "d"}, {"history": {"limit": 20}} or
+{"pause_ms": 500}. Client i plays conversation i modulo their number.
+
+Usage:
+    python benchmarks/load_ws_clients.py --clients 50 --rounds 2 --output load.json
+    python benchmarks/load_ws_clients.py --url ws://127.0.0.1:8000/ws --clients 200 --ramp-s 20
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import aiohttp
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_SCRIPT = [
+    [
+        {"say": "Hello! What can you help me with today?"},
+        {"history": {"limit": 20}},
+        {"say": "Summarise the purpose of this project in two sentences."},
+        {"switch": "d"},
+        {"say": "Check whether the last answer looked healthy."},
+        {"switch": "a"},
+        {"history": {"limit": 50}},
+    ],
+    [
+        {"say": "I want to plan a small refactoring. Where should I start?"},
+        {"say": "List three risks of that approach."},
+        {"history": {"channels": ["final"], "limit": 10}},
+        {"switch": "d"},
+        {"history": {"limit": 10}},
+        {"switch": "a"},
+    ],
+]
+
+
+def _percentile(values: list, q: float):
+    if not values:
+        return None
+    return round(values[min(int(len(values) * q), len(values) - 1)] * 1000, 2)
+
+
+class LoadStats:
+    """Latencies, errors and frame counts of all clients."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)  # method -> seconds
+        self.errors = defaultdict(int)  # method -> failed calls
+        self.frames = 0
+        self.bytes = 0
+        self.clients_completed = 0
+        self.clients_failed = 0
+
+    def report(self) -> dict:
+        methods = {}
+        for method in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[method])
+            methods[method] = {
+                "count": len(values),
+                "errors": self.errors[method],
+                "p50_ms": _percentile(values, 0.50),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+                "max_ms": round(values[-1] * 1000, 2) if values else None,
+            }
+        return methods
+
+
+class CallError(RuntimeError):
+    pass
+
+
+class Client:
+    """One simulated websocket client playing a scripted conversation."""
+
+    def __init__(self, index: int, ws, stats: LoadStats, timeout: float):
+        self.index = index
+        self.ws = ws
+        self.stats = stats
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+        self.session_id = None
+
+    async def call(self, method: str, params: dict) -> dict:
+        """Send a JSON-RPC request and read frames until its response arrives."""
+        request_id = next(self.ids)
+        started = time.perf_counter()
+        await self.ws.send_json({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        deadline = started + self.timeout
+        while True:
+            message = await self.ws.receive(timeout=max(deadline - time.perf_counter(), 0.001))
+            if message.type not in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                self.stats.errors[method] += 1
+                raise CallError(f"Websocket closed during {method}")
+            self.stats.frames += 1
+            self.stats.bytes += len(message.data)
+            if message.type != aiohttp.WSMsgType.TEXT:
+                continue
+            frame = json.loads(message.data)
+            if frame.get("id") != request_id:
+                continue
+            result = frame.get("result")
+            if "error" in frame or (isinstance(result, dict) and result.get("error")):
+                self.stats.errors[method] += 1
+                return {}
+            self.stats.latencies[method].append(time.perf_counter() - started)
+            return result or {}
+
+    async def run(self, conversation: list, rounds: int) -> None:
+        started = await self.call("startSession", {"userId": f"load-{self.index}", "sessionParams": {"language": "en"}})
+        self.session_id = started.get("sessionId")
+        if not self.session_id:
+            raise CallError("startSession returned no sessionId")
+        for round_index in range(rounds):
+            for step in conversation:
+                if "say" in step:
+                    await self.call("sendUserMessage", {"sessionId": self.session_id,
+                                                        "message": f"{step['say']} (client {self.index}, round {round_index})"})
+                elif "switch" in step:
+                    await self.call("session.switch_agent", {"sessionId": self.session_id, "agent_id": step["switch"]})
+                elif "history" in step:
+                    await self.call("channel.history", {"sessionId": self.session_id, **(step["history"] or {})})
+                elif "pause_ms" in step:
+                    await asyncio.sleep(step["pause_ms"] / 1000)
+
+
+async def _client(index: int, http, url: str, conversation: list, args, stats: LoadStats) -> None:
+    await asyncio.sleep(args.ramp_s * index / max(args.clients, 1))
+    try:
+        async with http.ws_connect(url, max_msg_size=0) as ws:
+            await Client(index, ws, stats, args.timeout_s).run(conversation, args.rounds)
+        stats.clients_completed += 1
+    except (aiohttp.ClientError, asyncio.TimeoutError, CallError, ValueError) as e:
+        stats.clients_failed += 1
+        print(f"client {index} failed: {e!r}", file=sys.stderr)
+
+
+async def _sample_server(http, url: str, interval: float, samples: list, done: asyncio.Event) -> dict:
+    """Poll server.stats until ``done``; returns the last sample (with the loop lag of the whole run)."""
+    async with http.ws_connect(url) as ws:
+        client = Client(-1, ws, LoadStats(), timeout=30)
+        samples.append(await client.call("server.stats", {"reset": True}))
+        while not done.is_set():
+            try:
+                await asyncio.wait_for(done.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            samples.append(await client.call("server.stats", {}))
+    return samples[-1]
+
+
+async def _wait_for_port(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+
+
+async def run_load(url: str, script: list, args) -> dict:
+    stats = LoadStats()
+    samples: list = []
+    done = asyncio.Event()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        sampler = asyncio.ensure_future(_sample_server(http, url, args.sample_interval, samples, done))
+        while not samples and not sampler.done():
+            await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await asyncio.gather(*(_client(i, http, url, script[i % len(script)], args, stats)
+                               for i in range(args.clients)))
+        wall = time.perf_counter() - started
+        done.set()
+        try:
+            await sampler
+        except Exception as e:
+            print(f"server.stats sampling failed: {e!r}", file=sys.stderr)
+
+    rss = [sample.get("rss_mb") for sample in samples if sample.get("rss_mb")]
+    return {
+        "clients": args.clients,
+        "clients_completed": stats.clients_completed,
+        "clients_failed": stats.clients_failed,
+        "rounds": args.rounds,
+        "wall_s": round(wall, 3),
+        "methods": stats.report(),
+        "frames_received": stats.frames,
+        "frames_per_s": round(stats.frames / wall, 1) if wall else None,
+        "bytes_received": stats.bytes,
+        "bytes_per_s": round(stats.bytes / wall, 1) if wall else None,
+        "server": {
+            "rss_mb_start": rss[0] if rss else None,
+            "rss_mb_peak": max(rss) if rss else None,
+            "rss_mb_end": rss[-1] if rss else None,
+            "sessions_peak": max((sample.get("sessions", 0) for sample in samples), default=None),
+            "loop_lag_ms": samples[-1].get("loop_lag_ms") if samples else None,
+        },
+    }
+
+
+async def main(args):
+    script = json.loads(Path(args.script).read_text()) if args.script else DEFAULT_SCRIPT
+    processes = []
+    url = args.url
+    if url is None:
+        env = dict(os.environ)
+        env["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{args.mock_port}/api/v1"
+        env.setdefault("OPENROUTER_API_KEY", "load-test")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "ai_whisperer.services.ai.mock_openrouter", "--port", str(args.mock_port),
+             "--tokens-per-second", str(args.tokens_per_second), "--ttft-ms", str(args.ttft_ms),
+             "--tool-call-probability", str(args.tool_call_probability)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        processes.append(subprocess.Popen(
+            [sys.executable, str(REPO_ROOT / "api" / "main.py"), "--port", str(args.port), "--config", args.config],
+            env=env, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        url = f"ws://127.0.0.1:{args.port}/ws"
+
+    try:
+        if args.url is None:
+            await _wait_for_port(args.mock_port, 30)
+            await _wait_for_port(args.port, 120)
+        report = await run_load(url, script, args)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report["config"] = {
+        "url": url,
+        "ramp_s": args.ramp_s,
+        "conversations": len(script),
+        "tokens_per_second": args.tokens_per_second if args.url is None else None,
+        "ttft_ms": args.ttft_ms if args.url is None else None,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=1, help="Times each client plays its conversation")
+    parser.add_argument("--ramp-s", type=float, default=5.0, help="Seconds over which clients connect")
+    parser.add_argument("--script", help="JSON file of scripted conversations (default: built-in)")
+    parser.add_argument("--timeout-s", type=float, default=120, help="Timeout of one JSON-RPC call")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between server.stats samples")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--url", help="Websocket URL of a running server (default: start one)")
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Mock model generation speed")
+    parser.add_argument("--ttft-ms", type=float, default=100, help="Mock model time-to-first-token")
+    parser.add_argument("--tool-call-probability", type=float, default=0.0, help="Share of mock turns with tool calls")
+    parser.add_argument("--config", default="config/main.yaml")
+    parser.add_argument("--port", type=int, default=8950)
+    parser.add_argument("--mock-port", type=int, default=8787)
+    asyncio.run(main(parser.parse_args()))
@@ -2,13 +2,15 @@
 Channel integration for AIWhisperer sessions.
 """
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
 from datetime import datetime
 
 from .types import ChannelType, ChannelMessage
 from .router import ChannelRouter
-from .storage import ChannelStorage
+from .storage import ChannelStorage, SharedChannelStorage
+from ai_whisperer.services.cluster.shared_state import get_shared_state
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +20,8 @@ class ChannelIntegration:
     
     def __init__(self):
         """Initialize channel integration."""
-        self._storage = ChannelStorage()
+        store = get_shared_state()
+        self._storage = SharedChannelStorage(store) if store is not None else ChannelStorage()
         self._routers: Dict[str, ChannelRouter] = {}
         self._visibility_preferences: Dict[str, Dict[str, bool]] = {}
         
@@ -157,6 +160,18 @@ class ChannelIntegration:
             "totalCount": len(messages)
         }
     
+    async def aget_channel_history(
+        self,
+        session_id: str,
+        channels: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        since_sequence: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Get channel message history from the event loop (shared storage is read on a thread)."""
+        if isinstance(self._storage, SharedChannelStorage):
+            return await asyncio.to_thread(self.get_channel_history, session_id, channels, limit, since_sequence)
+        return self.get_channel_history(session_id, channels, limit, since_sequence)
+    
     def set_visibility_preferences(
         self, 
         session_id: str, 
@@ -186,6 +201,7 @@ class ChannelIntegration:
         self._storage.clear_session(session_id)
         
         # Clear routers
+        self._routers.pop(session_id, None)
         keys_to_remove = [k for k in self._routers if k.startswith(f"{session_id}:")]
         for key in keys_to_remove:
             del self._routers[key]
@@ -195,19 +211,52 @@ class ChannelIntegration:
         
         logger.info(f"Cleared all channel data for session {session_id}")
     
+    def hibernate_session(self, session_id: str) -> Dict[str, Any]:
+        """Release the in-memory channel data of a session and return it serialized."""
+        router = self._routers.pop(session_id, None)
+        return {
+            "sequence": router._sequence_counter if router else 0,
+            "visibility": self._visibility_preferences.pop(session_id, None),
+            "messages": self._storage.pop_session(session_id),
+        }
+    
+    def rehydrate_session(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Restore channel data returned by hibernate_session()."""
+        self._storage.restore_session(session_id, state.get("messages", []))
+        if state.get("visibility"):
+            self._visibility_preferences[session_id] = state["visibility"]
+        if state.get("sequence"):
+            # Continue the sequence numbers of the stored messages
+            self.get_router(session_id)._sequence_counter = state["sequence"]
+    
     def get_session_stats(self, session_id: str) -> Dict[str, Any]:
         """Get statistics for a session."""
         stats = self._storage.get_session_stats(session_id)
         stats["visibility"] = self.get_visibility_preferences(session_id)
         return stats
     
+    async def aget_session_stats(self, session_id: str) -> Dict[str, Any]:
+        """Get statistics for a session from the event loop."""
+        stats = await self._storage.aget_session_stats(session_id)
+        stats["visibility"] = self.get_visibility_preferences(session_id)
+        return stats
+    
     def cleanup_old_sessions(self, max_age_hours: int = 24) -> int:
         """Clean up old sessions."""
         cleaned = self._storage.cleanup_old_sessions(max_age_hours)
-        
-        # Also clean up routers and preferences for cleaned sessions
-        active_sessions = self._storage.get_active_sessions()
-        
+        self._forget_inactive_sessions(self._storage.get_active_sessions())
+        logger.info(f"Cleaned up {cleaned} sessions and related data")
+        return cleaned
+    
+    async def acleanup_old_sessions(self, max_age_hours: int = 24) -> int:
+        """Clean up old sessions from the event loop."""
+        cleaned = await self._storage.acleanup_old_sessions(max_age_hours)
+        self._forget_inactive_sessions(await self._storage.aget_active_sessions())
+        logger.info(f"Cleaned up {cleaned} sessions and related data")
+        return cleaned
+    
+    def _forget_inactive_sessions(self, active_sessions: Set[str]) -> None:
+        """Clean up routers and preferences of sessions without stored messages."""
         # Clean routers
         router_keys_to_remove = []
         for key in self._routers:
@@ -226,9 +275,6 @@ class ChannelIntegration:
         
         for session_id in pref_keys_to_remove:
             del self._visibility_preferences[session_id]
-        
-        logger.info(f"Cleaned up {cleaned} sessions and related data")
-        return cleaned
 
 
 # Global instance for easy access
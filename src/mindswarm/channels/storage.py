@@ -1,5 +1,8 @@
 """
 Channel Storage for managing channel message history.
+
+ChannelStorage keeps the history in memory. SharedChannelStorage keeps it in
+the shared state of a multi-worker server, so any worker can serve it.
 """
 
 import logging
@@ -7,6 +10,8 @@ from typing import Dict, List, Optional, Set
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
 
+from ai_whisperer.services.cluster.shared_state import SharedStateStore
+
 from .types import ChannelType, ChannelMessage
 
 logger = logging.getLogger(__name__)
@@ -138,6 +143,18 @@ class ChannelStorage:
             del self._session_metadata[session_id]
         logger.info(f"Cleared storage for session {session_id}")
     
+    def pop_session(self, session_id: str) -> List[Dict]:
+        """Remove the messages of a session from memory and return them serialized (for hibernation)."""
+        messages = [message.to_dict() for message in self.get_messages(session_id)]
+        self._storage.pop(session_id, None)
+        self._active_sessions.discard(session_id)
+        return messages
+    
+    def restore_session(self, session_id: str, messages: List[Dict]) -> None:
+        """Put back messages returned by pop_session()."""
+        for data in messages:
+            self.add_message(session_id, ChannelMessage.from_dict(data))
+    
     def clear_channel(self, session_id: str, channel: ChannelType) -> None:
         """Clear messages for a specific channel in a session."""
         if session_id in self._storage and channel in self._storage[session_id]:
@@ -160,6 +177,18 @@ class ChannelStorage:
         """Get set of active session IDs."""
         return self._active_sessions.copy()
     
+    async def aget_session_stats(self, session_id: str) -> Dict[str, int]:
+        """get_session_stats() for event loop code."""
+        return self.get_session_stats(session_id)
+    
+    async def aget_active_sessions(self) -> Set[str]:
+        """get_active_sessions() for event loop code."""
+        return self.get_active_sessions()
+    
+    async def acleanup_old_sessions(self, max_age_hours: int = 24) -> int:
+        """cleanup_old_sessions() for event loop code."""
+        return self.cleanup_old_sessions(max_age_hours)
+    
     def cleanup_old_sessions(self, max_age_hours: int = 24) -> int:
         """
         Clean up sessions older than specified hours.
@@ -197,4 +226,88 @@ class ChannelStorage:
     
     def get_session_metadata(self, session_id: str) -> Optional[Dict]:
         """Get metadata for a session."""
-        return self._session_metadata.get(session_id)
\ No newline at end of file
+        return self._session_metadata.get(session_id)
+
+
+class SharedChannelStorage(ChannelStorage):
+    """Channel storage backed by the shared state of a multi-worker server."""
+    
+    def __init__(self, store: SharedStateStore, max_messages_per_channel: int = 1000):
+        super().__init__(max_messages_per_channel)
+        self._store = store
+    
+    def add_message(self, session_id: str, message: ChannelMessage) -> None:
+        """Add a message to channel storage."""
+        # Queued: a write may wait for another worker's lock, and this runs on the event loop
+        self._store.submit(self._store.add_channel_message, session_id, message.to_dict(), self.max_messages)
+        logger.debug(f"Added {message.channel.value} message to session {session_id} (shared)")
+    
+    def get_messages(
+        self, 
+        session_id: str, 
+        channel: Optional[ChannelType] = None,
+        limit: Optional[int] = None,
+        since_sequence: Optional[int] = None
+    ) -> List[ChannelMessage]:
+        """Get messages from storage (see ChannelStorage.get_messages); call it off the event loop."""
+        # After the queued writes of this worker, so its own messages are included
+        rows = self._store.call(self._store.channel_messages, session_id,
+                                channel.value if channel else None, since_sequence, limit)
+        return [ChannelMessage.from_dict(row) for row in rows]
+    
+    def clear_session(self, session_id: str) -> None:
+        """Clear all messages for a session."""
+        self._store.submit(self._store.clear_channel_messages, session_id)
+        self._session_metadata.pop(session_id, None)
+        logger.info(f"Cleared shared storage for session {session_id}")
+    
+    def pop_session(self, session_id: str) -> List[Dict]:
+        """The messages stay in the shared state, nothing to hold in memory."""
+        return []
+    
+    def restore_session(self, session_id: str, messages: List[Dict]) -> None:
+        pass
+    
+    def clear_channel(self, session_id: str, channel: ChannelType) -> None:
+        """Clear messages for a specific channel in a session."""
+        self._store.submit(self._store.clear_channel_messages, session_id, channel.value)
+    
+    def get_session_stats(self, session_id: str) -> Dict[str, int]:
+        """Get statistics for a session; call it off the event loop."""
+        return self._session_stats(self._store.call(self._store.channel_counts, session_id))
+    
+    async def aget_session_stats(self, session_id: str) -> Dict[str, int]:
+        """Get statistics for a session (reads on the store's thread)."""
+        return self._session_stats(await self._store.run(self._store.channel_counts, session_id))
+    
+    @staticmethod
+    def _session_stats(counts: Dict[str, int]) -> Dict[str, int]:
+        if not counts:
+            return {}
+        return {f"{channel.value}_count": counts.get(channel.value, 0) for channel in ChannelType}
+    
+    def get_active_sessions(self) -> Set[str]:
+        """Get set of active session IDs; call it off the event loop."""
+        return self._store.call(self._store.channel_sessions)
+    
+    async def aget_active_sessions(self) -> Set[str]:
+        """Get set of active session IDs (reads on the store's thread)."""
+        return await self._store.run(self._store.channel_sessions)
+    
+    def cleanup_old_sessions(self, max_age_hours: int = 24) -> int:
+        """Clean up sessions whose newest message is older than specified hours; call it off the event loop."""
+        return self._clear_sessions(self._store.call(self._store.channel_sessions, self._cutoff(max_age_hours)))
+    
+    async def acleanup_old_sessions(self, max_age_hours: int = 24) -> int:
+        """Clean up sessions whose newest message is older than specified hours (reads on the store's thread)."""
+        return self._clear_sessions(await self._store.run(self._store.channel_sessions, self._cutoff(max_age_hours)))
+    
+    @staticmethod
+    def _cutoff(max_age_hours: int) -> str:
+        return (datetime.now(timezone.utc) - timedelta(hours=max_age_hours)).isoformat()
+    
+    def _clear_sessions(self, session_ids: Set[str]) -> int:
+        for session_id in session_ids:
+            self.clear_session(session_id)
+        logger.info(f"Cleaned up {len(session_ids)} old sessions")
+        return len(session_ids)
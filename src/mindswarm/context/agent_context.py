@@ -1,4 +1,5 @@
 from ai_whisperer.context.provider import ContextProvider
+from ai_whisperer.context.context_budget import estimate_message_tokens
 import json
 import logging
 
@@ -15,6 +16,7 @@ class AgentContext(ContextProvider):
     def __init__(self, agent_id=None, system_prompt=None):
         self.agent_id = agent_id
         self._messages = []
+        self._token_estimates = []  # Cached estimate per stored message, see message_token_estimates()
         self._metadata = {"agent_id": agent_id}
         if system_prompt is not None:
             self._metadata["system_prompt"] = system_prompt
@@ -100,6 +102,12 @@ class AgentContext(ContextProvider):
     def get_conversation_history(self):
         return list(self._messages)
 
+    def message_token_estimates(self):
+        """Estimated tokens of each stored message, computed once per message."""
+        for message in self._messages[len(self._token_estimates):]:
+            self._token_estimates.append(estimate_message_tokens(message))
+        return self._token_estimates
+
     # --- Serialization and context methods ---
 
     def set(self, key, value):
@@ -0,0 +1,325 @@
+"""
+Token-budgeted context windows with background compaction.
+
+AgentContext keeps the whole conversation, and StatelessAILoop used to send
+all of it on every turn, so long sessions grew slower and more expensive until
+they overflowed the model's context window. ContextBudget fits the messages of
+a turn into the model's window (see model_capabilities.get_context_window; the
+context length reported by OpenRouter, else the configured window of the
+longest matching model prefix). Turns for models whose window is unknown are
+sent untrimmed.
+
+- The system prompt and the most recent turns are always sent verbatim.
+- Older messages are replaced by a summary, when one is available.
+- Bulky tool results outside the recent turns are truncated.
+- If that is still too much, the oldest remaining messages are dropped.
+
+Summaries are written by a cheap model in a background task at the lowest
+request priority, once the history passes ``compact_at_fraction`` of the
+budget. The turn that triggers a compaction does not wait for it; later turns
+use the summary once it is stored in the context metadata.
+
+Token counts are estimated (about four characters per token), and the
+estimate of each stored message is computed once and cached by AgentContext.
+
+Key Components:
+- estimate_message_tokens(): Token estimate for one chat message
+- ContextBudgetConfig: Budget fractions and compaction settings
+- ContextBudget: Fits a turn's messages into the window and schedules compaction
+- get_context_budget() / configure_context_budget(): Singleton access
+
+Usage:
+    messages = get_context_budget().fit(context, messages, model_id, max_output_tokens)
+
+Configuration (config/main.yaml):
+    context_budget:
+      window_fraction: 0.8
+      keep_recent_messages: 12
+      compaction_model: openai/gpt-4o-mini
+"""
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Sequence
+
+from ai_whisperer.model_capabilities import get_context_window
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4  # Role and framing per message
+SUMMARY_METADATA_KEY = "context_summary"
+
+SUMMARY_PROMPT = (
+    "You compact the conversation history of an AI agent working in a software project. "
+    "Summarize the conversation below so the agent can continue without it. Keep user "
+    "requests and decisions, files and paths touched, tool results the agent still relies "
+    "on, open tasks and unresolved errors. Drop pleasantries and content that is no longer "
+    "relevant. Write plain, dense notes."
+)
+
+
+def _text_length(content: Any) -> int:
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return len(content)
+    if isinstance(content, list):  # Multi-part content
+        return sum(len(part.get("text", "")) if isinstance(part, dict) else len(str(part)) for part in content)
+    return len(str(content))
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Estimate the tokens a chat message takes up in the prompt."""
+    chars = _text_length(message.get("content"))
+    for tool_call in message.get("tool_calls") or ():
+        function = tool_call.get("function", {}) if isinstance(tool_call, dict) else {}
+        chars += len(function.get("name") or "") + _text_length(function.get("arguments"))
+    if message.get("name"):
+        chars += len(message["name"])
+    return MESSAGE_OVERHEAD_TOKENS + (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class ContextBudgetConfig:
+    """Settings for fitting conversations into the model's context window."""
+    enabled: bool = True
+    window_fraction: float = 0.8  # Share of the context window used for the prompt
+    reserve_output_tokens: int = 4096  # Room left for the response when max_tokens is not set
+    keep_recent_messages: int = 12  # Always sent verbatim
+    tool_result_max_tokens: int = 1500  # Older tool results above this are truncated
+    compact_at_fraction: float = 0.6  # Start summarizing once history uses this share of the budget
+    min_compaction_messages: int = 6
+    compaction_model: str = "openai/gpt-4o-mini"
+    summary_max_tokens: int = 800
+    compaction_input_max_chars: int = 120000
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ContextBudgetConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class ContextBudget:
+    """Fits conversation history into a token budget, compacting it in the background."""
+
+    def __init__(self, config: Optional[ContextBudgetConfig] = None):
+        self.config = config or ContextBudgetConfig()
+        self._compactions: Dict[int, asyncio.Task] = {}  # Context id -> running compaction
+        self.stats = {
+            "turns": 0, "trimmed_turns": 0, "dropped_messages": 0, "truncated_tool_results": 0,
+            "compactions": 0, "compaction_failures": 0,
+        }
+
+    def budget_for(self, model_id: str, max_output_tokens: Optional[int] = None) -> Optional[int]:
+        """Prompt tokens available for ``model_id``; None if its context window is unknown."""
+        window = get_context_window(model_id)
+        if not window:
+            return None
+        reserve = max_output_tokens or self.config.reserve_output_tokens
+        return max(int(window * self.config.window_fraction) - reserve, window // 4)
+
+    def fit(self, context: Any, messages: List[Dict[str, Any]], model_id: str,
+            max_output_tokens: Optional[int] = None, extra_tokens: int = 0,
+            api_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Return the messages to send for a turn, within the budget of ``model_id``.
+
+        ``messages`` is the context's retrieve_messages() output (optional system
+        prompt followed by the stored history). ``extra_tokens`` accounts for
+        anything added after fitting, such as the new user message. Returns
+        ``messages`` itself when it fits. With ``api_key`` set, compaction of
+        older history is scheduled when it grows past compact_at_fraction.
+        """
+        if not self.config.enabled or not messages:
+            return messages
+        budget = self.budget_for(model_id, max_output_tokens)
+        if budget is None:
+            # Trimming against a guessed window could cut the history of a large-context model
+            logger.debug(f"Context window of {model_id} is unknown, sending the context untrimmed")
+            return messages
+        self.stats["turns"] += 1
+        system = messages[:1] if messages[0].get("role") == "system" else []
+        history = messages[len(system):]
+        estimates = self._estimates(context, history)
+        budget -= extra_tokens
+        fixed = sum(estimate_message_tokens(m) for m in system)
+        total = fixed + sum(estimates)
+        recent_start = self._recent_start(history)
+
+        if api_key and total > budget * self.config.compact_at_fraction:
+            self._schedule_compaction(context, history, recent_start, api_key)
+        if total <= budget:
+            return messages
+
+        head: List[Dict[str, Any]] = []
+        start = 0
+        summary = self._summary(context, len(history))
+        if summary:
+            head = [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary['content']}"}]
+            start = min(summary["upto"], recent_start)
+            fixed += estimate_message_tokens(head[0])
+
+        middle = [self._shrink(m, t) for m, t in zip(history[start:recent_start], estimates[start:recent_start])]
+        recent = list(zip(history[recent_start:], estimates[recent_start:]))
+        total = fixed + sum(t for _, t in middle) + sum(t for _, t in recent)
+
+        dropped = start
+        while middle and total > budget:
+            total -= middle.pop(0)[1]
+            dropped += 1
+            # Tool results cannot be sent without the call that requested them
+            while middle and middle[0][0].get("role") == "tool":
+                total -= middle.pop(0)[1]
+                dropped += 1
+        if total > budget:
+            recent = [self._shrink(m, t) for m, t in recent]
+            total = fixed + sum(t for _, t in recent)
+
+        self.stats["trimmed_turns"] += 1
+        self.stats["dropped_messages"] += dropped
+        agent_id = getattr(context, "agent_id", None)
+        logger.info(f"📐 Context for {agent_id} trimmed to ~{total} of {budget} tokens: "
+                    f"{dropped} older messages {'summarized' if summary else 'dropped'}, "
+                    f"{len(middle) + len(recent)} kept")
+        return system + head + [m for m, _ in middle] + [m for m, _ in recent]
+
+    def _estimates(self, context: Any, history: List[Dict[str, Any]]) -> List[int]:
+        cached = getattr(context, "message_token_estimates", None)
+        if cached is not None:
+            estimates = cached()
+            if len(estimates) == len(history):
+                return estimates
+        return [estimate_message_tokens(m) for m in history]
+
+    def _recent_start(self, history: List[Dict[str, Any]]) -> int:
+        """Index where the verbatim recent turns start; never in the middle of a tool exchange."""
+        start = max(len(history) - self.config.keep_recent_messages, 0)
+        while start > 0 and history[start].get("role") == "tool":
+            start -= 1
+        return start
+
+    def _shrink(self, message: Dict[str, Any], tokens: int) -> tuple:
+        """Truncate a bulky tool result; returns (message, tokens)."""
+        limit = self.config.tool_result_max_tokens
+        if message.get("role") != "tool" or tokens <= limit or not isinstance(message.get("content"), str):
+            return message, tokens
+        keep = limit * CHARS_PER_TOKEN
+        content = message["content"]
+        shrunk = dict(message)
+        shrunk["content"] = (f"{content[:keep]}\n... [tool result truncated: "
+                             f"{len(content) - keep} of {len(content)} characters omitted]")
+        self.stats["truncated_tool_results"] += 1
+        return shrunk, estimate_message_tokens(shrunk)
+
+    @staticmethod
+    def _summary(context: Any, history_length: int) -> Optional[Dict[str, Any]]:
+        """The stored summary, if it still matches the history."""
+        get_metadata = getattr(context, "get_metadata", None)
+        summary = get_metadata(SUMMARY_METADATA_KEY) if get_metadata else None
+        if isinstance(summary, dict) and summary.get("content") and 0 < summary.get("upto", 0) <= history_length:
+            return summary
+        return None
+
+    def _schedule_compaction(self, context: Any, history: List[Dict[str, Any]], upto: int, api_key: str) -> None:
+        key = id(context)
+        if key in self._compactions or not hasattr(context, "set_metadata"):
+            return
+        previous = self._summary(context, len(history))
+        start = previous["upto"] if previous else 0
+        if upto - start < self.config.min_compaction_messages:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._compact(context, previous, history[start:upto], upto, api_key))
+        self._compactions[key] = task
+        task.add_done_callback(lambda _: self._compactions.pop(key, None))
+
+    async def _compact(self, context: Any, previous: Optional[Dict[str, Any]],
+                       span: Sequence[Dict[str, Any]], upto: int, api_key: str) -> None:
+        """Summarize ``span`` (and the previous summary) and store it on the context."""
+        from ai_whisperer.services.ai.openrouter import OpenRouterAIService
+        from ai_whisperer.services.ai.request_scheduler import RequestPriority, set_request_priority
+        from ai_whisperer.services.execution.ai_config import AIConfig
+
+        # Compaction must never hold up interactive turns
+        set_request_priority(RequestPriority.DEBBIE)
+        agent_id = getattr(context, "agent_id", None)
+        try:
+            service = OpenRouterAIService(AIConfig(
+                api_key=api_key, model_id=self.config.compaction_model,
+                temperature=0.0, max_tokens=self.config.summary_max_tokens,
+            ))
+            transcript = self._render(previous, span)
+            parts = []
+            async for chunk in service.stream_chat_completion([
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": transcript},
+            ]):
+                if chunk.delta_content:
+                    parts.append(chunk.delta_content)
+            content = "".join(parts).strip()
+            if not content:
+                raise ValueError("empty summary")
+            context.set_metadata(SUMMARY_METADATA_KEY, {"upto": upto, "content": content})
+            self.stats["compactions"] += 1
+            logger.info(f"📐 Compacted {len(span)} messages of {agent_id} into a "
+                        f"~{len(content) // CHARS_PER_TOKEN} token summary")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["compaction_failures"] += 1
+            logger.warning(f"Context compaction for {agent_id} failed: {e}")
+
+    def _render(self, previous: Optional[Dict[str, Any]], span: Sequence[Dict[str, Any]]) -> str:
+        lines = []
+        if previous:
+            lines.append(f"[earlier summary]\n{previous['content']}")
+        per_message = max(self.config.compaction_input_max_chars // max(len(span), 1), 500)
+        for message in span:
+            content = message.get("content")
+            text = content if isinstance(content, str) else json.dumps(content, default=str)
+            for tool_call in message.get("tool_calls") or ():
+                function = tool_call.get("function", {})
+                text += f"\n(calls {function.get('name')} with {function.get('arguments')})"
+            if len(text) > per_message:
+                text = text[:per_message] + " ..."
+            lines.append(f"[{message.get('role', 'unknown')}]\n{text}")
+        return "\n\n".join(lines)[:self.config.compaction_input_max_chars]
+
+    async def cancel_compaction(self, context: Any) -> None:
+        """Cancel a running compaction of ``context`` (when its session ends or hibernates)."""
+        task = self._compactions.pop(id(context), None)
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get trimming and compaction counts for monitoring."""
+        return {"enabled": self.config.enabled, "compacting": len(self._compactions), **self.stats}
+
+
+# Singleton accessor
+_context_budget: Optional[ContextBudget] = None
+
+
+def get_context_budget() -> ContextBudget:
+    """Get the process-wide context budget."""
+    global _context_budget
+    if _context_budget is None:
+        _context_budget = ContextBudget()
+    return _context_budget
+
+
+def configure_context_budget(settings: Optional[Dict[str, Any]]) -> ContextBudget:
+    """Replace the process-wide context budget with one built from ``settings``."""
+    global _context_budget
+    _context_budget = ContextBudget(ContextBudgetConfig.from_dict(settings))
+    logger.info(f"Context budget configured: {_context_budget.config}")
+    return _context_budget
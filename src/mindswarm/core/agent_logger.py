@@ -29,6 +29,9 @@ class AgentLogger:
         # Store logger instances for each agent
         self.agent_loggers: Dict[str, logging.Logger] = {}
         
+        # Hash of the system prompt last logged for each agent
+        self._logged_prompts: Dict[str, int] = {}
+        
         # Session timestamp for this run
         self.session_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -197,6 +200,15 @@ class AgentLogger:
             system_prompt: The formatted system prompt
         """
         logger = self.get_agent_logger(agent_id)
+        
+        # Sessions clone their agents from the same template (see agent_pool), so
+        # the prompt is usually the one already in the log
+        prompt_hash = hash(system_prompt)
+        if self._logged_prompts.get(agent_id) == prompt_hash:
+            logger.info("=== SYSTEM PROMPT unchanged since last logged ===")
+            return
+        self._logged_prompts[agent_id] = prompt_hash
+        
         logger.info("=== SYSTEM PROMPT ===")
         
         # Log the full prompt but split by lines for readability
@@ -45,9 +45,21 @@ class OpenRouterAuthError(OpenRouterAIServiceError):
 
 
 class OpenRouterRateLimitError(OpenRouterAIServiceError):
-    """Raised for rate limit errors (HTTP 429) with the OpenRouter API."""
+    """Raised for rate limit errors (HTTP 429) with the OpenRouter API.
 
-    pass
+    Attributes:
+        retry_after: Seconds to wait before retrying, from the response headers, if available.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int | None = None,
+        response: requests.Response | None = None,
+        retry_after: float | None = None,
+    ):
+        super().__init__(message, status_code, response)
+        self.retry_after = retry_after
 
 
 class OpenRouterConnectionError(AIWhispererError):
@@ -169,6 +181,26 @@ class ToolExecutionError(TaskExecutionError):
     pass
 
 
+class ToolTimeoutError(ToolExecutionError):
+    """A tool call did not finish within its timeout."""
+    pass
+
+
+class ToolArgumentError(ToolExecutionError):
+    """The arguments of a tool call do not match the tool's parameters.
+
+    Attributes:
+        tool_name: The tool that was called.
+        errors: One dict per problem, with the argument ``path`` and a ``message``.
+    """
+
+    def __init__(self, tool_name: str, errors: list):
+        details = "; ".join(f"{e['path']}: {e['message']}" for e in errors)
+        super().__init__(f"Invalid arguments for {tool_name}: {details}")
+        self.tool_name = tool_name
+        self.errors = errors
+
+
 class SessionError(AIWhispererError):
     """Session management errors."""
     pass
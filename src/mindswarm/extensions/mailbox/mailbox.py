@@ -9,6 +9,7 @@ Key Components:
 - MessagePriority: Message priority levels.
 - MessageStatus: Message delivery status.
 - Mail: A mail message in the system.
+- SharedMailboxSystem: Mailbox kept in the shared state of a multi-worker server.
 - get_mailbox(): Get the global mailbox system instance.
 - reset_mailbox(): Reset the mailbox system (mainly for testing).
 
@@ -36,6 +37,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 from collections import defaultdict
 
+from ai_whisperer.services.cluster.shared_state import SharedStateStore, get_shared_state
+
 logger = logging.getLogger(__name__)
 
 class MessagePriority(Enum):
@@ -347,6 +350,14 @@ class MailboxSystem:
         recipient = self._resolve_agent_name(agent_name or "user")
         return self._unread_counts[recipient]
     
+    async def acheck_mail(self, agent_name: str = "") -> List[Mail]:
+        """check_mail() for event loop code."""
+        return self.check_mail(agent_name)
+    
+    async def aget_unread_count(self, agent_name: str = "") -> int:
+        """get_unread_count() for event loop code."""
+        return self.get_unread_count(agent_name)
+    
     def reply_to_mail(self, original_message_id: str, reply: Mail) -> str:
         """Reply to a mail message.
         
@@ -415,7 +426,7 @@ class MailboxSystem:
             visited.add(msg_id)
             
             # Find the message
-            for inbox in self._inboxes.values():
+            for inbox in self._all_inboxes():
                 for mail in inbox:
                     if mail.message_id == msg_id:
                         thread.append(mail)
@@ -434,6 +445,93 @@ class MailboxSystem:
         thread.sort(key=lambda m: m.timestamp)
         
         return thread
+    
+    def _all_inboxes(self) -> List[List[Mail]]:
+        """All inboxes, for searches across recipients."""
+        return list(self._inboxes.values())
+
+
+class SharedMailboxSystem(MailboxSystem):
+    """Mailbox whose mail lives in the shared state, so every worker process sees the same inboxes.
+    
+    Notification handlers are registered per process and only fire in the
+    worker that sends the mail.
+    
+    The synchronous methods query the store on the calling thread, which suits
+    tools (they run in worker threads). Event loop code uses acheck_mail() and
+    aget_unread_count(), which run on the store's thread.
+    """
+    
+    def __init__(self, store: SharedStateStore):
+        super().__init__()
+        self._store = store
+    
+    def send_mail(self, mail: Mail) -> str:
+        """Send a mail message (see MailboxSystem.send_mail)."""
+        recipient = self._resolve_agent_name(mail.to_agent or "user")
+        mail.to_agent = recipient if recipient != "user" else ""
+        self._store.add_mail(recipient, mail.to_dict())
+        logger.info(f"[MAILBOX] Mail sent from {mail.from_agent or 'user'} to {recipient} (shared): {mail.subject}")
+        
+        if recipient in self._notification_handlers:
+            self._notification_handlers[recipient](mail)
+        return mail.message_id
+    
+    def check_mail(self, agent_name: str = "") -> List[Mail]:
+        """Return unread messages and mark them read (see MailboxSystem.check_mail)."""
+        recipient = self._resolve_agent_name(agent_name or "user")
+        unread = [Mail.from_dict(data) for data in self._store.take_unread_mail(
+            recipient, MessageStatus.READ.value, MessageStatus.UNREAD.value)]
+        for mail in unread:
+            mail.status = MessageStatus.READ
+        logger.info(f"[MAILBOX] Found {len(unread)} unread messages for '{recipient}' (shared)")
+        return unread
+    
+    async def acheck_mail(self, agent_name: str = "") -> List[Mail]:
+        """Return unread messages and mark them read, on the store's thread."""
+        return await self._store.run(self.check_mail, agent_name)
+    
+    def get_all_mail(self, agent_name: str = "",
+                     include_read: bool = True,
+                     include_archived: bool = False) -> List[Mail]:
+        """Get all mail for an agent/user (see MailboxSystem.get_all_mail)."""
+        recipient = self._resolve_agent_name(agent_name or "user")
+        result = []
+        for mail in (Mail.from_dict(data) for data in self._store.list_mail(recipient)):
+            if mail.status == MessageStatus.ARCHIVED and not include_archived:
+                continue
+            if mail.status == MessageStatus.READ and not include_read:
+                continue
+            result.append(mail)
+        return result
+    
+    def has_unread_mail(self, agent_name: str = "") -> bool:
+        return self.get_unread_count(agent_name) > 0
+    
+    def get_unread_count(self, agent_name: str = "") -> int:
+        recipient = self._resolve_agent_name(agent_name or "user")
+        return self._store.count_mail(recipient, MessageStatus.UNREAD.value)
+    
+    async def aget_unread_count(self, agent_name: str = "") -> int:
+        return await self._store.run(self.get_unread_count, agent_name)
+    
+    def reply_to_mail(self, original_message_id: str, reply: Mail) -> str:
+        """Reply to a mail message (see MailboxSystem.reply_to_mail)."""
+        reply.reply_to = original_message_id
+        self._store.set_mail_status(original_message_id, MessageStatus.REPLIED.value)
+        return self.send_mail(reply)
+    
+    def archive_mail(self, message_id: str) -> bool:
+        """Archive a mail message (see MailboxSystem.archive_mail)."""
+        return self._store.set_mail_status(message_id, MessageStatus.ARCHIVED.value)
+    
+    def _all_inboxes(self) -> List[List[Mail]]:
+        inboxes: Dict[str, List[Mail]] = defaultdict(list)
+        for data in self._store.list_mail():
+            mail = Mail.from_dict(data)
+            inboxes[mail.to_agent or "user"].append(mail)
+        return list(inboxes.values())
+
 
 # Global mailbox instance
 _mailbox_system = None
@@ -442,7 +540,8 @@ def get_mailbox() -> MailboxSystem:
     """Get the global mailbox system instance."""
     global _mailbox_system
     if _mailbox_system is None:
-        _mailbox_system = MailboxSystem()
+        store = get_shared_state()
+        _mailbox_system = SharedMailboxSystem(store) if store is not None else MailboxSystem()
     return _mailbox_system
 
 def reset_mailbox():
@@ -7,7 +7,8 @@ and executes specialized tasks. It integrates with the tool system
 and manages conversation context.
 
 Key Components:
-- MailNotificationMixin: Mixin to add mail notification capabilities to agents.
+- MailNotificationMixin: Mixin to add mail notification capabilities to agents
+  (the ``a``-prefixed methods are for event loop code).
 - get_mail_notification(): Helper function to generate mail notification string.
 - inject_mail_notification(): Decorator to inject mail notifications into agent responses.
 
@@ -45,16 +46,11 @@ class MailNotificationMixin:
         Returns:
             Notification string if there's mail, None otherwise
         """
-        mailbox = get_mailbox()
-        
-        if mailbox.has_unread_mail(agent_name):
-            count = mailbox.get_unread_count(agent_name)
-            if count == 1:
-                return f"📬 You have 1 unread message in your mailbox."
-            else:
-                return f"📬 You have {count} unread messages in your mailbox."
-        
-        return None
+        return _unread_notification(get_mailbox().get_unread_count(agent_name))
+    
+    async def acheck_for_mail_notification(self, agent_name: str) -> Optional[str]:
+        """check_for_mail_notification() for event loop code."""
+        return _unread_notification(await get_mailbox().aget_unread_count(agent_name))
     
     def add_mail_notification_to_response(self, response: str, agent_name: str) -> str:
         """Add mail notification to agent response if needed.
@@ -66,16 +62,11 @@ class MailNotificationMixin:
         Returns:
             Response with mail notification appended if applicable
         """
-        notification = self.check_for_mail_notification(agent_name)
-        
-        if notification:
-            # Add notification at the end of response
-            if response.strip():
-                return f"{response}\n\n{notification}"
-            else:
-                return notification
-        
-        return response
+        return _append_notification(response, self.check_for_mail_notification(agent_name))
+    
+    async def aadd_mail_notification_to_response(self, response: str, agent_name: str) -> str:
+        """add_mail_notification_to_response() for event loop code."""
+        return _append_notification(response, await self.acheck_for_mail_notification(agent_name))
     
     def format_mail_summary(self, agent_name: str, limit: int = 3) -> str:
         """Get a formatted summary of unread mail.
@@ -87,28 +78,52 @@ class MailNotificationMixin:
         Returns:
             Formatted mail summary
         """
-        mailbox = get_mailbox()
-        unread = mailbox.check_mail(agent_name)
-        
-        if not unread:
-            return "No unread messages."
-        
-        summary_parts = [f"📬 Unread messages ({len(unread)} total):"]
-        
-        # Show up to 'limit' messages
-        for i, mail in enumerate(unread[:limit]):
-            from_str = mail.from_agent or "user"
-            priority_icon = "🔴" if mail.priority.value == "urgent" else "🔵" if mail.priority.value == "high" else ""
-            summary_parts.append(
-                f"{i+1}. {priority_icon} From {from_str}: {mail.subject}"
-            )
-        
-        if len(unread) > limit:
-            summary_parts.append(f"... and {len(unread) - limit} more messages")
-        
-        summary_parts.append("\nUse check_mail tool to read messages.")
-        
-        return "\n".join(summary_parts)
+        return _mail_summary(get_mailbox().check_mail(agent_name), limit)
+    
+    async def aformat_mail_summary(self, agent_name: str, limit: int = 3) -> str:
+        """format_mail_summary() for event loop code."""
+        return _mail_summary(await get_mailbox().acheck_mail(agent_name), limit)
+
+
+def _unread_notification(count: int) -> Optional[str]:
+    if count == 1:
+        return f"📬 You have 1 unread message in your mailbox."
+    if count > 1:
+        return f"📬 You have {count} unread messages in your mailbox."
+    return None
+
+
+def _append_notification(response: str, notification: Optional[str]) -> str:
+    if notification:
+        # Add notification at the end of response
+        if response.strip():
+            return f"{response}\n\n{notification}"
+        else:
+            return notification
+    
+    return response
+
+
+def _mail_summary(unread: list, limit: int) -> str:
+    if not unread:
+        return "No unread messages."
+    
+    summary_parts = [f"📬 Unread messages ({len(unread)} total):"]
+    
+    # Show up to 'limit' messages
+    for i, mail in enumerate(unread[:limit]):
+        from_str = mail.from_agent or "user"
+        priority_icon = "🔴" if mail.priority.value == "urgent" else "🔵" if mail.priority.value == "high" else ""
+        summary_parts.append(
+            f"{i+1}. {priority_icon} From {from_str}: {mail.subject}"
+        )
+    
+    if len(unread) > limit:
+        summary_parts.append(f"... and {len(unread) - limit} more messages")
+    
+    summary_parts.append("\nUse check_mail tool to read messages.")
+    
+    return "\n".join(summary_parts)
 
 def get_mail_notification(agent_name: str) -> Optional[str]:
     """Helper function to generate mail notification string."""
@@ -135,9 +150,8 @@ def inject_mail_notification(agent_method):
         
         # Add mail notification if response is a string
         if isinstance(response, str):
-            mailbox = get_mailbox()
-            if mailbox.has_unread_mail(agent_name):
-                count = mailbox.get_unread_count(agent_name)
+            count = await get_mailbox().aget_unread_count(agent_name)
+            if count > 0:
                 notification = f"\n\n📬 You have {count} unread message{'s' if count > 1 else ''} in your mailbox."
                 response += notification
         
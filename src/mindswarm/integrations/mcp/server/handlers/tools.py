@@ -4,10 +4,10 @@ import json
 import logging
 import time
 from typing import Dict, Any, List, Optional
-import asyncio
 
 from ....tools.tool_registry_lazy import LazyToolRegistry
 from ....tools.base_tool import AITool
+from ....tools.tool_dispatch import get_tool_dispatch
 from ..config import MCPServerConfig
 
 logger = logging.getLogger(__name__)
@@ -108,20 +108,13 @@ class ToolHandler:
             # Merge context with arguments
             enriched_args = {**arguments, **tool_context}
             
-            # Execute tool (handle both sync and async)
-            if asyncio.iscoroutinefunction(tool.execute):
-                # Try new pattern first
-                try:
-                    result = await tool.execute(arguments=enriched_args)
-                except TypeError:
-                    # Fallback to legacy pattern
-                    result = await tool.execute(**enriched_args)
+            # Validate the arguments, then execute with the tool's calling convention
+            dispatch = get_tool_dispatch(tool)
+            enriched_args = dispatch.prepare(enriched_args)
+            if dispatch.is_async:
+                result = await dispatch.call(tool, enriched_args)
             else:
-                # Sync execution
-                try:
-                    result = tool.execute(arguments=enriched_args)
-                except TypeError:
-                    result = tool.execute(**enriched_args)
+                result = dispatch.call(tool, enriched_args)
             
             # Track successful execution if monitor is available
             if self.monitor:
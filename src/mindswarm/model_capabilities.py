@@ -6,6 +6,7 @@ Capabilities:
 - multi_tool: Can call multiple tools in one response
 - parallel_tools: Can execute tools in parallel
 - max_tools_per_turn: Maximum number of tools that can be called at once
+- context_window: Maximum prompt plus completion tokens
 - structured_output: Supports JSON Schema validated responses
 - quirks: Model-specific limitations or behaviors
 
@@ -17,7 +18,7 @@ Known Quirks:
 """
 
 import logging
-from typing import Dict, Any
+from typing import Any, Dict, Iterable, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Testing shows it only supports single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 8192,
         "structured_output": False,  # Original GPT-4 doesn't support structured outputs
         "quirks": {}
     },
@@ -35,6 +37,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,  # Can likely do more, but tested with 2
+        "context_window": 128000,
         "structured_output": False,  # GPT-4 Turbo doesn't support structured outputs
         "quirks": {}
     },
@@ -42,6 +45,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 128000,
         "structured_output": True,  # GPT-4o supports structured outputs
         "quirks": {}
     },
@@ -49,6 +53,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 128000,
         "structured_output": True,  # GPT-4o-mini supports structured outputs
         "quirks": {}
     },
@@ -56,6 +61,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 16385,
         "structured_output": False,  # GPT-3.5 doesn't support structured outputs
         "quirks": {}
     },
@@ -63,6 +69,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 1047576,
         "structured_output": True,
         "quirks": {}
     },
@@ -70,6 +77,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 1047576,
         "structured_output": True,
         "quirks": {}
     },
@@ -79,6 +87,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -86,6 +95,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Testing shows it only supports single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 200000,
         "structured_output": True,  # Testing shows it does support structured output via OpenRouter
         "quirks": {}
     },
@@ -93,6 +103,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Testing shows it does support structured output via OpenRouter
         "quirks": {}
     },
@@ -100,6 +111,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -107,6 +119,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Testing shows it only supports single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 200000,
         "structured_output": False,
         "quirks": {}
     },
@@ -114,6 +127,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -121,6 +135,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -128,6 +143,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Claude 3.5 Sonnet is single-tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -135,6 +151,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Claude 4 Sonnet supports multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -142,6 +159,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Claude 4 Opus should support multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -149,6 +167,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 5,
+        "context_window": 200000,
         "structured_output": False,
         "quirks": {}
     },
@@ -156,6 +175,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Testing shows it only supports single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 200000,
         "structured_output": True,  # Supports via OpenRouter despite reporting otherwise
         "quirks": {"structured_output_hidden": True}
     },
@@ -165,6 +185,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 32760,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -172,6 +193,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 2000000,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -179,6 +201,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Single tool per turn
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 1000000,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -186,6 +209,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Gemini 2.5 supports multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 1048576,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -193,6 +217,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Gemini 2.5 supports multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 1048576,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -200,6 +225,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Gemini 2.5 supports multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 1048576,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -207,6 +233,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Gemini 2.5 supports multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 1048576,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -214,6 +241,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Gemini 2.5 supports multiple tools per turn
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 1048576,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -221,6 +249,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Testing shows no tool support
         "parallel_tools": False,
         "max_tools_per_turn": 0,
+        "context_window": 1000000,
         "structured_output": True,
         "quirks": {}
     },
@@ -228,6 +257,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 1000000,
         "structured_output": True,  # Supports via response_mime_type
         "quirks": {"no_tools_with_structured_output": True}
     },
@@ -237,6 +267,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,  # Testing shows it does support multiple tools
         "parallel_tools": True,
         "max_tools_per_turn": 10,
+        "context_window": 8192,
         "structured_output": False,
         "quirks": {}
     },
@@ -244,6 +275,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # Testing shows single tool only
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 131072,
         "structured_output": True,
         "quirks": {}
     },
@@ -253,6 +285,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 32768,
         "structured_output": True,
         "quirks": {}
     },
@@ -260,6 +293,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 65536,
         "structured_output": True,
         "quirks": {}
     },
@@ -269,6 +303,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 32768,
         "structured_output": False,
         "quirks": {}
     },
@@ -276,6 +311,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 131072,
         "structured_output": True,
         "quirks": {}
     },
@@ -283,6 +319,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,  # No tool support in testing
         "parallel_tools": False,
         "max_tools_per_turn": 0,
+        "context_window": 32768,
         "structured_output": True,
         "quirks": {}
     },
@@ -292,6 +329,7 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": True,
         "parallel_tools": True,
         "max_tools_per_turn": 2,  # Tested with 2
+        "context_window": 163840,
         "structured_output": False,
         "quirks": {}
     },
@@ -301,11 +339,24 @@ MODEL_CAPABILITIES: Dict[str, Dict[str, Any]] = {
         "multi_tool": False,
         "parallel_tools": False,
         "max_tools_per_turn": 1,
+        "context_window": 32768,
         "structured_output": False,
         "quirks": {}
     }
 }
 
+# Context lengths reported by OpenRouter's model list, by model id
+_reported_context_lengths: Dict[str, int] = {}
+
+
+def _find_model_key(model_name: str) -> Optional[str]:
+    """The MODEL_CAPABILITIES key for a model: exact match, else the longest matching prefix."""
+    if model_name in MODEL_CAPABILITIES:
+        return model_name
+    # Longest prefix, so "openai/gpt-4o-2024-08-06" matches "openai/gpt-4o" rather than "openai/gpt-4"
+    matches = [prefix for prefix in MODEL_CAPABILITIES if prefix != "default" and model_name.startswith(prefix)]
+    return max(matches, key=len) if matches else None
+
 def get_model_capabilities(model_name: str) -> Dict[str, Any]:
     """
     Get capabilities for a specific model.
@@ -316,14 +367,10 @@ def get_model_capabilities(model_name: str) -> Dict[str, Any]:
     Returns:
         Dictionary of model capabilities
     """
-    # Try exact match first
-    if model_name in MODEL_CAPABILITIES:
-        return MODEL_CAPABILITIES[model_name]
-    
-    # Try prefix match (e.g., "openai/gpt-4-0613" matches "openai/gpt-4")
-    for model_prefix, capabilities in MODEL_CAPABILITIES.items():
-        if model_prefix != "default" and model_name.startswith(model_prefix):
-            return capabilities
+    # Exact match, else the longest prefix (e.g., "openai/gpt-4-0613" matches "openai/gpt-4")
+    key = _find_model_key(model_name)
+    if key is not None:
+        return MODEL_CAPABILITIES[key]
     
     # Log warning when using default capabilities
     logger.warning(
@@ -334,6 +381,44 @@ def get_model_capabilities(model_name: str) -> Dict[str, Any]:
     # Return default capabilities
     return MODEL_CAPABILITIES["default"]
 
+def record_context_lengths(models: Iterable[Dict[str, Any]]) -> int:
+    """
+    Remember the context lengths from OpenRouter's model list.
+    
+    Args:
+        models: Entries of the /models response ("id", "context_length")
+        
+    Returns:
+        Number of models with a context length
+    """
+    recorded = 0
+    for model in models:
+        context_length = model.get("context_length")
+        if model.get("id") and isinstance(context_length, int) and context_length > 0:
+            _reported_context_lengths[model["id"]] = context_length
+            recorded += 1
+    return recorded
+
+def get_context_window(model_name: str) -> Optional[int]:
+    """
+    Get the context window of a model in tokens.
+    
+    The context length reported by OpenRouter wins; otherwise the window of
+    the configured model (exact or longest prefix match) is used.
+    
+    Args:
+        model_name: The model identifier
+        
+    Returns:
+        Maximum prompt plus completion tokens for the model, or None if unknown
+    """
+    if model_name in _reported_context_lengths:
+        return _reported_context_lengths[model_name]
+    key = _find_model_key(model_name)
+    if key is None:
+        return None
+    return MODEL_CAPABILITIES[key].get("context_window")
+
 def supports_multi_tool(model_name: str) -> bool:
     """
     Check if a model supports multiple tool calls in one turn.
@@ -207,6 +207,19 @@ class PromptSystem:
     def _get_shared_prompts_dir(self) -> Path:
         """Get the shared prompts directory path"""
         return self._resolver._get_shared_prompts_dir()
+
+    def reload_shared_components(self):
+        """Reload the shared prompt components after their files changed"""
+        self._shared_components = {}
+        self._load_shared_components()
+
+    def get_prompt_sources(self, category: str, name: str) -> List[Path]:
+        """Files a formatted prompt is built from: the prompt itself and the shared components"""
+        sources = [self.get_prompt(category, name).path]
+        shared_dir = self._get_shared_prompts_dir()
+        if shared_dir.exists():
+            sources.extend(sorted(shared_dir.glob("*.md")))
+        return sources
     
     def enable_feature(self, feature: str):
         """Enable a shared feature for all agents"""
@@ -5,4 +5,5 @@ This package contains core services:
 - ai: AI service integration
 - execution: Execution engine
 - agents: Agent system
+- cluster: State shared by worker processes
 """
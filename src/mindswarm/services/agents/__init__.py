@@ -7,4 +7,7 @@ This package contains the agent infrastructure:
 - registry: Agent registry
 - config: Agent configuration
 - handlers: Specific agent implementations
+- hibernation: Idle session hibernation
+- session_journal: Append-only session index journal
+- agent_pool: Warm pool of agent templates
 """
@@ -0,0 +1,394 @@
+"""
+Warm pool of agent templates.
+
+Switching a session to an agent it does not have yet used to format the
+agent's system prompt through PromptSystem (reading the prompt and shared
+component files), build its AgentConfig and AI loop settings, and filter and
+encode its tools, all while holding the session lock. None of that depends on
+the session, so the pool builds it once per process and agent type as an
+AgentTemplate, and sessions clone the template: a fresh AgentConfig and AI loop
+settings, with the prompt string and the encoded tool definitions shared.
+
+A template is rebuilt when it is stale: its prompt or shared component files
+changed on disk, the enabled prompt features or debug options changed, the
+registry entry of the agent was replaced, or, for agents whose prompt lists the
+tools, the tool registry version changed. The encoded tool definitions are
+cached by the tool registry per version (tools and tool sets), so they follow
+tool changes on their own. Staleness is checked at most every ``validate_interval``
+seconds per template. With ``prewarm`` the session manager builds the
+templates of every registered agent at startup.
+
+Key Components:
+- AgentPoolConfig: Prewarming and the staleness check interval
+- AgentTemplate: Prebuilt prompt, configs and tool definitions of an agent type
+- build_agent_template(): Builds a template from the AgentRegistry entry
+- AgentPool: Templates by agent type, with invalidation and statistics
+- get_agent_pool() / configure_agent_pool(): Process-wide pool
+
+Usage:
+    template = get_agent_pool().acquire(agent_id, agent_info, prompt_system, config)
+    agent_config = template.new_agent_config()
+
+Configuration (config/main.yaml):
+    agent_pool:
+      enabled: true
+      prewarm: true
+      validate_interval: 1.0
+"""
+
+import copy
+import json
+import logging
+import time
+from dataclasses import dataclass, field, fields, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from ai_whisperer.services.agents.config import AgentConfig
+from ai_whisperer.services.execution.ai_loop_factory import AILoopConfig
+from ai_whisperer.tools.tool_registry import get_tool_registry
+
+logger = logging.getLogger(__name__)
+
+# Agents whose prompts include the tool instructions (and force the mailbox tool)
+DEBUG_AGENT_IDS = ("d", "debbie")
+
+
+@dataclass
+class AgentPoolConfig:
+    """Settings for the warm agent template pool."""
+    enabled: bool = True
+    prewarm: bool = True  # Build the templates of all registered agents at startup
+    validate_interval: float = 1.0  # Seconds between staleness checks of a template
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'AgentPoolConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class AgentTemplate:
+    """Everything about an agent type that does not depend on the session."""
+    agent_id: str
+    agent_info: Any  # AgentRegistry entry
+    system_prompt: str
+    prompt_source: str
+    agent_config: Optional[AgentConfig]  # None: sessions use their default AI settings
+    loop_config: Optional[AILoopConfig]
+    tool_count: Optional[int]  # Filtered tools, None when the agent uses all tools
+    # Staleness fingerprint
+    sources: Dict[str, Tuple[int, int]] = field(default_factory=dict)  # path -> (mtime_ns, size)
+    tools_version: Optional[int] = None  # Tool registry version, if the prompt lists the tools
+    features: Tuple[frozenset, frozenset] = (frozenset(), frozenset())
+    built_at: float = field(default_factory=time.monotonic)
+    checked_at: float = field(default_factory=time.monotonic)
+
+    def new_agent_config(self) -> Optional[AgentConfig]:
+        """A copy of the agent config that a session may modify."""
+        if self.agent_config is None:
+            return None
+        config = copy.copy(self.agent_config)
+        config.api_settings = dict(config.api_settings)
+        config.generation_params = dict(config.generation_params)
+        config.tool_permissions = list(config.tool_permissions)
+        config.tool_limits = dict(config.tool_limits)
+        config.context_settings = dict(config.context_settings)
+        return config
+
+    def new_loop_config(self) -> Optional[AILoopConfig]:
+        """A copy of the AI loop settings."""
+        if self.loop_config is None:
+            return None
+        return replace(self.loop_config, api_settings=dict(self.loop_config.api_settings),
+                       generation_params=dict(self.loop_config.generation_params))
+
+
+def _stat(path: Path) -> Tuple[int, int]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return (0, -1)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _features(prompt_system) -> Tuple[frozenset, frozenset]:
+    if prompt_system is None:
+        return (frozenset(), frozenset())
+    return (frozenset(prompt_system.get_enabled_features()), frozenset(prompt_system.get_debug_options()))
+
+
+def _includes_tools(agent_id: str, agent_info) -> bool:
+    """Whether the agent's prompt includes the tool instructions (debugging agents like Debbie)."""
+    return agent_id.lower() in DEBUG_AGENT_IDS or 'debug' in agent_info.name.lower()
+
+
+def _load_agent_prompt(agent_id: str, agent_info, prompt_system, config: Dict[str, Any]) -> Tuple[str, str, List[Path]]:
+    """The system prompt of an agent, where it came from and the files it was built from."""
+    system_prompt = f"You are {agent_info.name}, {agent_info.description}"  # Better fallback
+    is_debug_agent = _includes_tools(agent_id, agent_info)
+
+    if not (prompt_system and agent_info.prompt_file):
+        logger.warning(f"⚠️ No prompt system or prompt file configured for {agent_id}, using basic fallback")
+        return system_prompt, "no_config_fallback", []
+
+    logger.info(f"Attempting to load prompt file: {agent_info.prompt_file}")
+    try:
+        # Try with prompt system first to get proper tool instructions
+        prompt_name = agent_info.prompt_file
+        if prompt_name.endswith('.prompt.md'):
+            prompt_name = prompt_name[:-10]  # Remove '.prompt.md'
+        elif prompt_name.endswith('.md'):
+            prompt_name = prompt_name[:-3]  # Remove '.md'
+
+        logger.info(f"Trying to load prompt via PromptSystem with tools: agents/{prompt_name}")
+        try:
+            # Enable continuation feature for all agents
+            prompt_system.enable_feature('continuation_protocol')
+
+            # Enable mailbox debug mode for Debbie
+            if agent_id.lower() in DEBUG_AGENT_IDS:
+                logger.info("Enabling force_mailbox_tool debug mode for Debbie")
+                # First enable the debug_options feature
+                prompt_system.enable_feature('debug_options')
+                # Then enable the specific debug option
+                prompt_system.enable_debug_option('force_mailbox_tool')
+
+            # Get model name for capability checking
+            if agent_info.ai_config and agent_info.ai_config.get("model"):
+                model_name = agent_info.ai_config.get("model")
+            else:
+                model_name = config.get("openrouter", {}).get("model")
+
+            # Get formatted prompt with model name for structured output support
+            system_prompt = prompt_system.get_formatted_prompt(
+                "agents",
+                prompt_name,
+                include_tools=is_debug_agent,
+                model_name=model_name
+            )
+            prompt_source = f"prompt_system:agents/{prompt_name}" + (" (with_tools)" if is_debug_agent else "")
+            logger.info(f"✅ Successfully loaded prompt via PromptSystem for {agent_id} (tools included: {is_debug_agent})")
+
+            # Clear debug options after loading prompt to avoid affecting other agents
+            if agent_id.lower() in DEBUG_AGENT_IDS:
+                prompt_system.disable_debug_option('force_mailbox_tool')
+                # Also disable the debug_options feature if no other debug options are active
+                if not prompt_system.get_debug_options():
+                    prompt_system.disable_feature('debug_options')
+            return system_prompt, prompt_source, prompt_system.get_prompt_sources("agents", prompt_name)
+        except Exception as e1:
+            logger.warning(f"⚠️ PromptSystem failed: {e1}, trying direct file read")
+            # Try direct file read as fallback
+            prompt_file = Path("prompts") / "agents" / agent_info.prompt_file
+            if not prompt_file.exists():
+                logger.warning(f"❌ Prompt file not found: {prompt_file}")
+                logger.warning(f"❌ FALLBACK ACTIVATED: Using basic fallback prompt for {agent_info.name}")
+                return system_prompt, "basic_fallback", []
+
+            with open(prompt_file, 'r', encoding='utf-8') as f:
+                base_prompt = f.read()
+
+            # Add tool instructions manually for debugging agents
+            if is_debug_agent:
+                try:
+                    tool_instructions = get_tool_registry().get_all_ai_prompt_instructions()
+                    if tool_instructions:
+                        system_prompt = base_prompt + "\n\n## AVAILABLE TOOLS\n" + tool_instructions
+                        prompt_source = f"direct_file:{prompt_file} (with_tools)"
+                        logger.info(f"✅ Added tool instructions to direct file prompt for {agent_id}")
+                    else:
+                        system_prompt = base_prompt
+                        prompt_source = f"direct_file:{prompt_file} (no_tools)"
+                        logger.warning(f"⚠️ No tool instructions available for {agent_id}")
+                except Exception as e2:
+                    logger.warning(f"⚠️ Failed to add tool instructions: {e2}")
+                    system_prompt = base_prompt
+                    prompt_source = f"direct_file:{prompt_file} (tools_failed)"
+            else:
+                system_prompt = base_prompt
+                prompt_source = f"direct_file:{prompt_file}"
+
+            logger.info(f"✅ Successfully loaded prompt via direct file read for {agent_id}: {prompt_file}")
+            return system_prompt, prompt_source, [prompt_file]
+    except Exception as e:
+        logger.error(f"❌ Failed to load prompt for agent {agent_id}: {e}")
+        logger.error(f"❌ FALLBACK ACTIVATED: Using basic fallback prompt for {agent_info.name}")
+        return system_prompt, "error_fallback", []
+
+
+def build_agent_template(agent_id: str, agent_info, prompt_system, config: Dict[str, Any]) -> AgentTemplate:
+    """
+    Build the template of an agent from its AgentRegistry entry.
+
+    Args:
+        agent_id: Agent identifier as used by sessions
+        agent_info: The agent's AgentRegistry entry
+        prompt_system: PromptSystem to format the prompt with (may be None)
+        config: Server configuration (for the default OpenRouter settings)
+    """
+    tool_registry = get_tool_registry()
+    system_prompt, prompt_source, sources = _load_agent_prompt(agent_id, agent_info, prompt_system, config)
+    # After loading, which enables the continuation protocol (and restores Debbie's debug options)
+    features = _features(prompt_system)
+
+    # Create agent config with AI settings if available
+    agent_config = None
+    loop_config = None
+    if agent_info.ai_config:
+        openrouter_config = config.get("openrouter", {})
+        agent_config = AgentConfig(
+            name=agent_info.name,
+            description=agent_info.description,
+            system_prompt=system_prompt,
+            model_name=agent_info.ai_config.get("model", openrouter_config.get("model", "openai/gpt-3.5-turbo")),
+            provider=agent_info.ai_config.get("provider", "openrouter"),
+            api_settings={
+                "api_key": openrouter_config.get("api_key"),
+                **agent_info.ai_config.get("api_settings", {})
+            },
+            generation_params={
+                **openrouter_config.get("params", {}),
+                **agent_info.ai_config.get("generation_params", {})
+            },
+            tool_permissions=[],
+            tool_limits={},
+            context_settings=agent_info.ai_config.get("context_settings", {"max_context_messages": 50})
+        )
+        loop_config = AILoopConfig.from_agent_config(agent_config)
+        logger.info(f"Created agent config with custom AI settings: model={agent_config.model_name}")
+
+    # Encode the filtered tool definitions now so the first turn finds them cached
+    tool_count = None
+    if any(getattr(agent_info, name, None) for name in ("tool_sets", "tool_tags", "allow_tools", "deny_tools")):
+        tool_count = len(tool_registry.get_encoded_tool_definitions(
+            tool_sets=getattr(agent_info, 'tool_sets', None),
+            tags=getattr(agent_info, 'tool_tags', None),
+            allow_tools=getattr(agent_info, 'allow_tools', None),
+            deny_tools=getattr(agent_info, 'deny_tools', None)
+        ))
+
+    return AgentTemplate(
+        agent_id=agent_id,
+        agent_info=agent_info,
+        system_prompt=system_prompt,
+        prompt_source=prompt_source,
+        agent_config=agent_config,
+        loop_config=loop_config,
+        tool_count=tool_count,
+        sources={str(path): _stat(Path(path)) for path in sources},
+        tools_version=tool_registry.version if _includes_tools(agent_id, agent_info) else None,
+        features=features,
+    )
+
+
+class AgentPool:
+    """Agent templates by agent type, rebuilt when their inputs change."""
+
+    def __init__(self, config: Optional[AgentPoolConfig] = None):
+        self.config = config or AgentPoolConfig()
+        self._templates: Dict[Tuple[str, int, str], AgentTemplate] = {}
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0, "build_ms": 0.0}
+
+    @staticmethod
+    def _key(agent_id: str, prompt_system, config: Dict[str, Any]) -> Tuple[str, int, str]:
+        openrouter = {k: v for k, v in config.get("openrouter", {}).items() if k != "api_key"}
+        return (agent_id.lower(), id(prompt_system), json.dumps(openrouter, sort_keys=True, default=str))
+
+    def acquire(self, agent_id: str, agent_info, prompt_system, config: Dict[str, Any]) -> AgentTemplate:
+        """
+        The template of an agent, built or rebuilt if needed.
+
+        Args:
+            agent_id: Agent identifier as used by sessions
+            agent_info: The agent's AgentRegistry entry
+            prompt_system: PromptSystem to format the prompt with (may be None)
+            config: Server configuration of the session
+        """
+        if not self.config.enabled:
+            return build_agent_template(agent_id, agent_info, prompt_system, config)
+        key = self._key(agent_id, prompt_system, config)
+        template = self._templates.get(key)
+        if template is not None:
+            if self._is_fresh(template, agent_info, prompt_system):
+                self.stats["hits"] += 1
+                return template
+            self.stats["invalidations"] += 1
+            logger.info(f"Agent template for {agent_id} is stale, rebuilding")
+        self.stats["misses"] += 1
+        return self._build(key, agent_id, agent_info, prompt_system, config)
+
+    def _build(self, key, agent_id: str, agent_info, prompt_system, config: Dict[str, Any]) -> AgentTemplate:
+        started = time.perf_counter()
+        template = build_agent_template(agent_id, agent_info, prompt_system, config)
+        self.stats["build_ms"] += (time.perf_counter() - started) * 1000
+        self._templates[key] = template
+        logger.info(f"📝 Agent {agent_id} ({agent_info.name}) template built, prompt loaded from: {template.prompt_source}")
+        return template
+
+    def _is_fresh(self, template: AgentTemplate, agent_info, prompt_system) -> bool:
+        if template.agent_info is not agent_info:
+            return False
+        if template.tools_version is not None and template.tools_version != get_tool_registry().version:
+            return False
+        if template.features != _features(prompt_system):
+            return False
+        now = time.monotonic()
+        if now - template.checked_at < self.config.validate_interval:
+            return True
+        template.checked_at = now
+        if any(_stat(Path(path)) != stat for path, stat in template.sources.items()):
+            # Shared components are cached by the prompt system, so reload them too
+            if prompt_system is not None:
+                prompt_system.reload_shared_components()
+            return False
+        return True
+
+    def prewarm(self, agent_registry, prompt_system, config: Dict[str, Any]) -> int:
+        """Build the templates of all registered agents; returns how many were built."""
+        if not (self.config.enabled and self.config.prewarm and agent_registry):
+            return 0
+        built = 0
+        for agent_info in agent_registry.list_agents():
+            agent_id = agent_info.agent_id.lower()
+            try:
+                self.acquire(agent_id, agent_info, prompt_system, config)
+                built += 1
+            except Exception as e:
+                logger.warning(f"Failed to prewarm agent template for {agent_id}: {e}")
+        logger.info(f"Prewarmed {built} agent templates")
+        return built
+
+    def invalidate(self, agent_id: Optional[str] = None) -> None:
+        """Drop the templates of an agent, or of all agents."""
+        for key in [key for key in self._templates if agent_id is None or key[0] == agent_id.lower()]:
+            del self._templates[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "templates": sorted({key[0] for key in self._templates}),
+            **self.stats,
+            "build_ms": round(self.stats["build_ms"], 2),
+        }
+
+
+# Singleton accessor
+_agent_pool: Optional[AgentPool] = None
+
+
+def get_agent_pool() -> AgentPool:
+    """Get the process-wide agent template pool."""
+    global _agent_pool
+    if _agent_pool is None:
+        _agent_pool = AgentPool()
+    return _agent_pool
+
+
+def configure_agent_pool(settings: Optional[Dict[str, Any]]) -> AgentPool:
+    """Replace the process-wide agent template pool with one built from ``settings``."""
+    global _agent_pool
+    _agent_pool = AgentPool(AgentPoolConfig.from_dict(settings))
+    logger.info(f"Agent pool configured: {_agent_pool.config}")
+    return _agent_pool
@@ -11,6 +11,7 @@ from dataclasses import dataclass
 
 from ai_whisperer.services.execution.ai_loop import StatelessAILoop
 from ai_whisperer.services.execution.ai_loop_factory import AILoopFactory, AILoopConfig
+from ai_whisperer.services.execution.tool_result_cache import ToolResultCache
 from ai_whisperer.services.agents.config import AgentConfig
 
 logger = logging.getLogger(__name__)
@@ -42,13 +43,16 @@ class AILoopManager:
         """
         self._ai_loops: Dict[str, AILoopEntry] = {}
         self._default_config = default_config or {}
+        # Memoized read-only tool results, shared by all agents of the session
+        self.tool_result_cache = ToolResultCache()
         logger.info("AILoopManager initialized")
     
     def get_or_create_ai_loop(
         self,
         agent_id: str,
         agent_config: Optional[AgentConfig] = None,
-        fallback_config: Optional[Dict[str, Any]] = None
+        fallback_config: Optional[Dict[str, Any]] = None,
+        loop_config: Optional[AILoopConfig] = None
     ) -> StatelessAILoop:
         """
         Get existing AI loop for agent or create a new one.
@@ -57,6 +61,7 @@ class AILoopManager:
             agent_id: Unique identifier for the agent
             agent_config: Optional agent configuration with AI settings
             fallback_config: Fallback configuration if agent config missing
+            loop_config: Prebuilt AI loop configuration (from the agent pool)
             
         Returns:
             StatelessAILoop instance for the agent
@@ -70,7 +75,9 @@ class AILoopManager:
         logger.info(f"Creating new AI loop for agent {agent_id}")
         
         # Determine configuration
-        if agent_config:
+        if loop_config:
+            logger.info(f"Using prebuilt config: model={loop_config.model}, provider={loop_config.provider}")
+        elif agent_config:
             # Use agent-specific configuration
             loop_config = AILoopConfig.from_agent_config(agent_config)
             logger.info(
@@ -89,7 +96,8 @@ class AILoopManager:
         # Create agent context
         agent_context = {
             'agent_id': agent_id,
-            'agent_name': agent_config.name if agent_config else agent_id
+            'agent_name': agent_config.name if agent_config else agent_id,
+            'tool_result_cache': self.tool_result_cache
         }
         
         # Create AI loop
@@ -199,4 +207,5 @@ class AILoopManager:
         """Clean up all AI loops."""
         for agent_id in list(self._ai_loops.keys()):
             self.remove_ai_loop(agent_id)
+        self.tool_result_cache.invalidate()
         logger.info("AILoopManager cleaned up")
\ No newline at end of file
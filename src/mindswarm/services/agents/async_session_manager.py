@@ -14,6 +14,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from ai_whisperer.services.agents.stateless import StatelessAgent
+from ai_whisperer.services.ai.request_scheduler import RequestPriority, set_request_priority
 from ai_whisperer.services.agents.factory import AgentFactory
 from ai_whisperer.services.execution.ai_loop import StatelessAILoop
 from ai_whisperer.extensions.mailbox.mailbox import get_mailbox, Mail, MessagePriority
@@ -144,6 +145,9 @@ class AsyncAgentSessionManager:
     async def _agent_processor(self, session: AgentSession):
         """Background processor for an agent session."""
         logger.info(f"Starting processor for agent {session.agent_id}")
+
+        # Background agents queue behind interactive turns for AI requests
+        set_request_priority(RequestPriority.DEBBIE if session.agent_id.lower() == "d" else RequestPriority.AGENT)
         
         while self._running:
             try:
@@ -10,6 +10,7 @@ from dataclasses import dataclass, field
 from enum import Enum
 
 from ai_whisperer.services.agents.stateless import StatelessAgent
+from ai_whisperer.services.ai.request_scheduler import RequestPriority, set_request_priority
 from ai_whisperer.services.agents.registry import AgentRegistry
 from ai_whisperer.services.agents.ai_loop_manager import AILoopManager
 from ai_whisperer.services.execution.ai_loop import StatelessAILoop
@@ -224,6 +225,9 @@ class AsyncAgentSessionManager:
     async def _agent_processor(self, session: AsyncAgentSession):
         """Background processor for an agent - aligned with current patterns."""
         logger.info(f"Starting processor for agent {session.agent_id}")
+
+        # Background agents queue behind interactive turns for AI requests
+        set_request_priority(RequestPriority.DEBBIE if session.agent_id.lower() == "d" else RequestPriority.AGENT)
         
         try:
             while session.state != AgentState.STOPPED:
@@ -365,7 +369,7 @@ class AsyncAgentSessionManager:
         """Check mailbox without blocking."""
         try:
             mailbox = get_mailbox()
-            messages = mailbox.check_mail(session.agent_id)
+            messages = await mailbox.acheck_mail(session.agent_id)
             
             if messages:
                 logger.info(f"Agent {session.agent_id} has {len(messages)} new messages")
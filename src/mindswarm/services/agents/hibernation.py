@@ -0,0 +1,171 @@
+"""
+Hibernation of idle interactive sessions.
+
+A session keeps its agents, AI loops, agent contexts (conversation history and
+the contents of referenced files) and channel history in memory until its
+websocket closes, and sessions left open in browser tabs pile up. The session
+manager hibernates a session that has been idle for ``idle_seconds``: its state
+is written to a file and everything but a small stub (session id, websocket,
+project path) is dropped. The next request for the session rehydrates it from
+the file before any handler sees it.
+
+When the resident memory of the process is above ``memory_high_watermark_mb``,
+sessions idle for ``pressure_idle_seconds`` are hibernated too, least recently
+active first. Sessions with a turn in flight are never hibernated.
+
+Hibernation files live in ``state_dir``, in a subdirectory per worker in
+multi-worker mode. They are deleted on rehydration and, being useless once the
+process that held the websockets is gone, when the session manager starts.
+
+Key Components:
+- SessionHibernationConfig: Idle timeouts, memory watermark and state directory
+- SessionHibernator: Chooses sessions to hibernate and stores their state
+- process_rss_mb(): Resident memory of this process
+- get_session_hibernator() / configure_session_hibernation(): Process-wide hibernator
+
+Usage:
+    hibernator = get_session_hibernator()
+    for session_id in hibernator.select(last_activity):
+        await hibernator.write_state(session_id, state)
+
+Configuration (config/main.yaml):
+    session_hibernation:
+      enabled: true
+      idle_seconds: 900
+      memory_high_watermark_mb: 2048
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ai_whisperer.services.cluster.shared_state import current_worker_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionHibernationConfig:
+    """Settings for idle session hibernation."""
+    enabled: bool = True
+    idle_seconds: float = 900.0  # Idle time before a session is hibernated
+    check_interval: float = 30.0  # Seconds between sweeps for idle sessions
+    memory_high_watermark_mb: float = 0.0  # 0 disables; above it sessions hibernate sooner
+    pressure_idle_seconds: float = 60.0  # Idle time that suffices above the watermark
+    state_dir: str = ".WHISPER/hibernated"
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'SessionHibernationConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def process_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB, None where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class SessionHibernator:
+    """Hibernation policy and storage of hibernated session state."""
+
+    def __init__(self, config: Optional[SessionHibernationConfig] = None):
+        self.config = config or SessionHibernationConfig()
+        self.state_dir = Path(self.config.state_dir) / (current_worker_id() or "main")
+        self.stats = {"hibernated": 0, "rehydrated": 0, "pressure_sweeps": 0, "bytes_written": 0}
+
+    def purge(self) -> None:
+        """Delete the hibernation files of a previous run of this process."""
+        if self.state_dir.exists():
+            shutil.rmtree(self.state_dir, ignore_errors=True)
+
+    def under_pressure(self) -> bool:
+        """Whether resident memory is above the high watermark."""
+        watermark = self.config.memory_high_watermark_mb
+        if watermark <= 0:
+            return False
+        rss = process_rss_mb()
+        return rss is not None and rss > watermark
+
+    def select(self, last_activity: Dict[str, float], now: Optional[float] = None) -> List[str]:
+        """
+        Sessions to hibernate, least recently active first.
+
+        Args:
+            last_activity: time.monotonic() of the last activity of each idle candidate
+            now: Current time.monotonic() (for tests)
+        """
+        if not self.config.enabled or not last_activity:
+            return []
+        now = time.monotonic() if now is None else now
+        idle_seconds = self.config.idle_seconds
+        if self.under_pressure():
+            self.stats["pressure_sweeps"] += 1
+            idle_seconds = min(idle_seconds, self.config.pressure_idle_seconds)
+        idle = [session_id for session_id, active in last_activity.items() if now - active >= idle_seconds]
+        return sorted(idle, key=last_activity.get)
+
+    def _path(self, session_id: str) -> Path:
+        return self.state_dir / f"{session_id}.json"
+
+    async def write_state(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Write the state of a session being hibernated (off the event loop)."""
+        data = json.dumps(state, default=str)
+        await asyncio.to_thread(self._write, self._path(session_id), data)
+        self.stats["hibernated"] += 1
+        self.stats["bytes_written"] += len(data)
+
+    @staticmethod
+    def _write(path: Path, data: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    async def read_state(self, session_id: str) -> Dict[str, Any]:
+        """Read the state of a hibernated session and delete its file."""
+        path = self._path(session_id)
+        data = await asyncio.to_thread(path.read_text, encoding="utf-8")
+        self.discard(session_id)
+        self.stats["rehydrated"] += 1
+        return json.loads(data)
+
+    def discard(self, session_id: str) -> None:
+        """Delete the state of a hibernated session that is closed."""
+        try:
+            self._path(session_id).unlink()
+        except FileNotFoundError:
+            pass
+
+
+# Singleton accessor
+_session_hibernator: Optional[SessionHibernator] = None
+
+
+def get_session_hibernator() -> SessionHibernator:
+    """Get the process-wide session hibernator."""
+    global _session_hibernator
+    if _session_hibernator is None:
+        _session_hibernator = SessionHibernator()
+    return _session_hibernator
+
+
+def configure_session_hibernation(settings: Optional[Dict[str, Any]]) -> SessionHibernator:
+    """Replace the process-wide session hibernator with one built from ``settings``."""
+    global _session_hibernator
+    _session_hibernator = SessionHibernator(SessionHibernationConfig.from_dict(settings))
+    logger.info(f"Session hibernation configured: {_session_hibernator.config}")
+    return _session_hibernator
@@ -0,0 +1,221 @@
+"""
+Append-only journal of the interactive session index.
+
+StatelessSessionManager used to rewrite sessions.json, synchronously and while
+holding its lock, on every session it created or closed. During a reconnect
+storm that one file write serialized every connection. The journal only
+queues a record in memory; a background task appends the queued records in
+one write per batch, off the event loop, after waiting ``flush_interval`` for
+more records to arrive. Once the journal holds ``compact_min_records`` records
+and more than ``compact_ratio`` times as many as there are live sessions, it
+is rewritten as a single snapshot. Sessions left open by a previous process
+are reported by load() and then treated as closed.
+
+Records are JSON lines:
+- {"op": "create", "session_id": ..., "ts": ...}
+- {"op": "close", "session_id": ..., "ts": ...}
+- {"op": "snapshot", "sessions": [...], "ts": ...} (replaces everything before it)
+
+Key Components:
+- SessionJournalConfig: Location, debounce interval and compaction thresholds
+- SessionJournal: Queues records, flushes and compacts them, replays the journal
+- get_session_journal_config() / configure_session_journal(): Settings for new journals
+
+Usage:
+    journal = SessionJournal()
+    previous_sessions = journal.load()  # Left open by the last process
+    journal.record_created(session_id)  # Never blocks on disk
+    await journal.aclose()  # Flush on shutdown
+
+Configuration (config/main.yaml):
+    session_journal:
+      enabled: true
+      path: .WHISPER/sessions.journal
+      flush_interval: 0.5
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SessionJournalConfig:
+    """Settings for the session index journal."""
+    enabled: bool = True
+    path: str = ".WHISPER/sessions.journal"
+    flush_interval: float = 0.5  # Seconds to wait for more records before a write
+    compact_min_records: int = 1000  # Journal size below which it is never compacted
+    compact_ratio: float = 4.0  # Compact when records exceed this many times the live sessions
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'SessionJournalConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class SessionJournal:
+    """Session index persisted as an append-only journal with background flushes."""
+
+    def __init__(self, config: Optional[SessionJournalConfig] = None):
+        self.config = config or get_session_journal_config()
+        self.path = Path(self.config.path)
+        self.sessions: Set[str] = set()  # Live sessions, including queued records
+        self._pending: List[Dict[str, Any]] = []
+        self._records = 0  # Records in the file
+        self._rewrite_next = False  # The file ends in a torn line that appends would corrupt
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock: Optional[asyncio.Lock] = None  # One writer at a time, in record order
+        self.stats = {"records": 0, "flushes": 0, "compactions": 0, "flush_errors": 0}
+
+    def load(self) -> Set[str]:
+        """
+        Replay the journal (at startup, before any record is queued).
+
+        Returns the sessions the previous process left open. That process and
+        its connections are gone, so they are not live here: the journal starts
+        over from an empty snapshot, and compaction only counts this process's
+        sessions.
+        """
+        self.sessions = set()
+        self._records = 0
+        if not self.config.enabled or not self.path.exists():
+            return set()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self._apply(record)
+        previous, self.sessions = self.sessions, set()
+        try:
+            self._rewrite(json.dumps({"op": "snapshot", "sessions": [], "ts": time.time()}) + "\n")
+            self._records = 1
+        except OSError as e:
+            # Appends after a torn last line would corrupt it; rewrite on the first flush instead
+            self._rewrite_next = True
+            logger.error(f"Failed to reset session journal {self.path}: {e}")
+        return previous
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record.get("op")
+        if op == "create":
+            self.sessions.add(record["session_id"])
+        elif op == "close":
+            self.sessions.discard(record["session_id"])
+        elif op == "snapshot":
+            self.sessions = set(record.get("sessions", []))
+
+    def record_created(self, session_id: str) -> None:
+        self._queue({"op": "create", "session_id": session_id, "ts": time.time()})
+
+    def record_closed(self, session_id: str) -> None:
+        self._queue({"op": "close", "session_id": session_id, "ts": time.time()})
+
+    def _queue(self, record: Dict[str, Any]) -> None:
+        if not self.config.enabled:
+            return
+        self._apply(record)
+        self._pending.append(record)
+        self.stats["records"] += 1
+        if self._flush_task is None or self._flush_task.done():
+            try:
+                self._wakeup = asyncio.Event()
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+            except RuntimeError:
+                return  # No event loop: flushed by the next record queued on one, or by aclose()
+        self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # Debounce: let the records of a burst gather into one write
+            await asyncio.sleep(self.config.flush_interval)
+            self._wakeup.clear()
+            # A write in progress completes even if the loop is cancelled by aclose()
+            await asyncio.shield(self.flush())
+
+    async def flush(self) -> None:
+        """Append the queued records (compacting the journal when it has grown)."""
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            await self._flush_pending()
+
+    async def _flush_pending(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        compact = self._rewrite_next or (
+            self._records + len(batch) >= self.config.compact_min_records
+            and self._records + len(batch) > self.config.compact_ratio * max(len(self.sessions), 1))
+        try:
+            if compact:
+                snapshot = {"op": "snapshot", "sessions": sorted(self.sessions), "ts": time.time()}
+                await asyncio.to_thread(self._rewrite, json.dumps(snapshot) + "\n")
+                self._records = 1
+                self._rewrite_next = False
+                self.stats["compactions"] += 1
+            else:
+                await asyncio.to_thread(self._append, "".join(json.dumps(record) + "\n" for record in batch))
+                self._records += len(batch)
+            self.stats["flushes"] += 1
+        except OSError as e:
+            # Keep the records for the next flush
+            self._pending[:0] = batch
+            self.stats["flush_errors"] += 1
+            logger.error(f"Failed to write session journal {self.path}: {e}")
+
+    def _append(self, data: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+    def _rewrite(self, data: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    async def aclose(self) -> None:
+        """Stop the background task and flush what is queued."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+
+# Settings used for new journals
+_journal_config: Optional[SessionJournalConfig] = None
+
+
+def get_session_journal_config() -> SessionJournalConfig:
+    """Get the settings used for new session journals."""
+    global _journal_config
+    if _journal_config is None:
+        _journal_config = SessionJournalConfig()
+    return _journal_config
+
+
+def configure_session_journal(settings: Optional[Dict[str, Any]]) -> SessionJournalConfig:
+    """Replace the settings used for new session journals."""
+    global _journal_config
+    _journal_config = SessionJournalConfig.from_dict(settings)
+    logger.info(f"Session journal configured: {_journal_config}")
+    return _journal_config
@@ -28,6 +28,7 @@ from typing import Any, Dict, Optional, Callable, List
 from ai_whisperer.services.agents.config import AgentConfig
 from ai_whisperer.context.agent_context import AgentContext
 from ai_whisperer.services.execution.ai_loop import StatelessAILoop
+from ai_whisperer.services.execution.turn_metrics import turn_timing
 from ai_whisperer.extensions.agents.continuation_strategy import ContinuationStrategy
 
 logger = logging.getLogger(__name__)
@@ -84,7 +85,7 @@ class StatelessAgent:
         Args:
             message: The message to process
             on_stream_chunk: Optional callback for streaming chunks
-            **kwargs: Additional parameters (temperature, max_tokens, etc.)
+            **kwargs: Additional parameters (temperature, max_tokens, cancellation, etc.)
             
         Returns:
             The AI response - either a string or a dict with response/tool_calls
@@ -110,19 +111,25 @@ class StatelessAgent:
             # Extract response_format if provided
             response_format = kwargs.get('response_format', None)
             
+            # Token of the turn, cancelled when the user moves on or disconnects
+            cancellation = kwargs.get('cancellation', None)
+            
             # Get filtered tools for this agent
             tools = self._get_agent_tools()
             
             # Process through stateless AI loop with agent-specific tools
-            result = await self.ai_loop.process_with_context(
-                message=message,
-                context_provider=self.context,
-                on_stream_chunk=on_stream_chunk,
-                tools=tools,  # Pass filtered tools
-                store_messages=store_messages,
-                response_format=response_format,
-                **generation_params
-            )
+            # (timed as a turn, or as part of the session's turn)
+            with turn_timing(agent_id=self.agent_id, model=self.config.model_name):
+                result = await self.ai_loop.process_with_context(
+                    message=message,
+                    context_provider=self.context,
+                    on_stream_chunk=on_stream_chunk,
+                    tools=tools,  # Pass filtered tools
+                    store_messages=store_messages,
+                    response_format=response_format,
+                    cancellation=cancellation,
+                    **generation_params
+                )
             
             # Handle the result
             if result.get('error'):
@@ -207,17 +214,15 @@ class StatelessAgent:
             
             tool_registry = get_tool_registry()
             
-            # Get filtered tools based on agent configuration
-            filtered_tools = tool_registry.get_tools_for_agent(
+            # Get filtered OpenRouter tool definitions based on agent configuration.
+            # These are cached and pre-encoded by the registry (an immutable sequence).
+            tool_definitions = tool_registry.get_encoded_tool_definitions(
                 tool_sets=getattr(self.agent_registry_info, 'tool_sets', None),
                 tags=getattr(self.agent_registry_info, 'tool_tags', None),
                 allow_tools=getattr(self.agent_registry_info, 'allow_tools', None),
                 deny_tools=getattr(self.agent_registry_info, 'deny_tools', None)
             )
             
-            # Convert tools to OpenRouter tool definitions
-            tool_definitions = [tool.get_openrouter_tool_definition() for tool in filtered_tools]
-            
             logger.info(f"Agent {self.config.name}: Using {len(tool_definitions)} filtered tools")
             return tool_definitions
             
@@ -5,4 +5,8 @@ This package contains AI service implementations:
 - base: Base AI service interface
 - openrouter: OpenRouter API integration
 - tool_calling: Tool calling functionality
+- http_pool: Shared keep-alive HTTP clients
+- sse: Incremental SSE stream decoding
+- completion_cache: Exact-match completion cache
+- mock_openrouter: Local OpenRouter-compatible mock server for benchmarking
 """
@@ -0,0 +1,321 @@
+"""
+Exact-match completion cache for deterministic requests.
+
+Streamed completions are stored under a canonical hash of the request payload
+built by OpenRouterAIService._build_payload. On a hit the stored chunks are
+replayed as a synthetic stream, so consumers such as StatelessAILoop see the
+same sequence of content, reasoning, tool call and finish_reason deltas they
+would get from the API.
+
+Key Components:
+- CompletionCacheConfig: Tiers, size limits and TTL (disabled by default)
+- CompletionCache: Memory LRU tier backed by an optional disk tier
+- get_completion_cache(): Singleton accessor
+- configure_completion_cache(): Apply settings from the app config
+
+Usage:
+    cache = get_completion_cache()
+    key = cache.key_for(payload)
+    if key:
+        chunks = await cache.aget(key)
+
+Configuration (config/main.yaml):
+    openrouter:
+      completion_cache:
+        enabled: true
+        deterministic_only: true   # only cache temperature 0 requests
+        ttl_seconds: 86400
+        memory_max_bytes: 67108864
+        disk_dir: .cache/completions  # omit for memory only
+        disk_max_bytes: 536870912
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CompletionCacheConfig:
+    """Settings for the completion cache."""
+    enabled: bool = False
+    deterministic_only: bool = True  # Skip requests with a non-zero temperature
+    ttl_seconds: Optional[float] = 86400.0  # None keeps entries until evicted
+    memory_max_bytes: int = 64 * 1024 * 1024
+    disk_dir: Optional[str] = None  # None disables the disk tier
+    disk_max_bytes: int = 512 * 1024 * 1024
+    max_entry_bytes: int = 4 * 1024 * 1024
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'CompletionCacheConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class CompletionCache:
+    """
+    Two-tier exact-match cache of streamed completions.
+
+    Entries are the serialized list of chunk dicts of a completed stream. The
+    memory tier is an LRU bounded by total bytes; the disk tier stores one file
+    per entry and evicts least recently used files (by mtime) when it grows
+    past its byte limit. Disk access happens off the event loop via aget/aput.
+    """
+
+    def __init__(self, config: Optional[CompletionCacheConfig] = None):
+        self.config = config or CompletionCacheConfig()
+        self._memory: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_sizes: Dict[str, int] = {}
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "bytes_served": 0,
+            "bytes_stored": 0,
+        }
+        self._disk_dir = Path(self.config.disk_dir) if self.config.enabled and self.config.disk_dir else None
+        if self._disk_dir:
+            self._load_disk_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def key_for(self, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Get the cache key for a request payload, or None if it is not cacheable.
+
+        The key is a SHA-256 of the payload serialized with sorted keys and no
+        insignificant whitespace, so dict ordering does not affect it. Tool
+        definitions that carry a digest of their encoding are keyed by it.
+        """
+        if not self.config.enabled:
+            return None
+        if self.config.deterministic_only and payload.get("temperature") != 0:
+            return None
+        tools_digest = getattr(payload.get("tools"), "digest", None)
+        if tools_digest:
+            payload = {**payload, "tools": tools_digest}
+        try:
+            canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Look up a completed stream. Returns its chunk dicts or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, data = entry
+                if expires_at and expires_at < now:
+                    self._drop_memory(key)
+                    self._stats["expired"] += 1
+                else:
+                    self._memory.move_to_end(key)
+                    self._stats["hits_memory"] += 1
+                    self._stats["bytes_served"] += len(data)
+                    return json.loads(data)
+
+        data = self._read_disk(key, now)
+        with self._lock:
+            if data is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits_disk"] += 1
+            self._stats["bytes_served"] += len(data)
+            self._put_memory(key, self._expiry(now), data)
+        return json.loads(data)
+
+    def put(self, key: str, chunks: List[Dict[str, Any]]) -> bool:
+        """Store the chunk dicts of a completed stream. Returns False if too large."""
+        data = json.dumps(chunks, separators=(",", ":")).encode("utf-8")
+        if len(data) > self.config.max_entry_bytes:
+            logger.debug(f"Completion too large to cache ({len(data)} bytes)")
+            return False
+        expires_at = self._expiry(time.time())
+        with self._lock:
+            self._put_memory(key, expires_at, data)
+            self._stats["stores"] += 1
+            self._stats["bytes_stored"] += len(data)
+        self._write_disk(key, expires_at, data)
+        return True
+
+    async def aget(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Async lookup; the disk tier is read in a worker thread."""
+        if self._disk_dir is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, chunks: List[Dict[str, Any]]) -> bool:
+        """Async store; the disk tier is written in a worker thread."""
+        if self._disk_dir is None:
+            return self.put(key, chunks)
+        return await asyncio.to_thread(self.put, key, chunks)
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            keys = list(self._disk_sizes)
+            self._disk_sizes.clear()
+            self._disk_bytes = 0
+        for key in keys:
+            self._entry_path(key).unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics for monitoring."""
+        with self._lock:
+            lookups = self._stats["hits_memory"] + self._stats["hits_disk"] + self._stats["misses"]
+            hits = self._stats["hits_memory"] + self._stats["hits_disk"]
+            return {
+                "enabled": self.config.enabled,
+                **self._stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_sizes),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # Memory tier (callers hold self._lock)
+
+    def _expiry(self, now: float) -> float:
+        return now + self.config.ttl_seconds if self.config.ttl_seconds else 0.0
+
+    def _put_memory(self, key: str, expires_at: float, data: bytes) -> None:
+        self._drop_memory(key)
+        self._memory[key] = (expires_at, data)
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.config.memory_max_bytes and self._memory:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self._stats["evictions"] += 1
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[1])
+
+    # Disk tier
+
+    def _entry_path(self, key: str) -> Path:
+        return self._disk_dir / key[:2] / f"{key}.json"
+
+    def _load_disk_index(self) -> None:
+        try:
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            for path in self._disk_dir.glob("*/*.json"):
+                size = path.stat().st_size
+                self._disk_sizes[path.stem] = size
+                self._disk_bytes += size
+            logger.info(f"Completion cache disk tier at {self._disk_dir}: "
+                        f"{len(self._disk_sizes)} entries, {self._disk_bytes} bytes")
+        except OSError as e:
+            logger.warning(f"Disabling completion cache disk tier: {e}")
+            self._disk_dir = None
+
+    def _read_disk(self, key: str, now: float) -> Optional[bytes]:
+        if self._disk_dir is None or key not in self._disk_sizes:
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                header = f.readline()
+                data = f.read()
+            expires_at = float(header)
+            if expires_at and expires_at < now:
+                self._remove_disk(key)
+                with self._lock:
+                    self._stats["expired"] += 1
+                return None
+            os.utime(path)  # mtime tracks recency for LRU eviction
+            return data
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable completion cache entry {key}: {e}")
+            self._remove_disk(key)
+            return None
+
+    def _write_disk(self, key: str, expires_at: float, data: bytes) -> None:
+        if self._disk_dir is None:
+            return
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            path.parent.mkdir(exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(f"{expires_at}\n".encode("ascii"))
+                f.write(data)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except OSError as e:
+            logger.warning(f"Failed to write completion cache entry {key}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += size - self._disk_sizes.get(key, 0)
+            self._disk_sizes[key] = size
+            over_limit = self._disk_bytes > self.config.disk_max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _remove_disk(self, key: str) -> None:
+        with self._lock:
+            self._disk_bytes -= self._disk_sizes.pop(key, 0)
+        self._entry_path(key).unlink(missing_ok=True)
+
+    def _evict_disk(self) -> None:
+        """Remove least recently used files until the disk tier fits its limit."""
+        entries = []
+        for key in list(self._disk_sizes):
+            try:
+                entries.append((self._entry_path(key).stat().st_mtime, key))
+            except OSError:
+                entries.append((0.0, key))
+        entries.sort()
+        for _, key in entries:
+            if self._disk_bytes <= self.config.disk_max_bytes:
+                break
+            self._remove_disk(key)
+            with self._lock:
+                self._stats["evictions"] += 1
+
+
+# Singleton accessor
+_completion_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> CompletionCache:
+    """Get the process-wide completion cache (disabled unless configured)."""
+    global _completion_cache
+    if _completion_cache is None:
+        _completion_cache = CompletionCache()
+    return _completion_cache
+
+
+def configure_completion_cache(settings: Optional[Dict[str, Any]]) -> CompletionCache:
+    """Replace the process-wide completion cache with one built from ``settings``."""
+    global _completion_cache
+    _completion_cache = CompletionCache(CompletionCacheConfig.from_dict(settings))
+    if _completion_cache.enabled:
+        logger.info(f"Completion cache enabled: {_completion_cache.config}")
+    return _completion_cache
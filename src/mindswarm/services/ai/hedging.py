@@ -0,0 +1,157 @@
+"""
+Hedged requests and model failover for slow first tokens.
+
+OpenRouterAIService records the time-to-first-token (TTFT) of every stream
+per model. When hedging is enabled and a stream has not produced its first
+chunk within a percentile of the recent TTFTs for its model, a second request
+is sent to a fallback model. Whichever stream produces a chunk first is used
+and the other is cancelled.
+
+Fallbacks come from configuration and are only used if their capabilities
+(from model_capabilities) cover what the request needs: tool calling parity
+and structured output support.
+
+Key Components:
+- HedgingConfig: Percentile, delay bounds and fallback candidates
+- HedgingPolicy: TTFT tracking, hedge delay, fallback choice and statistics
+- get_hedging_policy() / configure_hedging(): Singleton access
+
+Configuration (config/main.yaml):
+    openrouter:
+      hedging:
+        enabled: true
+        ttft_percentile: 95
+        fallbacks:
+          google/gemini-2.5-flash-preview: [openai/gpt-4o-mini]
+        default_fallbacks: [openai/gpt-4o-mini]
+"""
+
+import logging
+import statistics
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, fields
+from typing import Any, Deque, Dict, List, Optional
+
+from ai_whisperer.model_capabilities import get_model_capabilities, has_quirk
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HedgingConfig:
+    """Settings for hedged requests (disabled by default)."""
+    enabled: bool = False
+    ttft_percentile: float = 95.0
+    min_samples: int = 20  # Below this, initial_delay is used
+    initial_delay: float = 10.0
+    min_delay: float = 1.0
+    max_delay: float = 30.0
+    window: int = 200  # Recent TTFT samples kept per model
+    fallbacks: Dict[str, List[str]] = field(default_factory=dict)
+    default_fallbacks: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'HedgingConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class HedgingPolicy:
+    """Tracks TTFT per model and decides when and where to hedge."""
+
+    def __init__(self, config: Optional[HedgingConfig] = None):
+        self.config = config or HedgingConfig()
+        self._ttft: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.config.window))
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"requests": 0, "hedged": 0, "fallback_wins": 0, "primary_wins": 0, "no_fallback": 0}
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.enabled
+
+    def record_ttft(self, model: str, seconds: float) -> None:
+        """Record a time-to-first-token sample (or a lower bound for a cancelled stream)."""
+        self._ttft[model].append(seconds)
+
+    def hedge_delay(self, model: str) -> float:
+        """Seconds to wait for the first chunk before hedging a request to ``model``."""
+        samples = self._ttft.get(model)
+        if not samples or len(samples) < self.config.min_samples:
+            delay = self.config.initial_delay
+        else:
+            ordered = sorted(samples)
+            index = min(len(ordered) - 1, int(len(ordered) * self.config.ttft_percentile / 100.0))
+            delay = ordered[index]
+        return min(self.config.max_delay, max(self.config.min_delay, delay))
+
+    def choose_fallback(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Pick the first configured fallback able to serve ``payload``, if any."""
+        model = payload.get("model", "")
+        candidates = self.config.fallbacks.get(model) or self.config.default_fallbacks
+        for candidate in candidates:
+            if candidate != model and self._is_compatible(model, candidate, payload):
+                return candidate
+        self._stats[model]["no_fallback"] += 1
+        return None
+
+    @staticmethod
+    def _is_compatible(model: str, candidate: str, payload: Dict[str, Any]) -> bool:
+        primary_caps = get_model_capabilities(model)
+        candidate_caps = get_model_capabilities(candidate)
+        tools = payload.get("tools")
+        if tools:
+            if primary_caps.get("multi_tool") and not candidate_caps.get("multi_tool"):
+                return False
+            if candidate_caps.get("max_tools_per_turn", 1) < min(primary_caps.get("max_tools_per_turn", 1), len(tools)):
+                return False
+        if payload.get("response_format"):
+            if not candidate_caps.get("structured_output"):
+                return False
+            if tools and has_quirk(candidate, "no_tools_with_structured_output"):
+                return False
+        return True
+
+    def record_request(self, model: str) -> None:
+        self._stats[model]["requests"] += 1
+
+    def record_hedge(self, model: str) -> None:
+        self._stats[model]["hedged"] += 1
+
+    def record_winner(self, model: str, fallback_won: bool) -> None:
+        self._stats[model]["fallback_wins" if fallback_won else "primary_wins"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedge rate, win counts and TTFT percentiles per model."""
+        models = {}
+        for model in set(self._stats) | set(self._ttft):
+            stats = dict(self._stats[model])
+            samples = sorted(self._ttft.get(model, ()))
+            stats["hedge_rate"] = round(stats["hedged"] / stats["requests"], 4) if stats["requests"] else 0.0
+            stats["ttft_p50_ms"] = round(statistics.median(samples) * 1000, 1) if samples else None
+            stats["hedge_delay_ms"] = round(self.hedge_delay(model) * 1000, 1)
+            models[model] = stats
+        return {"enabled": self.config.enabled, "models": models}
+
+
+# Singleton accessor
+_hedging_policy: Optional[HedgingPolicy] = None
+
+
+def get_hedging_policy() -> HedgingPolicy:
+    """Get the process-wide hedging policy (disabled unless configured)."""
+    global _hedging_policy
+    if _hedging_policy is None:
+        _hedging_policy = HedgingPolicy()
+    return _hedging_policy
+
+
+def configure_hedging(settings: Optional[Dict[str, Any]]) -> HedgingPolicy:
+    """Replace the process-wide hedging policy with one built from ``settings``."""
+    global _hedging_policy
+    _hedging_policy = HedgingPolicy(HedgingConfig.from_dict(settings))
+    if _hedging_policy.enabled:
+        logger.info(f"Hedged requests enabled: {_hedging_policy.config}")
+    return _hedging_policy
@@ -0,0 +1,206 @@
+"""
+Process-wide pooled HTTP clients for AI service requests.
+
+Every OpenRouterAIService leases its HTTP clients from a single registry so
+that connections (and their TCP/TLS handshakes) are reused across agents,
+sessions and turns instead of being opened per request.
+
+Key Components:
+- HTTPPoolConfig: Connection limits, keep-alive expiry and HTTP/2 settings
+- HTTPClientPool: Registry of keep-alive clients, one per host (and event loop)
+- get_http_pool(): Singleton accessor
+- configure_http_pool(): Apply settings from the app config
+
+Usage:
+    pool = get_http_pool()
+    client = pool.get_async_client("https://openrouter.ai/api/v1/chat/completions")
+    async with client.stream("POST", url, json=payload) as response:
+        ...
+
+Configuration (config/main.yaml):
+    openrouter:
+      http_pool:
+        max_connections_per_host: 100
+        max_keepalive_connections: 20
+        keepalive_expiry: 30.0
+        http2: false
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HTTPPoolConfig:
+    """Settings applied to every pooled client."""
+    max_connections_per_host: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # Idle connections are evicted after this many seconds
+    http2: bool = False
+    timeout: float = 60.0
+    connect_timeout: float = 10.0
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'HTTPPoolConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class HTTPClientPool:
+    """
+    Registry of keep-alive HTTP clients keyed by host.
+
+    Sync clients are shared by all threads. Async clients are bound to the
+    event loop that created them (httpx ties pooled connections to a loop),
+    so there is one per host and loop: a tool running ``asyncio.run`` in a
+    worker thread gets its own client and leaves the server loop's pool alone.
+    Clients of closed loops are pruned.
+    """
+
+    def __init__(self, config: Optional[HTTPPoolConfig] = None):
+        self.config = config or HTTPPoolConfig()
+        self._sync_clients: Dict[str, httpx.Client] = {}
+        self._async_clients: Dict[Tuple[str, asyncio.AbstractEventLoop], httpx.AsyncClient] = {}
+        self._acquired: Dict[str, int] = {}  # Clients handed out per host since startup
+        self._lock = threading.Lock()
+        self._http2 = self._resolve_http2(self.config.http2)
+
+    @staticmethod
+    def _resolve_http2(requested: bool) -> bool:
+        """HTTP/2 needs the optional 'h2' package; fall back to HTTP/1.1 without it."""
+        if not requested:
+            return False
+        try:
+            import h2  # noqa: F401
+            return True
+        except ImportError:
+            logger.warning("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1")
+            return False
+
+    @staticmethod
+    def _host_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.config.max_connections_per_host,
+                max_keepalive_connections=self.config.max_keepalive_connections,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout),
+            "http2": self._http2,
+        }
+
+    def get_sync_client(self, url: str) -> httpx.Client:
+        """Lease the shared blocking client for the host of ``url``."""
+        key = self._host_key(url)
+        with self._lock:
+            client = self._sync_clients.get(key)
+            if client is None or client.is_closed:
+                client = httpx.Client(**self._client_kwargs())
+                self._sync_clients[key] = client
+                logger.info(f"Created pooled HTTP client for {key} (http2={self._http2})")
+            self._acquired[key] = self._acquired.get(key, 0) + 1
+            return client
+
+    def get_async_client(self, url: str) -> httpx.AsyncClient:
+        """Lease the shared async client for the host of ``url`` on the running loop."""
+        key = self._host_key(url)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get((key, loop))
+            if client is None or client.is_closed:
+                self._prune_closed_loops()
+                client = httpx.AsyncClient(**self._client_kwargs())
+                self._async_clients[(key, loop)] = client
+                logger.info(f"Created pooled async HTTP client for {key} (http2={self._http2})")
+            self._acquired[key] = self._acquired.get(key, 0) + 1
+            return client
+
+    def _prune_closed_loops(self) -> None:
+        """Forget the clients of loops that have been closed (their connections went with them)."""
+        for entry in [entry for entry in self._async_clients if entry[1].is_closed()]:
+            del self._async_clients[entry]
+
+    @staticmethod
+    def _discard_async_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+        """Close an async client on the loop that owns its connections."""
+        if client.is_closed or loop.is_closed():
+            return  # Nothing open, or the connections went away with their loop
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            logger.warning("Dropping a pooled async HTTP client whose event loop is not running")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics for monitoring."""
+        with self._lock:
+            return {
+                "hosts": sorted(set(self._sync_clients) | {key for key, _ in self._async_clients}),
+                "sync_clients": len(self._sync_clients),
+                "async_clients": len(self._async_clients),
+                "acquired": dict(self._acquired),
+                "http2": self._http2,
+                "max_connections_per_host": self.config.max_connections_per_host,
+                "keepalive_expiry": self.config.keepalive_expiry,
+            }
+
+    def close(self) -> None:
+        """Close all sync clients. Async clients are dropped; use aclose() from a loop."""
+        with self._lock:
+            for client in self._sync_clients.values():
+                client.close()
+            self._sync_clients.clear()
+            self._async_clients.clear()
+
+    async def aclose(self) -> None:
+        """Close all clients: those of the running loop here, the others on their own loops."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            owned = [c for (_, l), c in self._async_clients.items() if l is loop]
+            for (_, client_loop), client in self._async_clients.items():
+                if client_loop is not loop:
+                    self._discard_async_client(client, client_loop)
+            self._async_clients.clear()
+        for client in owned:
+            await client.aclose()
+        self.close()
+
+
+# Singleton accessor
+_http_pool: Optional[HTTPClientPool] = None
+
+
+def get_http_pool() -> HTTPClientPool:
+    """Get the process-wide HTTP client pool."""
+    global _http_pool
+    if _http_pool is None:
+        _http_pool = HTTPClientPool()
+    return _http_pool
+
+
+def configure_http_pool(settings: Optional[Dict[str, Any]]) -> HTTPClientPool:
+    """
+    Replace the process-wide pool with one built from ``settings``.
+
+    Call once at startup, before any requests are made; existing sync clients
+    are closed.
+    """
+    global _http_pool
+    if _http_pool is not None:
+        _http_pool.close()
+    _http_pool = HTTPClientPool(HTTPPoolConfig.from_dict(settings))
+    logger.info(f"Configured HTTP client pool: {_http_pool.config}")
+    return _http_pool
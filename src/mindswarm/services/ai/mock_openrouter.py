@@ -0,0 +1,345 @@
+"""
+Local OpenRouter-compatible mock server for load and latency benchmarking.
+
+Serves /api/v1/chat/completions (streaming and non-streaming) and
+/api/v1/models so the whole stack can be exercised offline. Responses are
+synthetic but shaped like OpenRouter's: keep-alive comments before the first
+token, reasoning deltas, content deltas, tool call deltas with the arguments
+split across chunks, a finish_reason and a final usage block.
+
+Key Components:
+- MockOpenRouterConfig: Token rate, time-to-first-token, jitter, error rates
+- create_app(): Build the aiohttp application
+- main(): Command line entry point
+
+Usage:
+    python -m ai_whisperer.services.ai.mock_openrouter --port 8787 --tokens-per-second 80
+    OPENROUTER_BASE_URL=http://127.0.0.1:8787/api/v1 python api/main.py
+
+Behaviour:
+- When the request carries tools and the last message is not a tool result,
+  a tool call is emitted with probability ``tool_call_probability``. Arguments
+  are generated from the tool's JSON schema.
+- Reasoning deltas are sent first unless the request excludes reasoning.
+- ``error_429_rate`` / ``error_5xx_rate`` fail that share of requests; 429s
+  carry a Retry-After header.
+- Individual requests can force a behaviour with the X-Mock-Scenario header
+  (``tool_call``, ``text``, ``429``, ``500``, ``502``, ``503``).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+_WORDS = (
+    "the agent reviews the workspace and updates the plan before it runs the next "
+    "step so that each tool call stays small and the results are easy to verify"
+).split()
+
+
+@dataclass
+class MockOpenRouterConfig:
+    """Behaviour of the mock server."""
+    tokens_per_second: float = 50.0  # 0 streams as fast as possible
+    ttft_ms: float = 300.0
+    model_ttft_ms: Dict[str, float] = field(default_factory=dict)  # Per-model overrides
+    jitter_ms: float = 5.0  # Uniform +/- jitter added to each inter-token delay
+    response_tokens: int = 120
+    reasoning_tokens: int = 0
+    tool_call_probability: float = 0.5
+    error_429_rate: float = 0.0
+    error_5xx_rate: float = 0.0
+    retry_after_seconds: int = 1
+    keepalive_interval_ms: float = 100.0
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'MockOpenRouterConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+MOCK_MODELS = [
+    {"id": "mock/fast", "name": "Mock Fast", "context_length": 128000},
+    {"id": "mock/reasoning", "name": "Mock Reasoning", "context_length": 200000},
+    {"id": "mock/small", "name": "Mock Small", "context_length": 16000},
+]
+
+
+class MockOpenRouter:
+    """Request handlers and counters for one mock server instance."""
+
+    def __init__(self, config: MockOpenRouterConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.stats = {
+            "requests": 0,
+            "streams_active": 0,
+            "streams_completed": 0,
+            "tool_calls": 0,
+            "errors_429": 0,
+            "errors_5xx": 0,
+            "tokens_sent": 0,
+        }
+
+    # Response planning
+
+    def _pick_error(self, scenario: Optional[str]) -> Optional[int]:
+        if scenario in ("429", "500", "502", "503"):
+            return int(scenario)
+        roll = self.rng.random()
+        if roll < self.config.error_429_rate:
+            return 429
+        if roll < self.config.error_429_rate + self.config.error_5xx_rate:
+            return self.rng.choice((500, 502, 503))
+        return None
+
+    def _wants_tool_call(self, payload: Dict[str, Any], scenario: Optional[str]) -> bool:
+        if not payload.get("tools") or scenario == "text":
+            return False
+        messages = payload.get("messages") or []
+        if messages and messages[-1].get("role") == "tool":
+            return False
+        return scenario == "tool_call" or self.rng.random() < self.config.tool_call_probability
+
+    def _wants_reasoning(self, payload: Dict[str, Any]) -> bool:
+        reasoning = payload.get("reasoning") or {}
+        return self.config.reasoning_tokens > 0 and not reasoning.get("exclude")
+
+    def _token_count(self, payload: Dict[str, Any]) -> int:
+        max_tokens = payload.get("max_tokens")
+        if max_tokens:
+            return max(1, min(self.config.response_tokens, int(max_tokens)))
+        return self.config.response_tokens
+
+    def _words(self, count: int) -> List[str]:
+        return [self.rng.choice(_WORDS) + " " for _ in range(count)]
+
+    def _tool_call(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        tool = self.rng.choice(payload["tools"])
+        function = tool.get("function", {})
+        schema = function.get("parameters") or {}
+        arguments = {}
+        for name in schema.get("required", []):
+            prop = (schema.get("properties") or {}).get(name, {})
+            arguments[name] = self._sample_value(prop)
+        return {
+            "id": f"call_{uuid.uuid4().hex[:24]}",
+            "name": function.get("name", "unknown"),
+            "arguments": json.dumps(arguments),
+        }
+
+    def _sample_value(self, prop: Dict[str, Any]) -> Any:
+        if prop.get("enum"):
+            return prop["enum"][0]
+        kind = prop.get("type")
+        if kind == "integer":
+            return 1
+        if kind == "number":
+            return 1.0
+        if kind == "boolean":
+            return True
+        if kind == "array":
+            return []
+        if kind == "object":
+            return {}
+        return "mock"
+
+    def _ttft(self, model: str) -> float:
+        return self.config.model_ttft_ms.get(model, self.config.ttft_ms) / 1000.0
+
+    async def _token_delay(self) -> None:
+        if self.config.tokens_per_second <= 0:
+            return
+        delay = 1.0 / self.config.tokens_per_second
+        delay += self.rng.uniform(-1, 1) * self.config.jitter_ms / 1000.0
+        await asyncio.sleep(max(0.0, delay))
+
+    # Handlers
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        self.stats["requests"] += 1
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            return self._error(400, "Invalid JSON body")
+
+        scenario = request.headers.get("X-Mock-Scenario")
+        status = self._pick_error(scenario)
+        if status == 429:
+            self.stats["errors_429"] += 1
+            return self._error(429, "Rate limit exceeded (mock)",
+                               headers={"Retry-After": str(self.config.retry_after_seconds)})
+        if status:
+            self.stats["errors_5xx"] += 1
+            return self._error(status, "Upstream provider error (mock)")
+
+        completion_id = f"gen-{uuid.uuid4().hex[:16]}"
+        model = payload.get("model", "mock/fast")
+        tool_call = self._tool_call(payload) if self._wants_tool_call(payload, scenario) else None
+        reasoning = self._words(self.config.reasoning_tokens) if self._wants_reasoning(payload) else []
+        content = [] if tool_call else self._words(self._token_count(payload))
+        if tool_call:
+            self.stats["tool_calls"] += 1
+
+        if payload.get("stream"):
+            return await self._stream(request, completion_id, model, reasoning, content, tool_call)
+        return await self._complete(completion_id, model, reasoning, content, tool_call)
+
+    async def _complete(self, completion_id, model, reasoning, content, tool_call) -> web.Response:
+        await asyncio.sleep(self._ttft(model))
+        for _ in range(len(reasoning) + len(content)):
+            await self._token_delay()
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(content)}
+        if reasoning:
+            message["reasoning"] = "".join(reasoning)
+        if tool_call:
+            message["tool_calls"] = [{
+                "id": tool_call["id"],
+                "type": "function",
+                "function": {"name": tool_call["name"], "arguments": tool_call["arguments"]},
+            }]
+        self.stats["tokens_sent"] += len(reasoning) + len(content)
+        return web.json_response({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if tool_call else "stop",
+            }],
+            "usage": self._usage(reasoning, content),
+        })
+
+    async def _stream(self, request, completion_id, model, reasoning, content, tool_call) -> web.StreamResponse:
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+        })
+        await response.prepare(request)
+        self.stats["streams_active"] += 1
+        created = int(time.time())
+
+        async def send(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra):
+            chunk = {
+                "id": completion_id,
+                "provider": "Mock",
+                "model": model,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        try:
+            # Keep-alive comments until the first token, like OpenRouter
+            remaining = self._ttft(model)
+            interval = max(self.config.keepalive_interval_ms / 1000.0, 0.001)
+            while remaining > 0:
+                await response.write(b": OPENROUTER PROCESSING\n\n")
+                step = min(interval, remaining)
+                await asyncio.sleep(step)
+                remaining -= step
+
+            for word in reasoning:
+                await send({"role": "assistant", "content": "", "reasoning": word})
+                await self._token_delay()
+            for word in content:
+                await send({"role": "assistant", "content": word})
+                await self._token_delay()
+            if tool_call:
+                await send({"role": "assistant", "content": None, "tool_calls": [{
+                    "index": 0, "id": tool_call["id"], "type": "function",
+                    "function": {"name": tool_call["name"], "arguments": ""},
+                }]})
+                arguments = tool_call["arguments"]
+                for i in range(0, len(arguments), 8):
+                    await send({"tool_calls": [{"index": 0, "function": {"arguments": arguments[i:i + 8]}}]})
+                    await self._token_delay()
+
+            await send({"role": "assistant", "content": ""}, "tool_calls" if tool_call else "stop",
+                       usage=self._usage(reasoning, content))
+            await response.write(b"data: [DONE]\n\n")
+            self.stats["tokens_sent"] += len(reasoning) + len(content)
+            self.stats["streams_completed"] += 1
+        except ConnectionResetError:
+            # Client went away (cancelled turn, hedged loser)
+            logger.debug(f"Client disconnected from mock stream {completion_id}")
+        finally:
+            self.stats["streams_active"] -= 1
+        return response
+
+    async def models(self, request: web.Request) -> web.Response:
+        data = [{
+            **model,
+            "description": "Local mock model",
+            "pricing": {"prompt": "0", "completion": "0"},
+            "supported_parameters": ["tools", "tool_choice", "reasoning", "max_tokens", "temperature"],
+        } for model in MOCK_MODELS]
+        return web.json_response({"data": data})
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def _usage(self, reasoning: List[str], content: List[str]) -> Dict[str, int]:
+        completion = len(reasoning) + len(content)
+        return {"prompt_tokens": 0, "completion_tokens": completion, "total_tokens": completion}
+
+    @staticmethod
+    def _error(status: int, message: str, headers: Optional[Dict[str, str]] = None) -> web.Response:
+        return web.json_response({"error": {"code": status, "message": message}},
+                                 status=status, headers=headers)
+
+
+def create_app(config: Optional[MockOpenRouterConfig] = None) -> web.Application:
+    """Build the mock server application."""
+    mock = MockOpenRouter(config or MockOpenRouterConfig())
+    app = web.Application()
+    app["mock"] = mock
+    app.router.add_post("/api/v1/chat/completions", mock.chat_completions)
+    app.router.add_get("/api/v1/models", mock.models)
+    app.router.add_get("/mock/stats", mock.get_stats)
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local OpenRouter-compatible mock server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    defaults = MockOpenRouterConfig()
+    for f in fields(MockOpenRouterConfig):
+        if f.name == "model_ttft_ms":
+            continue
+        flag = "--" + f.name.replace("_", "-")
+        kind = int if f.name in ("seed", "response_tokens", "reasoning_tokens", "retry_after_seconds") else float
+        parser.add_argument(flag, type=kind, default=getattr(defaults, f.name))
+    parser.add_argument("--model-ttft", action="append", default=[], metavar="MODEL=MS",
+                        help="Time-to-first-token override for one model (repeatable)")
+    args = parser.parse_args(argv)
+
+    config = MockOpenRouterConfig.from_dict(vars(args))
+    for override in args.model_ttft:
+        model, _, ms = override.partition("=")
+        config.model_ttft_ms[model] = float(ms)
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Mock OpenRouter at http://{args.host}:{args.port}/api/v1 ({config})")
+    web.run_app(create_app(config), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,23 @@
 """OpenRouter AI Service implementation"""
-import requests
+import asyncio
+import httpx
 import json
 import threading
 import logging
 import os
-from typing import Any, Dict, List, Optional, AsyncIterator
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, AsyncIterator
 from ai_whisperer.services.ai.base import AIService, AIStreamChunk
+from ai_whisperer.services.ai.completion_cache import get_completion_cache
+from ai_whisperer.services.ai.hedging import get_hedging_policy
+from ai_whisperer.services.ai.http_pool import get_http_pool
+from ai_whisperer.services.ai.request_scheduler import get_request_scheduler
+from ai_whisperer.services.ai.sse import SSEDecoder, SSE_DONE, coalesce_deltas
+from ai_whisperer.services.ai.tool_calling import EncodedToolDefinitions
 from ai_whisperer.services.execution.ai_config import AIConfig
+from ai_whisperer.services.execution.turn_metrics import record_span, timed_span
+from ai_whisperer.model_capabilities import record_context_lengths
 from ai_whisperer.core.exceptions import ( 
     OpenRouterAIServiceError,
     OpenRouterAuthError,
@@ -17,8 +28,45 @@ from ai_whisperer.core.exceptions import (
 
 logger = logging.getLogger(__name__)
 
-API_URL = "https://openrouter.ai/api/v1/chat/completions"
-MODELS_API_URL = "https://openrouter.ai/api/v1/models"
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+_base_url = DEFAULT_BASE_URL
+
+# Decoded batches a stream may read ahead of a slow consumer
+STREAM_READ_AHEAD_BATCHES = 256
+
+def configure_base_url(base_url: Optional[str]) -> str:
+    """
+    Set the process-wide API base URL, e.g. a local mock server.
+
+    Precedence when a service is created: AIConfig.base_url, then the
+    OPENROUTER_BASE_URL environment variable, then this setting.
+    """
+    global _base_url
+    _base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+    if _base_url != DEFAULT_BASE_URL:
+        logger.info(f"OpenRouter base URL set to {_base_url}")
+    return _base_url
+
+
+def get_base_url() -> str:
+    """Get the API base URL used by services that do not set their own."""
+    return (os.getenv("OPENROUTER_BASE_URL") or _base_url).rstrip("/")
+
+
+class _Admission:
+    """When the request scheduler admitted a hedged request; called by _scheduled_stream."""
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.at: Optional[float] = None
+
+    def __call__(self) -> None:
+        self.at = time.monotonic()
+        self.event.set()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.at if self.at is not None else 0.0
+
 
 class OpenRouterAIService(AIService):
     """
@@ -43,10 +91,18 @@ class OpenRouterAIService(AIService):
         self.shutdown_event = shutdown_event
         self.site_url = getattr(config, "site_url", "http://AIWhisperer:8000")
         self.app_name = getattr(config, "app_name", "AIWhisperer")
+
+        # Endpoint (overridable to run against a local OpenRouter-compatible server)
+        self.base_url = (getattr(config, "base_url", None) or get_base_url()).rstrip("/")
+        self.api_url = f"{self.base_url}/chat/completions"
+        self.models_api_url = f"{self.base_url}/models"
         
         # Reasoning token configuration
         self.max_reasoning_tokens = getattr(config, "max_reasoning_tokens", None)
 
+        # Merge small content deltas that queue up while the consumer is busy
+        self.coalesce_stream_deltas = getattr(config, "coalesce_stream_deltas", True)
+
     def list_models(self) -> List[Dict[str, Any]]:
         """Get available models from OpenRouter."""
         headers = {
@@ -55,11 +111,14 @@ class OpenRouterAIService(AIService):
         }
         
         try:
-            response = requests.get(MODELS_API_URL, headers=headers, timeout=30)
+            client = get_http_pool().get_sync_client(self.models_api_url)
+            response = client.get(self.models_api_url, headers=headers, timeout=30)
             response.raise_for_status()
-            data = response.json()
-            return data.get("data", [])
-        except requests.exceptions.RequestException as e:
+            models = response.json().get("data", [])
+            # Context budgets use the reported context lengths from now on
+            record_context_lengths(models)
+            return models
+        except httpx.HTTPError as e:
             raise OpenRouterConnectionError(f"Failed to fetch models: {e}") from e
 
     def call_chat_completion(
@@ -85,7 +144,8 @@ class OpenRouterAIService(AIService):
         
         try:
             timeout = 60
-            response = requests.post(API_URL, headers=headers, json=payload, timeout=timeout)
+            client = get_http_pool().get_sync_client(self.api_url)
+            response = client.post(self.api_url, headers=headers, content=self._encode_payload(payload), timeout=timeout)
             
             if response.status_code >= 400:
                 self._handle_error_response(response)
@@ -100,7 +160,7 @@ class OpenRouterAIService(AIService):
             message_obj = choices[0].get("message", {})
             return {"response": data, "message": message_obj}
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             raise OpenRouterConnectionError(f"Network error: {e}") from e
 
     async def stream_chat_completion(
@@ -117,104 +177,307 @@ class OpenRouterAIService(AIService):
         
         # Build payload
         params = kwargs
-        payload = self._build_payload(messages, None, params, tools, response_format)
+        with timed_span("payload_build"):
+            payload = self._build_payload(messages, None, params, tools, response_format)
         payload["stream"] = True
         
-        # Stream using the internal method
-        async for chunk_data in self._stream_internal(payload):
-            # Convert to AIStreamChunk
-            choices = chunk_data.get("choices", [])
-            if choices:
-                choice = choices[0]
-                delta = choice.get("delta", {})
-                finish_reason = choice.get("finish_reason")
-                
-                yield AIStreamChunk(
-                    delta_content=delta.get("content"),
-                    delta_tool_call_part=delta.get("tool_calls"),
-                    finish_reason=finish_reason,
-                    delta_reasoning=delta.get("reasoning")
-                )
+        # Replay deterministic requests from the completion cache when enabled
+        cache = get_completion_cache()
+        cache_key = cache.key_for(payload)
+        if cache_key:
+            cached = await cache.aget(cache_key)
+            if cached is not None:
+                logger.info(f"[OPENROUTER] Completion cache hit for model: {payload.get('model')}")
+                for chunk_data in cached:
+                    stream_chunk = self._to_stream_chunk(chunk_data)
+                    if stream_chunk is not None:
+                        yield stream_chunk
+                return
+        recorded: Optional[List[Dict[str, Any]]] = [] if cache_key else None
+        finished = False
+        route = {"model": payload.get("model")}
 
-    async def _stream_internal(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
-        """Internal streaming implementation."""
-        import asyncio
-        
-        def sync_stream():
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "HTTP-Referer": self.site_url,
-                "X-Title": self.app_name,
-            }
-            
-            # Log key details about the API call
-            logger.info(f"[OPENROUTER] Starting stream for model: {payload.get('model')}")
-            logger.info(f"[OPENROUTER] Message count: {len(payload.get('messages', []))}")
-            logger.info(f"[OPENROUTER] Has tools: {bool(payload.get('tools'))}")
-            logger.info(f"[OPENROUTER] Tool count: {len(payload.get('tools', []))}")
-            
-            # Log last message role and preview
-            messages = payload.get('messages', [])
-            if messages:
-                last_msg = messages[-1]
-                logger.info(f"[OPENROUTER] Last message role: {last_msg.get('role')}")
-                content = last_msg.get('content', '')
-                preview = content[:100] + '...' if len(content) > 100 else content
-                logger.info(f"[OPENROUTER] Last message preview: {preview}")
-                
-            # Only log full payload if explicitly requested
-            if logger.isEnabledFor(logging.DEBUG) and os.getenv('AIWHISPERER_DEBUG_OPENROUTER'):
-                logger.debug(f"Full streaming payload: {json.dumps(payload, indent=2)}")
-            
+        async for chunk_data in self._hedged_stream(payload, route):
+            stream_chunk = self._to_stream_chunk(chunk_data)
+            if stream_chunk is not None:
+                if recorded is not None:
+                    recorded.append(chunk_data)
+                finished = finished or bool(stream_chunk.finish_reason)
+                yield stream_chunk
+
+        # Only complete streams from the requested model are cached
+        if (recorded and finished and route["model"] == payload.get("model")
+                and not (self.shutdown_event and self.shutdown_event.is_set())):
+            await cache.aput(cache_key, coalesce_deltas(recorded))
+
+    async def _hedged_stream(self, payload: Dict[str, Any], route: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream chunk dicts, hedging to a fallback model if the first chunk is slow.
+
+        Records the time-to-first-token per model. With hedging enabled, if no
+        chunk arrives within the policy's delay a second request is sent to a
+        compatible fallback model; the first stream to produce a chunk wins and
+        the other is cancelled. ``route["model"]`` is set to the winning model.
+        Both the delay and the time-to-first-token count from when the request
+        scheduler admits a request, so time spent queued never triggers a hedge.
+        """
+        policy = get_hedging_policy()
+        model = payload.get("model") or self.model
+        policy.record_request(model)
+        primary_admission = _Admission()
+        primary = self._scheduled_stream(payload, primary_admission)
+        primary_first = asyncio.ensure_future(anext(primary, None))
+        streams = {primary_first: (primary, model, primary_admission)}
+
+        try:
+            if policy.enabled:
+                admitted = asyncio.ensure_future(primary_admission.event.wait())
+                try:
+                    await asyncio.wait({primary_first, admitted}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    admitted.cancel()
+                done = {primary_first} if primary_first.done() else None
+                if not done:
+                    done, _ = await asyncio.wait({primary_first}, timeout=policy.hedge_delay(model))
+                fallback = None if done else policy.choose_fallback(payload)
+                if fallback:
+                    policy.record_hedge(model)
+                    logger.warning(f"[OPENROUTER] No first chunk from {model} after "
+                                   f"{primary_admission.elapsed():.1f}s, hedging to {fallback}")
+                    secondary_admission = _Admission()
+                    secondary = self._scheduled_stream({**payload, "model": fallback}, secondary_admission)
+                    secondary_first = asyncio.ensure_future(anext(secondary, None))
+                    streams[secondary_first] = (secondary, fallback, secondary_admission)
+
+            # First stream to produce a chunk (or finish cleanly) wins
+            pending = set(streams)
+            winner = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: t.exception() is not None):
+                    if task.exception() is None or not pending:
+                        winner = task
+                        break
+                    logger.warning(f"[OPENROUTER] Hedged stream for {streams[task][1]} failed: {task.exception()}")
+        except BaseException:
+            for task, (stream, _, _) in streams.items():
+                await self._cancel_stream(task, stream)
+            raise
+
+        stream, winner_model, winner_admission = streams.pop(winner)
+        for task, (loser, loser_model, loser_admission) in streams.items():
+            if not task.done() and loser_admission.at is not None:
+                # Lower bound: the loser had not produced a chunk by now
+                policy.record_ttft(loser_model, loser_admission.elapsed())
+            await self._cancel_stream(task, loser)
+        if streams:
+            policy.record_winner(model, fallback_won=winner_model != model)
+        route["model"] = winner_model
+
+        try:
+            first = winner.result()
+            if first is None:
+                return
+            policy.record_ttft(winner_model, winner_admission.elapsed())
+            yield first
+            async for chunk_data in stream:
+                yield chunk_data
+        finally:
+            await stream.aclose()
+
+    @staticmethod
+    async def _cancel_stream(task: asyncio.Future, stream) -> None:
+        """Cancel a pending first-chunk read and close its stream."""
+        task.cancel()
+        try:
+            # Unlike awaiting the task, wait() neither raises the task's own
+            # cancellation or error nor hides a cancellation of the caller
+            await asyncio.wait({task})
+        finally:
+            if task.done():
+                if not task.cancelled():
+                    task.exception()  # The losing stream's error is not of interest
+                await stream.aclose()
+
+    async def _scheduled_stream(self, payload: Dict[str, Any],
+                                on_admitted: Optional[Callable[[], None]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream chunk dicts once the request scheduler admits the request.
+
+        A 429 before any chunk was received pauses the model in the scheduler
+        for the Retry-After period and the request is queued again, up to the
+        scheduler's retry limit. ``on_admitted`` is called on each admission.
+        """
+        scheduler = get_request_scheduler()
+        model = payload.get("model") or self.model
+        attempt = 0
+        while True:
+            queued_at = time.perf_counter()
+            ticket = await scheduler.acquire(model, self.api_key)
+            record_span("queue_wait", time.perf_counter() - queued_at)
+            if on_admitted is not None:
+                on_admitted()
+            received = False
             try:
-                response = requests.post(API_URL, headers=headers, json=payload, stream=True, timeout=60)
-                
+                batches = self._read_ahead(payload) if self.coalesce_stream_deltas else self._stream_batches(payload)
+                async for batch in batches:
+                    for chunk_data in batch:
+                        received = True
+                        yield chunk_data
+                return
+            except OpenRouterRateLimitError as e:
+                if ticket is None:
+                    raise
+                scheduler.report_rate_limited(model, self.api_key, e.retry_after)
+                if received or attempt >= scheduler.config.max_rate_limit_retries:
+                    raise
+                attempt += 1
+                scheduler.record_retry()
+                logger.warning(f"[OPENROUTER] Rate limited on {model}, retry {attempt} queued")
+            finally:
+                scheduler.release(ticket)
+
+    @staticmethod
+    def _to_stream_chunk(chunk_data: Dict[str, Any]) -> Optional[AIStreamChunk]:
+        """Convert a decoded chunk dict to an AIStreamChunk (None if it has no choices)."""
+        choices = chunk_data.get("choices", [])
+        if not choices:
+            return None
+        choice = choices[0]
+        delta = choice.get("delta", {})
+        return AIStreamChunk(
+            delta_content=delta.get("content"),
+            delta_tool_call_part=delta.get("tool_calls"),
+            finish_reason=choice.get("finish_reason"),
+            delta_reasoning=delta.get("reasoning")
+        )
+
+    async def _read_ahead(self, payload: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Decode the stream in a reader task and hand the consumer everything that
+        has arrived since its last pull, with small deltas merged.
+
+        When the consumer keeps up each pull holds a single chunk; when it falls
+        behind, the queued content deltas are coalesced into one chunk instead of
+        being delivered one token at a time.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_READ_AHEAD_BATCHES)
+
+        async def reader():
+            try:
+                async for batch in self._stream_batches(payload):
+                    await queue.put(batch)
+                await queue.put(None)
+            except Exception as e:
+                await queue.put(e)
+
+        reader_task = asyncio.create_task(reader())
+        try:
+            while True:
+                item = await queue.get()
+                pending = []
+                while True:
+                    if item is None:
+                        if pending:
+                            yield coalesce_deltas(pending)
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    pending.extend(item)
+                    if queue.empty():
+                        break
+                    item = queue.get_nowait()
+                yield coalesce_deltas(pending)
+        finally:
+            reader_task.cancel()
+            try:
+                await reader_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _stream_internal(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Stream parsed chunk dicts one at a time."""
+        async for batch in self._stream_batches(payload):
+            for chunk_data in batch:
+                yield chunk_data
+
+    async def _stream_batches(self, payload: Dict[str, Any]) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Internal streaming implementation.
+
+        Streams the SSE response on the pooled async HTTP client, so no thread is
+        spawned per request. Closing or cancelling the consuming task closes the
+        upstream response and releases its connection immediately.
+
+        Yields the chunks decoded from each block of the response body as one
+        list.
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": self.site_url,
+            "X-Title": self.app_name,
+        }
+
+        # Log key details about the API call
+        logger.info(f"[OPENROUTER] Starting stream for model: {payload.get('model')}")
+        logger.info(f"[OPENROUTER] Message count: {len(payload.get('messages', []))}")
+        logger.info(f"[OPENROUTER] Has tools: {bool(payload.get('tools'))}")
+        logger.info(f"[OPENROUTER] Tool count: {len(payload.get('tools', []))}")
+
+        # Log last message role and preview
+        messages = payload.get('messages', [])
+        if messages:
+            last_msg = messages[-1]
+            logger.info(f"[OPENROUTER] Last message role: {last_msg.get('role')}")
+            content = last_msg.get('content', '')
+            preview = content[:100] + '...' if len(content) > 100 else content
+            logger.info(f"[OPENROUTER] Last message preview: {preview}")
+
+        # Only log full payload if explicitly requested
+        if logger.isEnabledFor(logging.DEBUG) and os.getenv('AIWHISPERER_DEBUG_OPENROUTER'):
+            logger.debug(f"Full streaming payload: {json.dumps(payload, indent=2)}")
+
+        client = get_http_pool().get_async_client(self.api_url)
+        with timed_span("payload_encode"):
+            body = self._encode_payload(payload)
+        try:
+            async with client.stream("POST", self.api_url, headers=headers, content=body) as response:
                 if response.status_code >= 400:
+                    await response.aread()
                     self._handle_error_response(response)
-                
+
                 # Process SSE stream
-                for line in response.iter_lines():
+                decoder = SSEDecoder()
+                async for data in response.aiter_bytes():
                     if self.shutdown_event and self.shutdown_event.is_set():
                         break
-                        
-                    if line:
-                        if line.startswith(b"data: "):
-                            json_str = line.decode("utf-8")[6:].strip()
-                            if json_str == "[DONE]":
-                                break
-                            try:
-                                yield json.loads(json_str)
-                            except json.JSONDecodeError as e:
-                                logger.error(f"Failed to parse chunk: {e}")
-                                
-            except requests.exceptions.RequestException as e:
-                raise OpenRouterConnectionError(f"Streaming error: {e}") from e
-        
-        # Run sync generator in thread
-        loop = asyncio.get_event_loop()
-        queue = asyncio.Queue()
-        
-        def run_sync():
+
+                    batch, done = self._parse_events(decoder.feed(data))
+                    if batch:
+                        yield batch
+                    if done:
+                        break
+                else:
+                    batch, _ = self._parse_events(decoder.flush())
+                    if batch:
+                        yield batch
+
+        except httpx.HTTPError as e:
+            raise OpenRouterConnectionError(f"Streaming error: {e}") from e
+
+    @staticmethod
+    def _parse_events(events: List[Any]) -> tuple:
+        """Parse decoded SSE payloads. Returns (chunks, saw_done)."""
+        chunks = []
+        for payload in events:
+            if payload is SSE_DONE:
+                return chunks, True
             try:
-                for item in sync_stream():
-                    if not loop.is_closed():
-                        loop.call_soon_threadsafe(queue.put_nowait, item)
-                if not loop.is_closed():
-                    loop.call_soon_threadsafe(queue.put_nowait, StopAsyncIteration)
-            except Exception as e:
-                if not loop.is_closed():
-                    loop.call_soon_threadsafe(queue.put_nowait, e)
-        
-        threading.Thread(target=run_sync, daemon=True).start()
-        
-        while True:
-            item = await queue.get()
-            if item is StopAsyncIteration:
-                break
-            if isinstance(item, Exception):
-                raise item
-            yield item
+                chunks.append(json.loads(payload.decode("utf-8")))
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                logger.error(f"Failed to parse chunk: {e}")
+        return chunks, False
 
     def _build_payload(
         self,
@@ -263,6 +526,22 @@ class OpenRouterAIService(AIService):
             
         return payload
 
+    @staticmethod
+    def _encode_payload(payload: Dict[str, Any]) -> bytes:
+        """
+        Serialize the request body.
+
+        Tool definitions from the tool registry arrive as EncodedToolDefinitions
+        whose JSON is already encoded, so those bytes are spliced in rather than
+        serializing every tool schema again on each request.
+        """
+        tools = payload.get("tools")
+        if not isinstance(tools, EncodedToolDefinitions):
+            return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        rest = {k: v for k, v in payload.items() if k != "tools"}
+        body = json.dumps(rest, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        return b"".join((body[:-1], b',"tools":', tools.encoded, b"}"))
+
     def _handle_error_response(self, response):
         """Handle HTTP error responses."""
         status_code = response.status_code
@@ -276,8 +555,31 @@ class OpenRouterAIService(AIService):
             logger.error(f"OpenRouter API error {status_code}: Raw response: {response.text}")
             
         if status_code == 401:
-            raise OpenRouterAuthError(f"Authentication failed: {error_msg}")
+            raise OpenRouterAuthError(f"Authentication failed: {error_msg}", status_code)
         elif status_code == 429:
-            raise OpenRouterRateLimitError(f"Rate limit exceeded: {error_msg}")
+            raise OpenRouterRateLimitError(
+                f"Rate limit exceeded: {error_msg}", status_code,
+                retry_after=self._parse_retry_after(response.headers)
+            )
         else:
-            raise OpenRouterAIServiceError(f"API error {status_code}: {error_msg}")
+            raise OpenRouterAIServiceError(f"API error {status_code}: {error_msg}", status_code)
+
+    @staticmethod
+    def _parse_retry_after(headers) -> Optional[float]:
+        """Seconds to wait from Retry-After (seconds or HTTP date) or X-RateLimit-Reset (epoch ms)."""
+        value = headers.get("Retry-After")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        reset = headers.get("X-RateLimit-Reset")
+        if reset:
+            try:
+                return max(0.0, int(reset) / 1000.0 - time.time())
+            except ValueError:
+                pass
+        return None
@@ -0,0 +1,413 @@
+"""
+Admission scheduler for AI requests.
+
+All OpenRouterAIService streams pass through one process-wide scheduler that
+enforces token-bucket rate limits per model and per API key, optionally caps
+concurrent requests per key, and admits queued requests in priority order so
+a burst of background work cannot starve interactive users. When the API
+answers 429 the affected model is paused for the Retry-After period and every
+request for it waits in the queue instead of failing on its own.
+
+The queue, its futures and its timer live on one event loop: the first loop
+that requests admission (the server's loop). Requests from another loop, such
+as a tool running ``asyncio.run`` in a worker thread, are queued on that loop
+through ``run_coroutine_threadsafe``, so every request shares the same limits.
+The scheduler moves to a new loop only once its loop is closed.
+
+Key Components:
+- RequestPriority: INTERACTIVE > AGENT > DEBBIE
+- request_priority(): Context manager setting the priority for nested requests
+- set_request_priority(): Set the priority for the rest of the current task
+- RequestSchedulerConfig: Limits and back-off settings
+- RequestScheduler: Priority queue over per-model and per-key buckets
+- get_request_scheduler() / configure_request_scheduler(): Singleton access
+
+Usage:
+    with request_priority(RequestPriority.AGENT):
+        result = await agent.process_message(prompt)
+
+    # Inside the AI service
+    ticket = await get_request_scheduler().acquire(model, api_key)
+    try:
+        ...
+    finally:
+        get_request_scheduler().release(ticket)
+
+Configuration (config/main.yaml):
+    openrouter:
+      scheduler:
+        model_requests_per_minute: 60
+        key_requests_per_minute: 200
+        max_concurrent_per_key: 32
+        model_limits:
+          openai/gpt-4o: {requests_per_minute: 20, burst: 5}
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Admission priority; lower values are admitted first."""
+    INTERACTIVE = 0  # A user is waiting on this turn
+    AGENT = 1  # Async agent task
+    DEBBIE = 2  # Debbie monitoring/analysis
+
+
+_current_priority: ContextVar[RequestPriority] = ContextVar(
+    "ai_request_priority", default=RequestPriority.INTERACTIVE
+)
+
+
+@contextmanager
+def request_priority(priority: RequestPriority):
+    """Run the enclosed code (and tasks it creates) at ``priority``."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def set_request_priority(priority: RequestPriority) -> None:
+    """Set the priority for the rest of the current task (e.g. a background processor)."""
+    _current_priority.set(priority)
+
+
+def get_request_priority() -> RequestPriority:
+    """Get the priority for requests made from the current context."""
+    return _current_priority.get()
+
+
+@dataclass
+class RequestSchedulerConfig:
+    """Rate limits and back-off settings. Limits left as None are not enforced."""
+    enabled: bool = True
+    model_requests_per_minute: Optional[float] = None
+    model_burst: int = 5
+    key_requests_per_minute: Optional[float] = None
+    key_burst: int = 10
+    max_concurrent_per_key: Optional[int] = None
+    model_limits: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # Per-model overrides
+    max_rate_limit_retries: int = 2
+    default_retry_after: float = 5.0  # Used when a 429 has no Retry-After header
+    max_retry_after: float = 120.0
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'RequestSchedulerConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class TokenBucket:
+    """Request token bucket with an optional pause (for Retry-After)."""
+
+    def __init__(self, requests_per_minute: Optional[float], burst: int):
+        self.rate = requests_per_minute / 60.0 if requests_per_minute else None
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if self.rate is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now: float) -> float:
+        """Earliest monotonic time at which a token can be taken."""
+        self._refill(now)
+        ready = max(now, self.paused_until)
+        if self.rate is not None and self.tokens < 1:
+            ready = max(ready, now + (1 - self.tokens) / self.rate)
+        return ready
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        if self.rate is not None:
+            self.tokens -= 1
+
+    def pause(self, until: float) -> None:
+        self.paused_until = max(self.paused_until, until)
+
+
+@dataclass
+class SchedulerTicket:
+    """Admission handed out by RequestScheduler.acquire()."""
+    model: str
+    key_id: str
+    priority: RequestPriority
+    wait_seconds: float
+
+
+class RequestScheduler:
+    """
+    Priority admission queue in front of AI requests.
+
+    Waiters are kept sorted by (priority, arrival). Each dispatch pass admits
+    waiters in that order; once a waiter is blocked on a model or key, lower
+    priority waiters needing the same model or key are held back, while
+    requests for other models can still proceed. A timer re-runs the pass when
+    the next token becomes available or a pause expires.
+    """
+
+    def __init__(self, config: Optional[RequestSchedulerConfig] = None):
+        self.config = config or RequestSchedulerConfig()
+        self._model_buckets: Dict[str, TokenBucket] = {}
+        self._key_buckets: Dict[str, TokenBucket] = {}
+        self._in_flight: Dict[str, int] = defaultdict(int)
+        self._waiters: List[Tuple[int, int, str, str, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Loop owning the queue and timer
+        self._loop_lock = threading.Lock()
+        self._wait_samples: Dict[RequestPriority, Deque[float]] = {
+            p: deque(maxlen=1000) for p in RequestPriority
+        }
+        self._admitted: Dict[RequestPriority, int] = defaultdict(int)
+        self._rate_limited: Dict[str, int] = defaultdict(int)
+        self._retries = 0
+
+    @staticmethod
+    def _key_id(api_key: str) -> str:
+        """Stable identifier for an API key that is safe to log and report."""
+        return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:8]
+
+    def _model_bucket(self, model: str) -> TokenBucket:
+        bucket = self._model_buckets.get(model)
+        if bucket is None:
+            override = self.config.model_limits.get(model, {})
+            bucket = TokenBucket(
+                override.get("requests_per_minute", self.config.model_requests_per_minute),
+                override.get("burst", self.config.model_burst),
+            )
+            self._model_buckets[model] = bucket
+        return bucket
+
+    def _key_bucket(self, key_id: str) -> TokenBucket:
+        bucket = self._key_buckets.get(key_id)
+        if bucket is None:
+            bucket = TokenBucket(self.config.key_requests_per_minute, self.config.key_burst)
+            self._key_buckets[key_id] = bucket
+        return bucket
+
+    def _owner_loop(self, loop: asyncio.AbstractEventLoop) -> asyncio.AbstractEventLoop:
+        """The loop owning the queue; ``loop`` becomes the owner if there is none (or it was closed)."""
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                if self._loop is not None:
+                    # Waiters and timer of a closed loop can never complete
+                    self._waiters = []
+                    self._timer = None
+                    logger.info("AI request scheduler moved to a new event loop")
+                self._loop = loop
+            return self._loop
+
+    @staticmethod
+    def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    async def acquire(self, model: str, api_key: str,
+                      priority: Optional[RequestPriority] = None) -> Optional[SchedulerTicket]:
+        """
+        Wait until a request for ``model`` with ``api_key`` may start.
+
+        Returns a ticket to pass to release() when the request finishes, or
+        None if scheduling is disabled.
+        """
+        if not self.config.enabled:
+            return None
+        if priority is None:
+            priority = get_request_priority()
+        loop = asyncio.get_running_loop()
+        owner = self._owner_loop(loop)
+        if owner is not loop:
+            return await self._acquire_on(owner, model, api_key, priority)
+        key_id = self._key_id(api_key)
+        started = time.monotonic()
+
+        # Fast path: nothing queued and capacity available
+        if not self._waiters and self._try_admit(model, key_id, started):
+            return self._ticket(model, key_id, priority, started)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (int(priority), next(self._sequence), model, key_id, future)
+        bisect.insort(self._waiters, waiter, key=lambda w: (w[0], w[1]))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(key_id)  # Admitted just before the cancellation landed
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self._dispatch()
+            raise
+        ticket = self._ticket(model, key_id, priority, started)
+        if ticket.wait_seconds > 1.0:
+            logger.info(f"AI request for {model} admitted after {ticket.wait_seconds:.2f}s "
+                        f"({priority.name.lower()}, {len(self._waiters)} still queued)")
+        return ticket
+
+    async def _acquire_on(self, owner: asyncio.AbstractEventLoop, model: str, api_key: str,
+                          priority: RequestPriority) -> Optional[SchedulerTicket]:
+        """Queue on the owning loop from another loop."""
+        admission = asyncio.run_coroutine_threadsafe(self.acquire(model, api_key, priority), owner)
+        try:
+            return await asyncio.wrap_future(admission)
+        except asyncio.CancelledError:
+            # Admitted just before the cancellation reached the owning loop
+            admission.add_done_callback(
+                lambda f: None if f.cancelled() or f.exception() else self.release(f.result()))
+            raise
+
+    def release(self, ticket: Optional[SchedulerTicket]) -> None:
+        """Mark a request admitted by acquire() as finished (from any loop or thread)."""
+        if ticket is not None:
+            self._call_on_owner(self._release, ticket.key_id)
+
+    def _call_on_owner(self, callback, *args) -> None:
+        """Run ``callback`` on the loop owning the queue (now, if that is the running loop)."""
+        owner = self._loop
+        if owner is not None and not owner.is_closed() and self._current_loop() is not owner:
+            owner.call_soon_threadsafe(callback, *args)
+        else:
+            callback(*args)
+
+    def report_rate_limited(self, model: str, api_key: str, retry_after: Optional[float]) -> float:
+        """
+        Pause admissions for ``model`` after a 429.
+
+        Returns the pause length in seconds.
+        """
+        delay = retry_after if retry_after is not None else self.config.default_retry_after
+        delay = max(0.0, min(delay, self.config.max_retry_after))
+        self._call_on_owner(self._pause_model, model, time.monotonic() + delay)
+        logger.warning(f"Rate limited on {model}; pausing admissions for {delay:.1f}s")
+        return delay
+
+    def _pause_model(self, model: str, until: float) -> None:
+        self._model_bucket(model).pause(until)
+        self._rate_limited[model] += 1
+
+    def record_retry(self) -> None:
+        self._retries += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, wait time and back-off statistics for monitoring."""
+        now = time.monotonic()
+        depth = {p.name.lower(): 0 for p in RequestPriority}
+        for waiter in self._waiters:
+            depth[RequestPriority(waiter[0]).name.lower()] += 1
+        waits = {}
+        for priority, samples in self._wait_samples.items():
+            ordered = sorted(samples)
+            waits[priority.name.lower()] = {
+                "admitted": self._admitted[priority],
+                "p50_ms": round(statistics.median(ordered) * 1000, 1) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 1) if ordered else 0.0,
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+            }
+        return {
+            "enabled": self.config.enabled,
+            "queue_depth": depth,
+            "in_flight": {k: v for k, v in self._in_flight.items() if v},
+            "wait": waits,
+            "rate_limited": dict(self._rate_limited),
+            "retries": self._retries,
+            "paused_models": {
+                model: round(bucket.paused_until - now, 1)
+                for model, bucket in self._model_buckets.items() if bucket.paused_until > now
+            },
+        }
+
+    def _ticket(self, model: str, key_id: str, priority: RequestPriority, started: float) -> SchedulerTicket:
+        wait = time.monotonic() - started
+        self._wait_samples[priority].append(wait)
+        self._admitted[priority] += 1
+        return SchedulerTicket(model=model, key_id=key_id, priority=priority, wait_seconds=wait)
+
+    def _try_admit(self, model: str, key_id: str, now: float) -> bool:
+        limit = self.config.max_concurrent_per_key
+        if limit is not None and self._in_flight[key_id] >= limit:
+            return False
+        model_bucket, key_bucket = self._model_bucket(model), self._key_bucket(key_id)
+        if max(model_bucket.ready_at(now), key_bucket.ready_at(now)) > now:
+            return False
+        model_bucket.take(now)
+        key_bucket.take(now)
+        self._in_flight[key_id] += 1
+        return True
+
+    def _release(self, key_id: str) -> None:
+        self._in_flight[key_id] = max(0, self._in_flight[key_id] - 1)
+        if self._waiters:
+            self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit every waiter that can start now, in priority order."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        blocked = set()
+        next_check: Optional[float] = None
+        remaining = []
+        for waiter in self._waiters:
+            _, _, model, key_id, future = waiter
+            if future.done():
+                continue
+            resources = (("model", model), ("key", key_id))
+            if blocked.intersection(resources):
+                remaining.append(waiter)
+                continue
+            if self._try_admit(model, key_id, now):
+                future.set_result(None)
+                continue
+            blocked.update(resources)
+            remaining.append(waiter)
+            ready = max(self._model_bucket(model).ready_at(now), self._key_bucket(key_id).ready_at(now))
+            if ready > now:
+                next_check = ready if next_check is None else min(next_check, ready)
+        self._waiters = remaining
+        if remaining and next_check is not None:
+            self._timer = self._loop.call_later(next_check - now, self._dispatch)
+
+
+# Singleton accessor
+_request_scheduler: Optional[RequestScheduler] = None
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """Get the process-wide request scheduler."""
+    global _request_scheduler
+    if _request_scheduler is None:
+        _request_scheduler = RequestScheduler()
+    return _request_scheduler
+
+
+def configure_request_scheduler(settings: Optional[Dict[str, Any]]) -> RequestScheduler:
+    """Replace the process-wide request scheduler with one built from ``settings``."""
+    global _request_scheduler
+    _request_scheduler = RequestScheduler(RequestSchedulerConfig.from_dict(settings))
+    logger.info(f"Configured AI request scheduler: {_request_scheduler.config}")
+    return _request_scheduler
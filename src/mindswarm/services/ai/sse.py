@@ -0,0 +1,183 @@
+"""
+Incremental Server-Sent Events decoder for chat-completion streams.
+
+The decoder works directly on the raw response bytes: network reads are
+appended to a single bytearray, complete lines are located with find() and
+only the payload of each ``data:`` field is sliced out. Separator lines,
+comments and field names are never copied or decoded to str.
+
+Key Components:
+- SSEDecoder: Feed raw bytes, get complete event payloads back
+- SSE_DONE: Sentinel returned for the ``[DONE]`` terminator
+- coalesce_deltas(): Merge runs of small content/reasoning deltas
+
+Usage:
+    decoder = SSEDecoder()
+    async for data in response.aiter_bytes():
+        for payload in decoder.feed(data):
+            if payload is SSE_DONE:
+                break
+            chunk = json.loads(payload.decode("utf-8"))
+
+Behaviour follows the SSE spec: multiple ``data:`` lines in one event are
+joined with newlines, lines starting with ``:`` are comments (OpenRouter sends
+these as keep-alives) and an event is dispatched on a blank line. CRLF and LF
+line endings are both accepted.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+SSE_DONE = object()
+
+_DATA = b"data"
+_DATA_PREFIX = b"data: "
+_DONE = b"[DONE]"
+
+
+class SSEDecoder:
+    """Incremental SSE decoder over a bytearray buffer."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data_lines: List[bytearray] = []
+        self.events_decoded = 0
+        self.comments_skipped = 0
+
+    def feed(self, data: bytes) -> List[Union[bytearray, object]]:
+        """
+        Add raw bytes and return the payloads of all events completed by them.
+
+        Returns:
+            List of event payloads (UTF-8 bytearray slices) and possibly
+            SSE_DONE. Incomplete trailing lines stay buffered.
+        """
+        buffer = self._buffer
+        buffer += data
+        find = buffer.find
+        startswith = buffer.startswith
+        data_lines = self._data_lines
+        events: List[Union[bytearray, object]] = []
+        size = len(buffer)
+        fast_events = 0
+        pos = 0
+        while True:
+            end = find(b"\n", pos)
+            if end == -1:
+                break
+            line_end = end - 1 if end > pos and buffer[end - 1] == 0x0D else end
+            if line_end == pos:
+                if data_lines:
+                    self._dispatch(events)
+                    data_lines = self._data_lines
+            elif startswith(_DATA_PREFIX, pos, line_end):
+                # The only copy made is the payload slice itself
+                if not data_lines and line_end == end and end + 1 < size and buffer[end + 1] == 0x0A:
+                    # Fast path: single-line event followed by its blank line
+                    payload = buffer[pos + 6:end]
+                    fast_events += 1
+                    if len(payload) < 16 and payload.strip() == _DONE:
+                        events.append(SSE_DONE)
+                    else:
+                        events.append(payload)
+                    pos = end + 2
+                    continue
+                data_lines.append(buffer[pos + 6:line_end])
+            else:
+                self._process_field(buffer, pos, line_end)
+            pos = end + 1
+        if pos:
+            del buffer[:pos]
+        self.events_decoded += fast_events
+        return events
+
+    def flush(self) -> List[Union[bytearray, object]]:
+        """Dispatch any event left pending when the stream ends without a blank line."""
+        events: List[Union[bytearray, object]] = []
+        if self._buffer:
+            self._buffer += b"\n"
+            events.extend(self.feed(b""))
+            self._buffer.clear()
+        self._dispatch(events)
+        return events
+
+    def _process_field(self, buffer: bytearray, start: int, end: int) -> None:
+        """Handle lines other than blank lines and the common 'data: ' form."""
+        if buffer[start] == 0x3A:  # ':' comment / keep-alive
+            self.comments_skipped += 1
+        elif buffer.startswith(_DATA, start, end):
+            value_start = start + 4
+            if value_start == end:
+                self._data_lines.append(bytearray())
+            elif buffer[value_start] == 0x3A:
+                self._data_lines.append(buffer[value_start + 1:end])
+        # Other fields (event:, id:, retry:) are not used by chat-completion streams
+
+    def _dispatch(self, events: list) -> None:
+        if not self._data_lines:
+            return
+        if len(self._data_lines) == 1:
+            payload = self._data_lines[0]
+        else:
+            payload = bytearray(b"\n").join(self._data_lines)
+        self._data_lines = []
+        self.events_decoded += 1
+        if len(payload) < 16 and payload.strip() == _DONE:
+            events.append(SSE_DONE)
+        else:
+            events.append(payload)
+
+
+def _mergeable_kind(chunk: Dict[str, Any]) -> Optional[str]:
+    """Return 'content' or 'reasoning' if the chunk is a plain text delta, else None."""
+    choices = chunk.get("choices")
+    if not choices or len(choices) != 1:
+        return None
+    choice = choices[0]
+    if choice.get("finish_reason"):
+        return None
+    delta = choice.get("delta") or {}
+    if delta.get("tool_calls"):
+        return None
+    has_content = bool(delta.get("content"))
+    has_reasoning = bool(delta.get("reasoning"))
+    if has_content and not has_reasoning:
+        return "content"
+    if has_reasoning and not has_content:
+        return "reasoning"
+    return None
+
+
+def coalesce_deltas(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Merge consecutive content-only (or reasoning-only) chunks into one.
+
+    ``chunks`` is any ordered batch of decoded stream chunks: the ones that
+    queued up while the stream consumer was busy (so a fast consumer sees them
+    one by one and a slow one gets fewer, larger deltas), or a whole recorded
+    stream before it goes into the response cache. Tool call deltas, finish
+    reasons and mixed deltas are never merged, so ordering between content,
+    reasoning and tool calls is preserved.
+    """
+    if len(chunks) < 2:
+        return chunks
+    merged: List[Dict[str, Any]] = []
+    run_kind = None
+    run_parts: List[str] = []
+
+    def close_run():
+        if run_kind is not None:
+            merged.append({"choices": [{"delta": {run_kind: "".join(run_parts)}, "finish_reason": None}]})
+
+    for chunk in chunks:
+        kind = _mergeable_kind(chunk)
+        if kind is not None and kind == run_kind:
+            run_parts.append(chunk["choices"][0]["delta"][kind])
+            continue
+        close_run()
+        if kind is None:
+            run_kind, run_parts = None, []
+            merged.append(chunk)
+        else:
+            run_kind, run_parts = kind, [chunk["choices"][0]["delta"][kind]]
+    close_run()
+    return merged
@@ -2,6 +2,8 @@
 OpenAI/OpenRouter standard tool calling implementation.
 Provides proper tool call handling with message formatting following API standards.
 """
+import copy
+import hashlib
 import json
 import logging
 from dataclasses import dataclass, field
@@ -12,6 +14,32 @@ from typing import Any, Dict, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+class EncodedToolDefinitions(tuple):
+    """
+    Tool definitions together with their canonical JSON encoding.
+
+    An immutable sequence of definition dicts. AI services that recognise it
+    splice ``encoded`` into the request body instead of serializing the dicts
+    again. Instances are cached and shared between agents, so they cannot be
+    extended, and indexing or iterating yields copies of the definitions: a
+    caller that edits what it gets cannot make ``encoded`` disagree with the
+    definitions. Use ``list(definitions)`` for a list to modify.
+    """
+
+    def __new__(cls, definitions: List[Dict[str, Any]]):
+        return super().__new__(cls, copy.deepcopy(list(definitions)))
+
+    def __init__(self, definitions: List[Dict[str, Any]]):
+        self.encoded: bytes = json.dumps(list(tuple.__iter__(self)), separators=(",", ":"),
+                                         ensure_ascii=False).encode("utf-8")
+        self.digest: str = hashlib.sha256(self.encoded).hexdigest()
+
+    def __getitem__(self, index):
+        return copy.deepcopy(tuple.__getitem__(self, index))
+
+    def __iter__(self):
+        return (copy.deepcopy(definition) for definition in tuple.__iter__(self))
+
 class ToolChoice(Enum):
     """Tool choice options"""
     AUTO = "auto"
@@ -0,0 +1,6 @@
+"""
+ai_whisperer.services.cluster - Multi-worker deployment services
+
+This package contains the state shared by worker processes:
+- shared_state: SQLite-backed session index, mailbox and channel history
+"""
@@ -0,0 +1,330 @@
+"""
+State shared by the worker processes of a multi-worker server.
+
+A single server process keeps every session, the mailbox and the channel
+history in memory, so one CPU core caps the deployment. In multi-worker mode
+(``python api/frontdoor.py --workers N``) a front door process
+routes each websocket to one of N worker processes. Sessions stay in the memory
+of the worker that created them, and so do per-process singletons such as
+PathManager and the tool registry. State that every worker must see lives in
+one SQLite database on the local disk. WAL mode lets readers proceed while a
+writer commits, but a writer waits (up to ``busy_timeout``) for another
+worker's write lock. Event loop code therefore never calls the store directly:
+it awaits ``run()``, or queues writes with ``submit()``, which execute on the
+store's own thread in order:
+
+- session index: the worker that owns each session; the front door routes
+  reconnecting clients (``/ws?sessionId=...``) by it
+- mailbox: mail between agents and the user (SharedMailboxSystem)
+- channel history: channel messages of every session (SharedChannelStorage)
+
+Workers find the database through environment variables set by the front
+door. A server started directly (one process) does not use this module.
+
+Key Components:
+- ClusterConfig: Worker count, ports and database path
+- SharedStateStore: The database; one connection per thread, plus its own thread for loop callers
+- get_shared_state() / configure_shared_state(): The store of this worker, None in single-process mode
+- current_worker_id(): The id the front door gave this worker
+
+Usage:
+    store = get_shared_state()
+    if store is not None:
+        await store.run(store.register_session, session_id, current_worker_id())
+
+Configuration (config/main.yaml):
+    cluster:
+      workers: 4
+      base_port: 8100
+      shared_state_path: .mindswarm/shared_state.db
+      busy_timeout: 2.0
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Set by the front door in the environment of each worker
+WORKER_ID_ENV = "MINDSWARM_WORKER_ID"
+SHARED_STATE_ENV = "MINDSWARM_SHARED_STATE"
+
+DEFAULT_BUSY_TIMEOUT = 2.0  # Seconds a write waits for another worker's write lock
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    worker_id TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_worker ON sessions (worker_id);
+CREATE TABLE IF NOT EXISTS mail (
+    message_id TEXT PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    status TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mail_recipient ON mail (recipient, status);
+CREATE TABLE IF NOT EXISTS channel_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    sequence INTEGER NOT NULL,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_messages_session ON channel_messages (session_id, channel, id);
+"""
+
+
+@dataclass
+class ClusterConfig:
+    """Settings for multi-worker mode."""
+    workers: int = 2
+    base_port: int = 8100  # Worker i listens on 127.0.0.1:base_port + i
+    shared_state_path: str = ".mindswarm/shared_state.db"
+    restart_delay: float = 1.0  # Seconds before a crashed worker is restarted
+    startup_timeout: float = 60.0  # Seconds to wait for a worker to accept connections
+    busy_timeout: float = DEFAULT_BUSY_TIMEOUT  # Seconds a write waits for the database lock
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ClusterConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class SharedStateStore:
+    """
+    SQLite database shared by the workers.
+
+    Methods are synchronous and may wait for another worker's write lock, so
+    event loop code runs them on the store's thread with run() or submit().
+    """
+
+    def __init__(self, path: str, busy_timeout: float = DEFAULT_BUSY_TIMEOUT):
+        self.path = str(path)
+        self.busy_timeout = busy_timeout
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        # One thread, so the calls of the event loop run in the order they were made
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._connection().executescript(_SCHEMA)
+
+    async def run(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run a store method on the store's thread and return its result (for event loop code)."""
+        return await asyncio.get_running_loop().run_in_executor(self._thread, functools.partial(method, *args))
+
+    def call(self, method: Callable[..., Any], *args: Any) -> Any:
+        """Run a store method on the store's thread after the queued writes (for code off the event loop)."""
+        return self._thread.submit(method, *args).result()
+
+    def submit(self, method: Callable[..., Any], *args: Any) -> None:
+        """Queue a write on the store's thread without waiting for it (for synchronous code on the loop)."""
+        self._thread.submit(self._run_logged, method, *args)
+
+    @staticmethod
+    def _run_logged(method: Callable[..., Any], *args: Any) -> None:
+        try:
+            method(*args)
+        except sqlite3.Error as e:
+            logger.error(f"Shared state write {method.__name__} failed: {e}")
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    # --- Session index ---
+
+    def register_session(self, session_id: str, worker_id: str) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (session_id, worker_id, created_at) VALUES (?, ?, ?)",
+            (session_id, worker_id, time.time()))
+
+    def unregister_session(self, session_id: str) -> None:
+        self._connection().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def session_worker(self, session_id: str) -> Optional[str]:
+        """The worker that owns ``session_id``, if any."""
+        row = self._connection().execute(
+            "SELECT worker_id FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row["worker_id"] if row else None
+
+    def drop_worker_sessions(self, worker_id: str) -> int:
+        """Forget the sessions of a worker that exited (they lived in its memory)."""
+        return self._connection().execute(
+            "DELETE FROM sessions WHERE worker_id = ?", (worker_id,)).rowcount
+
+    def session_counts(self) -> Dict[str, int]:
+        """Number of sessions per worker."""
+        rows = self._connection().execute(
+            "SELECT worker_id, COUNT(*) AS sessions FROM sessions GROUP BY worker_id").fetchall()
+        return {row["worker_id"]: row["sessions"] for row in rows}
+
+    # --- Mailbox ---
+
+    def add_mail(self, recipient: str, mail: Dict[str, Any]) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO mail (message_id, recipient, status, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+            (mail["message_id"], recipient, mail["status"], mail["timestamp"], json.dumps(mail)))
+
+    def take_unread_mail(self, recipient: str, read_status: str, unread_status: str) -> List[Dict[str, Any]]:
+        """Return the unread mail of ``recipient`` and mark it read, atomically across workers."""
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT status, data FROM mail WHERE recipient = ? AND status = ? ORDER BY timestamp",
+                (recipient, unread_status)).fetchall()
+            db.execute("UPDATE mail SET status = ? WHERE recipient = ? AND status = ?",
+                       (read_status, recipient, unread_status))
+        return [_mail_row(row) for row in rows]
+
+    def list_mail(self, recipient: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Mail of ``recipient`` (all mail if None), oldest first."""
+        if recipient is None:
+            rows = self._connection().execute("SELECT status, data FROM mail ORDER BY timestamp").fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT status, data FROM mail WHERE recipient = ? ORDER BY timestamp", (recipient,)).fetchall()
+        return [_mail_row(row) for row in rows]
+
+    def count_mail(self, recipient: str, status: str) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) AS count FROM mail WHERE recipient = ? AND status = ?", (recipient, status)).fetchone()
+        return row["count"]
+
+    def set_mail_status(self, message_id: str, status: str) -> bool:
+        """Returns False if there is no such message."""
+        return self._connection().execute(
+            "UPDATE mail SET status = ? WHERE message_id = ?", (status, message_id)).rowcount > 0
+
+    def get_mail(self, message_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT status, data FROM mail WHERE message_id = ?",
+                                         (message_id,)).fetchone()
+        return _mail_row(row) if row else None
+
+    # --- Channel history ---
+
+    def add_channel_message(self, session_id: str, message: Dict[str, Any], max_per_channel: int) -> None:
+        """Store a channel message, keeping the newest ``max_per_channel`` of its channel."""
+        metadata = message["metadata"]
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO channel_messages (session_id, channel, sequence, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                (session_id, message["channel"], metadata["sequence"], metadata["timestamp"], json.dumps(message)))
+            db.execute(
+                "DELETE FROM channel_messages WHERE session_id = ? AND channel = ? AND id <= ("
+                "SELECT id FROM channel_messages WHERE session_id = ? AND channel = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (session_id, message["channel"], session_id, message["channel"], max_per_channel))
+
+    def channel_messages(self, session_id: str, channel: Optional[str] = None,
+                         since_sequence: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Channel messages of a session ordered by sequence; ``limit`` keeps the newest."""
+        query = "SELECT data FROM channel_messages WHERE session_id = ?"
+        args: List[Any] = [session_id]
+        if channel is not None:
+            query += " AND channel = ?"
+            args.append(channel)
+        if since_sequence is not None:
+            query += " AND sequence > ?"
+            args.append(since_sequence)
+        query += " ORDER BY sequence DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            args.append(limit)
+        rows = self._connection().execute(query, args).fetchall()
+        return [json.loads(row["data"]) for row in reversed(rows)]
+
+    def clear_channel_messages(self, session_id: str, channel: Optional[str] = None) -> None:
+        if channel is None:
+            self._connection().execute("DELETE FROM channel_messages WHERE session_id = ?", (session_id,))
+        else:
+            self._connection().execute("DELETE FROM channel_messages WHERE session_id = ? AND channel = ?",
+                                       (session_id, channel))
+
+    def channel_counts(self, session_id: str) -> Dict[str, int]:
+        rows = self._connection().execute(
+            "SELECT channel, COUNT(*) AS count FROM channel_messages WHERE session_id = ? GROUP BY channel",
+            (session_id,)).fetchall()
+        return {row["channel"]: row["count"] for row in rows}
+
+    def channel_sessions(self, updated_before: Optional[str] = None) -> Set[str]:
+        """Sessions with channel history; with ``updated_before`` (ISO timestamp) only those idle since then."""
+        if updated_before is None:
+            rows = self._connection().execute("SELECT DISTINCT session_id FROM channel_messages").fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT session_id FROM channel_messages GROUP BY session_id HAVING MAX(timestamp) < ?",
+                (updated_before,)).fetchall()
+        return {row["session_id"] for row in rows}
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an autocommit connection."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _mail_row(row: sqlite3.Row) -> Dict[str, Any]:
+    mail = json.loads(row["data"])
+    mail["status"] = row["status"]  # Status changes only update the column
+    return mail
+
+
+def current_worker_id() -> Optional[str]:
+    """The worker id given by the front door, None in single-process mode."""
+    return os.environ.get(WORKER_ID_ENV)
+
+
+# Singleton accessor
+_shared_state: Optional[SharedStateStore] = None
+
+
+def get_shared_state() -> Optional[SharedStateStore]:
+    """Get the shared state of this worker, None unless running under the front door."""
+    return _shared_state
+
+
+def configure_shared_state(path: Optional[str] = None,
+                           settings: Optional[Dict[str, Any]] = None) -> Optional[SharedStateStore]:
+    """
+    Open the shared database at ``path`` (default: the path the front door set in the environment).
+
+    ``settings`` is the ``cluster`` section of the configuration (for the busy timeout).
+    """
+    global _shared_state
+    path = path or os.environ.get(SHARED_STATE_ENV)
+    if not path:
+        _shared_state = None
+        return None
+    _shared_state = SharedStateStore(path, ClusterConfig.from_dict(settings).busy_timeout)
+    logger.info(f"Shared state of worker {current_worker_id()}: {path}")
+    return _shared_state
@@ -6,4 +6,13 @@ This package contains the execution engine:
 - ai_config: AI configuration management
 - context: Context management
 - state: State management
+- tool_executor: Concurrent tool call execution
+- tool_result_cache: Per-session memoization of read-only tool results
+- stream_buffer: Stream text accumulation and callback coalescing
+- partial_json: Incremental parsing of streamed JSON
+- cancellation: Cancellation tokens for in-flight turns
+- turn_metrics: Per-turn latency spans and histograms
+- outbound_queue: Per-connection websocket send queues with backpressure
+- ws_transport: Negotiated websocket framing (msgpack, delta frames)
+- loop_monitor: Event loop lag of the server process
 """
@@ -29,12 +29,21 @@ import asyncio
 import json
 import logging
 import re
+import time
 from typing import Dict, List, Any, Optional, Callable, AsyncIterator
 from ai_whisperer.services.execution.ai_config import AIConfig
 from ai_whisperer.services.ai.base import AIService
 from ai_whisperer.context.provider import ContextProvider
+from ai_whisperer.context.context_budget import CHARS_PER_TOKEN, estimate_message_tokens, get_context_budget
+from ai_whisperer.core.exceptions import ToolArgumentError, ToolTimeoutError
+from ai_whisperer.tools.base_tool import ToolConcurrency
+from ai_whisperer.tools.tool_dispatch import get_tool_dispatch
 from ai_whisperer.tools.tool_registry import get_tool_registry
 from ai_whisperer.services.execution.tool_call_accumulator import ToolCallAccumulator
+from ai_whisperer.services.execution.cancellation import CancellationToken
+from ai_whisperer.services.execution.stream_buffer import ChunkCoalescer, StreamBuffer
+from ai_whisperer.services.execution.tool_executor import ToolInvocation, get_tool_executor
+from ai_whisperer.services.execution.turn_metrics import current_turn_timer, timed_span
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +75,7 @@ class StatelessAILoop:
         timeout: Optional[float] = None,
         store_messages: bool = True,
         response_format: Optional[Dict[str, Any]] = None,
+        cancellation: Optional[CancellationToken] = None,
         **generation_params
     ) -> Dict[str, Any]:
         """
@@ -79,6 +89,7 @@ class StatelessAILoop:
             timeout: Optional timeout in seconds
             store_messages: Whether to store messages in context (default: True)
             response_format: Optional structured output format (JSON Schema)
+            cancellation: Optional token of the turn; cancelling it stops the stream and pending tools
             **generation_params: Additional AI generation parameters (temperature, max_tokens, etc.)
             
         Returns:
@@ -100,7 +111,8 @@ class StatelessAILoop:
             # We'll only store it if we get a successful response
             
             # Get message history
-            messages = context_provider.retrieve_messages()
+            with timed_span("context"):
+                messages = context_provider.retrieve_messages()
             logger.debug(f"🔍 RETRIEVED MESSAGES COUNT: {len(messages)}")
             for i, msg in enumerate(messages):
                 if isinstance(msg, dict):
@@ -133,14 +145,24 @@ class StatelessAILoop:
                 first_role = 'N/A'
             logger.debug(f"Processing with {len(messages)} messages, first message role: {first_role}")
             
-            # Always add the current message to the messages we send to AI
-            # (but don't store it in context yet - that's atomic)
-            working_messages = messages + [{"role": "user", "content": message}]
-            
             # Get tools if not provided
             if tools is None:
                 tools = get_tool_registry().get_all_tool_definitions()
             
+            # Keep the prompt within the model's context window
+            user_message = {"role": "user", "content": message}
+            with timed_span("context"):
+                messages = get_context_budget().fit(
+                    context_provider, messages, self.config.model_id,
+                    max_output_tokens=generation_params.get("max_tokens", self.config.max_tokens),
+                    extra_tokens=estimate_message_tokens(user_message) + self._estimate_tool_tokens(tools),
+                    api_key=self.config.api_key,
+                )
+            
+            # Always add the current message to the messages we send to AI
+            # (but don't store it in context yet - that's atomic)
+            working_messages = messages + [user_message]
+            
             # Create the streaming coroutine
             async def run_stream():
                 # LOG EXACTLY WHAT MESSAGES WE'RE SENDING TO THE AI
@@ -159,7 +181,7 @@ class StatelessAILoop:
                     response_format=response_format,
                     **params
                 )
-                return await self._process_stream(stream, on_stream_chunk, response_format)
+                return await self._process_stream(stream, on_stream_chunk, response_format, cancellation)
             
             # Run with timeout if specified, with retry logic for empty responses
             max_retries = 3
@@ -312,6 +334,7 @@ class StatelessAILoop:
         tools: Optional[List[Dict[str, Any]]] = None,
         timeout: Optional[float] = None,
         response_format: Optional[Dict[str, Any]] = None,
+        cancellation: Optional[CancellationToken] = None,
         **generation_params
     ) -> Dict[str, Any]:
         """
@@ -323,6 +346,7 @@ class StatelessAILoop:
             tools: Optional list of tool definitions
             timeout: Optional timeout in seconds
             response_format: Optional structured output format (JSON Schema)
+            cancellation: Optional token of the turn; cancelling it stops the stream and pending tools
             **generation_params: Additional AI generation parameters (temperature, max_tokens, etc.)
             
         Returns:
@@ -358,7 +382,7 @@ class StatelessAILoop:
                     response_format=response_format,
                     **params
                 )
-                return await self._process_stream(stream, on_stream_chunk, response_format)
+                return await self._process_stream(stream, on_stream_chunk, response_format, cancellation)
             
             # Run with timeout if specified
             if timeout:
@@ -416,7 +440,8 @@ class StatelessAILoop:
         self,
         stream: AsyncIterator,
         on_stream_chunk: Optional[Callable[[str], Any]] = None,
-        response_format: Optional[Dict[str, Any]] = None
+        response_format: Optional[Dict[str, Any]] = None,
+        cancellation: Optional[CancellationToken] = None
     ) -> Dict[str, Any]:
         """
         Process the AI response stream.
@@ -425,15 +450,25 @@ class StatelessAILoop:
             stream: The AI response stream
             on_stream_chunk: Optional callback for each chunk
             response_format: Optional response format used for structured output
+            cancellation: Optional token of the turn, checked between chunks and before tools run
             
         Returns:
             Dict with response data
         """
-        full_response = ""
-        full_reasoning = ""  # Accumulate reasoning tokens separately
+        response_buffer = StreamBuffer()
+        reasoning_buffer = StreamBuffer()  # Accumulate reasoning tokens separately
+        # Batch deltas for the callback so consumers get one update per window, not per token
+        coalescer = ChunkCoalescer(on_stream_chunk) if on_stream_chunk else None
         tool_accumulator = ToolCallAccumulator()
         finish_reason = None
         last_chunk = None
+        # Read-only tool calls started before the stream finished, by tool call id
+        speculative: Dict[str, Any] = {}
+        # Latency spans of the current turn (time to first delta, stream, generation speed)
+        timer = current_turn_timer()
+        stream_started = time.perf_counter()
+        first_delta_at = None
+        streamed_chars = 0
         
         try:
             # Handle coroutine types (from mocks)
@@ -441,26 +476,35 @@ class StatelessAILoop:
                 stream = await stream
             
             async for chunk in stream:
+                if cancellation:
+                    cancellation.raise_if_cancelled()
                 last_chunk = chunk
+                if timer and first_delta_at is None and (
+                        chunk.delta_content or getattr(chunk, 'delta_reasoning', None) or chunk.delta_tool_call_part):
+                    first_delta_at = time.perf_counter()
+                    timer.record("ttft", first_delta_at - stream_started)
                 
                 # Process content
                 if chunk.delta_content:
-                    full_response += chunk.delta_content
-                    if on_stream_chunk:
-                        await on_stream_chunk(chunk.delta_content)
+                    response_buffer.append(chunk.delta_content)
+                    streamed_chars += len(chunk.delta_content)
+                    if coalescer:
+                        await coalescer.push(chunk.delta_content)
                 
                 # Process reasoning tokens
                 if hasattr(chunk, 'delta_reasoning') and chunk.delta_reasoning:
-                    full_reasoning += chunk.delta_reasoning
+                    reasoning_buffer.append(chunk.delta_reasoning)
+                    streamed_chars += len(chunk.delta_reasoning)
                     # For now, also stream reasoning as content to maintain compatibility
-                    if on_stream_chunk:
-                        await on_stream_chunk(chunk.delta_reasoning)
+                    if coalescer:
+                        await coalescer.push(chunk.delta_reasoning)
                 
                 # Accumulate tool calls
                 if chunk.delta_tool_call_part:
                     if isinstance(chunk.delta_tool_call_part, list):
                         # Add tool call chunks to accumulator
-                        tool_accumulator.add_chunk(chunk.delta_tool_call_part)
+                        if tool_accumulator.add_chunk(chunk.delta_tool_call_part):
+                            self._start_speculative_tools(tool_accumulator, speculative)
                     else:
                         # Log unexpected format
                         logger.warning(f"Unexpected tool call format: {type(chunk.delta_tool_call_part)}")
@@ -469,6 +513,16 @@ class StatelessAILoop:
                 if chunk.finish_reason:
                     finish_reason = chunk.finish_reason
             
+            if timer:
+                stream_finished = time.perf_counter()
+                timer.record("stream", stream_finished - stream_started)
+                if first_delta_at is not None:
+                    timer.add_generation(streamed_chars // CHARS_PER_TOKEN, stream_finished - first_delta_at)
+            if coalescer:
+                await coalescer.aclose()
+            full_response = response_buffer.getvalue()
+            full_reasoning = reasoning_buffer.getvalue()
+            
             logger.info(f"🔄 STREAM FINISHED: finish_reason={finish_reason}, response_length={len(full_response)}, reasoning_length={len(full_reasoning)}")
             
             # DEBUG: Log if we got an empty response but have reasoning
@@ -493,6 +547,8 @@ class StatelessAILoop:
             # Execute tool calls if present
             tool_results_list = None
             if tool_calls:
+                if cancellation:
+                    cancellation.raise_if_cancelled()
                 logger.info(f"🔧 EXECUTING TOOLS: Found {len(tool_calls)} tool calls")
                 for i, tool_call in enumerate(tool_calls):
                     logger.info(f"   Tool {i+1}: {tool_call.get('function', {}).get('name', 'unknown')}")
@@ -501,7 +557,11 @@ class StatelessAILoop:
                 tool_strategy = self._determine_tool_strategy(tool_calls)
                 logger.info(f"🔧 TOOL STRATEGY: {tool_strategy}")
                 
-                tool_results_list = await self._execute_tool_calls(tool_calls)
+                tool_results_list = await self._execute_tool_calls(
+                    tool_calls,
+                    parallel=tool_strategy.startswith("MULTI_TOOL_MODEL_PARALLEL"),
+                    speculative=speculative
+                )
                 logger.info(f"🔧 TOOL EXECUTION COMPLETE: {len(tool_results_list)} results")
                 
                 # Don't append tool results to the response - they'll be handled separately
@@ -526,108 +586,222 @@ class StatelessAILoop:
                 'used_structured_output': response_format is not None  # Track if structured output was used
             }
             
+        except asyncio.CancelledError:
+            logger.info("🛑 Stream processing cancelled")
+            if coalescer:
+                coalescer.cancel()
+            raise
         except Exception as e:
             logger.exception("Error processing stream")
+            if coalescer:
+                coalescer.cancel()
             return {
-                'response': full_response if full_response else None,
-                'reasoning': full_reasoning if full_reasoning else None,
+                'response': response_buffer.getvalue() or None,
+                'reasoning': reasoning_buffer.getvalue() or None,
                 'finish_reason': 'error',
                 'tool_calls': None,
                 'error': e
             }
+        finally:
+            # Discard speculative results the turn did not use (stream error or no tool calls)
+            for _, task in speculative.values():
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Mark an unused failure as retrieved
+            # Close the upstream HTTP stream if the turn ended before it did
+            aclose = getattr(stream, 'aclose', None)
+            if aclose is not None:
+                try:
+                    await aclose()
+                except Exception as e:
+                    logger.debug(f"Error closing AI stream: {e}")
     
-    async def _execute_tool_calls(self, tool_calls: List[Dict[str, Any]]) -> List[Any]:
+    def _start_speculative_tools(self, accumulator: ToolCallAccumulator, speculative: Dict[str, Any]) -> None:
+        """
+        Start read-only tool calls whose arguments are complete while the stream is still open.
+        
+        Results are held in ``speculative`` (tool call id -> (arguments, task)) and only
+        used by _execute_tool_calls if the finished turn contains the same call.
+        """
+        executor = get_tool_executor()
+        earlier: List[Optional[ToolInvocation]] = []
+        for index in sorted(accumulator.tool_calls):
+            if not accumulator.is_complete(index):
+                return
+            tool_call = accumulator.get_tool_call(index)
+            invocation, error = self._prepare_invocation(tool_call)
+            if invocation is None:
+                return
+            if tool_call['id'] not in speculative:
+                task = executor.speculate(invocation, earlier)
+                if task is None:
+                    return
+                speculative[tool_call['id']] = (tool_call['function']['arguments'], task)
+            earlier.append(invocation)
+
+    @staticmethod
+    def _estimate_tool_tokens(tools: Optional[List[Dict[str, Any]]]) -> int:
+        """Estimated prompt tokens taken by the tool definitions sent with a turn"""
+        if not tools:
+            return 0
+        encoded = getattr(tools, 'encoded', None)
+        size = len(encoded) if encoded is not None else len(json.dumps(tools, default=str))
+        return size // CHARS_PER_TOKEN
+
+    def _prepare_invocation(self, tool_call: Dict[str, Any]) -> tuple:
+        """
+        Resolve the tool and parse the arguments of a tool call.
+        
+        Returns:
+            (ToolInvocation, None) on success, or (None, error result) on failure
+        """
+        # Extract tool call information
+        tool_id = tool_call.get('id', 'unknown')
+        function_info = tool_call.get('function', {})
+        tool_name = function_info.get('name')
+        tool_args_str = function_info.get('arguments', '{}')
+        
+        if not tool_name:
+            logger.error(f"Tool call {tool_id} missing function name")
+            return None, {"error": f"Missing function name for tool call {tool_id}"}
+        
+        # Parse arguments
+        try:
+            tool_args = json.loads(tool_args_str) if tool_args_str else {}
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse arguments for tool {tool_name}: {e}")
+            return None, {"error": f"Invalid arguments for {tool_name}: {str(e)}"}
+        
+        # Get tool instance
+        tool_instance = get_tool_registry().get_tool_by_name(tool_name)
+        if not tool_instance:
+            logger.error(f"Tool {tool_name} not found in registry")
+            return None, {"error": f"Tool '{tool_name}' not found"}
+        
+        # Add agent context to tool args if available
+        if self.agent_context:
+            # Create a copy of tool_args to avoid modifying the original
+            enriched_args = tool_args.copy()
+            # Add agent context parameters
+            if 'agent_id' in self.agent_context:
+                enriched_args['_agent_id'] = self.agent_context['agent_id']
+            if 'agent_name' in self.agent_context:
+                enriched_args['_agent_name'] = self.agent_context['agent_name']
+                enriched_args['_from_agent'] = self.agent_context['agent_name']
+        else:
+            enriched_args = tool_args
+        
+        # Reject malformed calls before they are scheduled, so the model can fix them
+        try:
+            enriched_args = get_tool_dispatch(tool_instance).prepare(enriched_args)
+        except ToolArgumentError as e:
+            logger.warning(f"Rejected call to {tool_name}: {e}")
+            return None, {
+                "error": str(e),
+                "error_type": "invalid_arguments",
+                "validation_errors": e.errors,
+                "parameters_schema": tool_instance.parameters_schema,
+            }
+        
+        invocation = ToolInvocation(
+            tool=tool_instance,
+            arguments=enriched_args,
+            keys=tool_instance.concurrency_keys(enriched_args)
+        )
+        return invocation, None
+    
+    async def _execute_tool_calls(self, tool_calls: List[Dict[str, Any]], parallel: bool = False,
+                                  speculative: Optional[Dict[str, Any]] = None) -> List[Any]:
         """
         Execute tool calls and return raw results.
         
+        Independent calls run concurrently when ``parallel`` is set; calls whose
+        tools conflict (see ToolConcurrency) still run one after another.
+        
         Args:
             tool_calls: List of tool call dictionaries
+            parallel: Whether the model issued the calls for parallel execution
+            speculative: Calls started while the response streamed, by tool call id;
+                reused when the final call has the same arguments
             
         Returns:
-            List of raw tool results (preserving their original structure)
+            List of raw tool results (preserving their original structure and order)
         """
-        tool_registry = get_tool_registry()
-        results = []
+        results: List[Any] = [None] * len(tool_calls)
+        invocations: List[Optional[ToolInvocation]] = [None] * len(tool_calls)
+        started: Dict[int, Any] = {}
+        speculative = speculative or {}
         
         for i, tool_call in enumerate(tool_calls):
             try:
-                # Extract tool call information
                 tool_id = tool_call.get('id', 'unknown')
-                function_info = tool_call.get('function', {})
-                tool_name = function_info.get('name')
-                tool_args_str = function_info.get('arguments', '{}')
-                
-                logger.info(f"🔧 EXECUTING TOOL {i+1}/{len(tool_calls)}: {tool_name} (ID: {tool_id})")
-                
-                if not tool_name:
-                    logger.error(f"Tool call {tool_id} missing function name")
-                    results.append({"error": f"Missing function name for tool call {tool_id}"})
-                    continue
+                tool_name = tool_call.get('function', {}).get('name')
+                logger.info(f"🔧 PREPARING TOOL {i+1}/{len(tool_calls)}: {tool_name} (ID: {tool_id})")
                 
-                # Parse arguments
-                try:
-                    tool_args = json.loads(tool_args_str) if tool_args_str else {}
-                    logger.info(f"   Args: {tool_args}")
-                except json.JSONDecodeError as e:
-                    logger.error(f"Failed to parse arguments for tool {tool_name}: {e}")
-                    results.append({"error": f"Invalid arguments for {tool_name}: {str(e)}"})
-                    continue
+                invocations[i], results[i] = self._prepare_invocation(tool_call)
+                if invocations[i] is not None:
+                    logger.info(f"   Args: {invocations[i].arguments}")
+                    if tool_id in speculative:
+                        arguments, task = speculative[tool_id]
+                        if arguments == tool_call.get('function', {}).get('arguments'):
+                            started[i] = task
                 
-                # Get tool instance
-                tool_instance = tool_registry.get_tool_by_name(tool_name)
-                if not tool_instance:
-                    logger.error(f"Tool {tool_name} not found in registry")
-                    results.append({"error": f"Tool '{tool_name}' not found"})
+            except Exception as e:
+                logger.exception(f"Error preparing tool call {tool_call}: {e}")
+                tool_name = tool_call.get('function', {}).get('name', 'unknown')
+                results[i] = {"error": f"Failed to execute {tool_name}: {str(e)}"}
+        
+        if started:
+            logger.info(f"   ⚡ Reusing {len(started)} speculatively started tool calls")
+        
+        # Serve repeated read-only calls from the session's tool result cache. A turn
+        # that may modify the workspace bypasses it and clears it afterwards.
+        cache = self.agent_context.get('tool_result_cache')
+        cache_keys: Dict[int, Any] = {}
+        modifies_workspace = any(
+            inv is not None and inv.concurrency != ToolConcurrency.READ_ONLY for inv in invocations
+        )
+        if cache is not None and not modifies_workspace:
+            for i, invocation in enumerate(invocations):
+                key = cache.key_for(invocation.tool, invocation.arguments) if invocation else None
+                if key is None:
                     continue
-                
-                # Execute tool
-                start_time = asyncio.get_event_loop().time()
-                logger.info(f"   🔄 Starting execution...")
-                
-                # Add agent context to tool args if available
-                if self.agent_context:
-                    # Create a copy of tool_args to avoid modifying the original
-                    enriched_args = tool_args.copy()
-                    # Add agent context parameters
-                    if 'agent_id' in self.agent_context:
-                        enriched_args['_agent_id'] = self.agent_context['agent_id']
-                    if 'agent_name' in self.agent_context:
-                        enriched_args['_agent_name'] = self.agent_context['agent_name']
-                        enriched_args['_from_agent'] = self.agent_context['agent_name']
-                else:
-                    enriched_args = tool_args
-                
-                # Check if execute method is async
-                if asyncio.iscoroutinefunction(tool_instance.execute):
-                    # Try different calling conventions
-                    try:
-                        # First try the newer 'arguments' pattern (RFC tools, read_file_tool)
-                        tool_result = await tool_instance.execute(arguments=enriched_args)
-                    except TypeError:
-                        # Fallback to **kwargs pattern (base_tool, execute_command_tool, write_file_tool)
-                        tool_result = await tool_instance.execute(**enriched_args)
+                hit = False
+                if i not in started:
+                    hit, cached_result = cache.get(key)
+                if hit:
+                    logger.info(f"   ♻️ Reusing cached result for {invocation.name}")
+                    results[i] = cached_result
+                    invocations[i] = None
                 else:
-                    # Try different calling conventions
-                    try:
-                        # First try the newer 'arguments' pattern (RFC tools, read_file_tool)
-                        tool_result = tool_instance.execute(arguments=enriched_args)
-                    except TypeError:
-                        # Fallback to **kwargs pattern (base_tool, execute_command_tool, write_file_tool)
-                        tool_result = tool_instance.execute(**enriched_args)
-                
-                execution_time = asyncio.get_event_loop().time() - start_time
-                logger.info(f"   ✅ Tool {tool_name} completed in {execution_time:.3f}s")
-                
+                    cache_keys[i] = key
+        
+        # Execute tools; the executor returns results in call order
+        start_time = asyncio.get_running_loop().time()
+        outcomes = await get_tool_executor().execute_all(invocations, parallel=parallel, started=started)
+        
+        for i, (invocation, outcome) in enumerate(zip(invocations, outcomes)):
+            if invocation is None:
+                continue
+            if isinstance(outcome, Exception):
+                logger.error(f"Error executing tool call {tool_calls[i]}: {outcome}",
+                             exc_info=None if isinstance(outcome, ToolTimeoutError) else outcome)
+                results[i] = {"error": f"Failed to execute {invocation.name}: {str(outcome)}"}
+            else:
                 # Return the raw tool result - no formatting, no conversion
                 # The AI will receive exactly what the tool returned
-                results.append(tool_result)
-                
-                logger.info(f"Tool {tool_name} executed successfully")
-                
-            except Exception as e:
-                logger.exception(f"Error executing tool call {tool_call}: {e}")
-                tool_name = tool_call.get('function', {}).get('name', 'unknown')
-                results.append({"error": f"Failed to execute {tool_name}: {str(e)}"})
+                results[i] = outcome
+                logger.info(f"Tool {invocation.name} executed successfully")
+                if i in cache_keys:
+                    cache.put(cache_keys[i], invocation.tool, outcome)
+        
+        if cache is not None and modifies_workspace:
+            cache.invalidate()
+        
+        execution_time = asyncio.get_running_loop().time() - start_time
+        logger.info(f"   ✅ Executed {sum(1 for inv in invocations if inv)} tools in {execution_time:.3f}s "
+                    f"({'parallel' if parallel else 'sequential'})")
         
         return results
     
@@ -0,0 +1,126 @@
+"""
+Cancellation of in-flight turns.
+
+A turn (one user message with its tool rounds and continuations) used to run
+to completion even after the user had sent a new message or closed the
+websocket: the model kept streaming tokens nobody would read and tools kept
+running. A CancellationToken is created for each turn by
+StatelessInteractiveSession.send_user_message and passed down through
+StatelessAgent.process_message and StatelessAILoop.
+
+Cancelling the token cancels the asyncio task running the turn. The task's
+awaits raise CancelledError, which closes the upstream HTTP stream and cancels
+the tool calls that have not started yet. Work outside the event loop is
+reached through the token itself. It is also the current token (a context
+variable) inside the tool executor's worker threads, so a synchronous tool can
+poll ``token.event`` or register a callback that stops its subprocess.
+
+Key Components:
+- CancellationToken: Thread-safe cancellation signal with callbacks
+- current_cancellation_token() / cancellation_scope(): The token of the running turn
+
+Usage:
+    token = CancellationToken()
+    token.bind_task(asyncio.current_task())
+    with cancellation_scope(token):
+        await agent.process_message(message, cancellation=token)
+
+    # Elsewhere (new message, websocket closed)
+    token.cancel("websocket closed")
+"""
+
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CancellationToken:
+    """Cancellation signal for one turn, usable from the event loop and from worker threads."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def event(self) -> threading.Event:
+        """Set once cancelled, for tools that poll (e.g. execute_command's shutdown_event)."""
+        return self._event
+
+    def cancel(self, reason: str = "cancelled") -> bool:
+        """Cancel the turn. Returns False if it was already cancelled."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        logger.info(f"🛑 Turn cancelled: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in cancellation callback: {e}")
+        return True
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Call ``callback`` when the token is cancelled, immediately if it already is.
+
+        Callbacks run in the thread that calls cancel(). Returns a function that
+        removes the callback again (call it once the guarded work is done).
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def bind_task(self, task: asyncio.Task) -> Callable[[], None]:
+        """Cancel ``task`` when the token is cancelled (from any thread)."""
+        loop = task.get_loop()
+
+        def cancel_task():
+            if not task.done():
+                loop.call_soon_threadsafe(task.cancel, self.reason)
+
+        return self.add_callback(cancel_task)
+
+    def raise_if_cancelled(self) -> None:
+        """Raise CancelledError if the token has been cancelled."""
+        if self._event.is_set():
+            raise asyncio.CancelledError(self.reason)
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar("turn_cancellation_token", default=None)
+
+
+def current_cancellation_token() -> Optional[CancellationToken]:
+    """The token of the turn running in this context (also inside tool worker threads), if any."""
+    return _current_token.get()
+
+
+@contextmanager
+def cancellation_scope(token: Optional[CancellationToken]):
+    """Make ``token`` the current token for the enclosed code and the tasks it creates."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
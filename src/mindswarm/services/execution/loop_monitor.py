@@ -0,0 +1,76 @@
+"""
+Event loop lag of the server process.
+
+Every session, stream and websocket of a server shares one event loop, so the
+time callbacks wait to run is the first thing to degrade under load. The
+monitor sleeps for ``interval`` seconds in a loop and records how much later
+than requested it woke up.
+
+Key Components:
+- LoopLagMonitor: Background task recording loop lag into a histogram
+- get_loop_monitor(): Process-wide monitor
+
+Usage:
+    monitor = get_loop_monitor()
+    monitor.start()  # On server startup
+    monitor.get_stats()  # {"interval_ms": 50, "count": ..., "p99": ..., ...}
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from ai_whisperer.services.execution.turn_metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in milliseconds; loop lag is usually well below a millisecond
+LOOP_LAG_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs a timer that should fire every ``interval`` seconds."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lag = LatencyHistogram(LOOP_LAG_BUCKETS_MS)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lag.observe(max((time.perf_counter() - started - self.interval) * 1000, 0.0))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def reset(self) -> None:
+        """Start a new measurement window (e.g. at the start of a load test)."""
+        self.lag = LatencyHistogram(LOOP_LAG_BUCKETS_MS)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"interval_ms": self.interval * 1000, "running": self._task is not None, **self.lag.summary()}
+
+
+# Singleton accessor
+_loop_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Get the process-wide event loop lag monitor."""
+    global _loop_monitor
+    if _loop_monitor is None:
+        _loop_monitor = LoopLagMonitor()
+    return _loop_monitor
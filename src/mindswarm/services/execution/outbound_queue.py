@@ -0,0 +1,275 @@
+"""
+Per-connection outbound frame queue with backpressure.
+
+Sessions used to await ``websocket.send_json`` for every frame, so one slow
+browser stalled its agent's stream and a dead client held up tool
+notifications. Frames now go into the connection's OutboundQueue, which never
+blocks the sender, and a writer task sends them in order.
+
+Backpressure works in bytes of queued frames. Above ``high_watermark_bytes``
+the queue is under pressure until it drains below ``low_watermark_bytes``.
+Under pressure a partial frame that supersedes an earlier one (a
+StreamingUpdate carries the whole text streamed so far) replaces the queued one
+instead of queueing behind it. Control frames (responses, notifications, final
+channel messages) are always kept. A client that lets the queue grow past
+``max_bytes`` anyway is considered dead: the queue closes and its
+``on_overflow`` callback closes the connection.
+
+Key Components:
+- OutboundQueueConfig: Watermarks and the dead-client limit
+- OutboundQueue: Queue and writer task of one connection, with lag metrics;
+  frames queued after set_encoder() are encoded with the negotiated framing
+- attach_outbound_queue() / get_outbound_queue(): The queue of a websocket
+- get_outbound_queue_config() / configure_outbound_queue(): Settings for new queues
+
+Usage:
+    queue = OutboundQueue(websocket.send_text, name=client, on_overflow=websocket.close)
+    attach_outbound_queue(websocket, queue)
+    queue.send({"jsonrpc": "2.0", "method": "StreamingUpdate", ...}, supersedes="stream:a")
+
+Configuration (config/main.yaml):
+    outbound_queue:
+      high_watermark_bytes: 1048576
+      low_watermark_bytes: 262144
+      max_bytes: 16777216
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from collections import deque
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from ai_whisperer.services.execution.turn_metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundQueueConfig:
+    """Settings for per-connection outbound queues."""
+    high_watermark_bytes: int = 1024 * 1024  # Pressure starts above this many queued bytes
+    low_watermark_bytes: int = 256 * 1024  # Pressure ends below this many queued bytes
+    max_bytes: int = 16 * 1024 * 1024  # The client is considered dead above this
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'OutboundQueueConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+def _estimate_size(value: Any) -> int:
+    """Rough encoded size of a frame, for frames encoded only when they are sent."""
+    if isinstance(value, str):
+        return len(value) + 2
+    if isinstance(value, dict):
+        return sum(len(str(key)) + _estimate_size(item) + 4 for key, item in value.items()) + 2
+    if isinstance(value, (list, tuple)):
+        return sum(_estimate_size(item) + 1 for item in value) + 2
+    return 8
+
+
+class _Frame:
+    __slots__ = ("payload", "text", "encoder", "size", "supersedes", "enqueued_at", "dropped")
+
+    def __init__(self, payload: Dict[str, Any], encoder: Optional[Any], supersedes: Optional[str]):
+        # JSON encoded when queued, or encoded when sent with the framing negotiated when queued
+        self.encoder = encoder
+        self.text = json.dumps(payload) if encoder is None else None
+        self.payload = payload if encoder is not None else None
+        self.size = len(self.text) if self.text is not None else _estimate_size(payload)
+        self.supersedes = supersedes
+        self.enqueued_at = time.perf_counter()
+        self.dropped = False
+
+
+class OutboundQueue:
+    """Frames waiting to be sent on one connection, and the task that sends them."""
+
+    def __init__(self, send: Callable[[str], Awaitable[Any]], name: str = "",
+                 config: Optional[OutboundQueueConfig] = None,
+                 on_overflow: Optional[Callable[[], Awaitable[Any]]] = None,
+                 send_bytes: Optional[Callable[[bytes], Awaitable[Any]]] = None):
+        self.config = config or get_outbound_queue_config()
+        self.name = name
+        self._send = send
+        self._send_bytes = send_bytes
+        self.encoder: Optional[Any] = None  # Negotiated framing (ws_transport.FrameEncoder), None for JSON
+        self._on_overflow = on_overflow
+        self._frames: Deque[_Frame] = deque()
+        self._partials: Dict[str, _Frame] = {}  # Supersede key -> its queued frame
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+        self.under_pressure = False
+        self.queued_bytes = 0
+        self.lag = LatencyHistogram()  # Milliseconds from send() to the frame leaving
+        self.stats = {
+            "frames_sent": 0, "bytes_sent": 0, "frames_collapsed": 0, "frames_dropped": 0,
+            "pressure_episodes": 0, "max_queued_bytes": 0, "send_errors": 0,
+        }
+
+    def send(self, payload: Dict[str, Any], supersedes: Optional[str] = None) -> bool:
+        """
+        Queue a frame; never blocks.
+
+        Args:
+            payload: The JSON frame
+            supersedes: Key of a partial frame whose newer versions replace older
+                ones still queued while the queue is under pressure
+
+        Returns:
+            False if the queue is closed and the frame was dropped
+        """
+        if self.closed:
+            self.stats["frames_dropped"] += 1
+            return False
+        frame = _Frame(payload, self.encoder, supersedes)
+        if supersedes is not None:
+            previous = self._partials.get(supersedes)
+            if previous is not None and self.under_pressure:
+                previous.dropped = True
+                self.queued_bytes -= previous.size
+                self.stats["frames_collapsed"] += 1
+            self._partials[supersedes] = frame
+        self._frames.append(frame)
+        self.queued_bytes += frame.size
+        self.stats["max_queued_bytes"] = max(self.stats["max_queued_bytes"], self.queued_bytes)
+
+        if not self.under_pressure and self.queued_bytes > self.config.high_watermark_bytes:
+            self.under_pressure = True
+            self.stats["pressure_episodes"] += 1
+            logger.warning(f"Outbound queue {self.name} under pressure: {self.queued_bytes} bytes queued")
+        if self.queued_bytes > self.config.max_bytes:
+            logger.error(f"Outbound queue {self.name} exceeded {self.config.max_bytes} bytes, closing the connection")
+            self._overflow()
+            return False
+
+        self._idle.clear()
+        self._ready.set()
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._write_loop())
+        return True
+
+    async def _write_loop(self) -> None:
+        while True:
+            await self._ready.wait()
+            while self._frames:
+                frame = self._frames.popleft()
+                if frame.dropped:
+                    continue
+                if frame.supersedes is not None and self._partials.get(frame.supersedes) is frame:
+                    del self._partials[frame.supersedes]
+                try:
+                    data = frame.text if frame.encoder is None else frame.encoder.encode(frame.payload)
+                    if isinstance(data, bytes):
+                        await self._send_bytes(data)
+                    else:
+                        await self._send(data)
+                except Exception as e:
+                    self.stats["send_errors"] += 1
+                    logger.info(f"Outbound queue {self.name} closed after a failed send: {e}")
+                    self._close()
+                    return
+                self.queued_bytes -= frame.size
+                self.stats["frames_sent"] += 1
+                self.stats["bytes_sent"] += len(data)
+                self.lag.observe((time.perf_counter() - frame.enqueued_at) * 1000)
+                if self.under_pressure and self.queued_bytes < self.config.low_watermark_bytes:
+                    self.under_pressure = False
+                    logger.info(f"Outbound queue {self.name} drained below the low watermark")
+            self._ready.clear()
+            self._idle.set()
+
+    def set_encoder(self, encoder: Any) -> None:
+        """Encode the frames queued from now on with ``encoder`` (see ws_transport); None for JSON.
+
+        Frames already queued keep the framing they were queued with.
+        """
+        self.encoder = encoder
+
+    def _overflow(self) -> None:
+        self._close()
+        if self._on_overflow is not None:
+            asyncio.get_running_loop().create_task(self._on_overflow())
+
+    def _close(self) -> None:
+        self.closed = True
+        self.stats["frames_dropped"] += sum(1 for frame in self._frames if not frame.dropped)
+        self._frames.clear()
+        self._partials.clear()
+        self.queued_bytes = 0
+        self._idle.set()
+
+    async def drain(self) -> None:
+        """Wait until every queued frame has been sent (or the queue closed)."""
+        await self._idle.wait()
+
+    async def aclose(self) -> None:
+        """Drop the queued frames and stop the writer."""
+        self._close()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+            try:
+                await self._writer
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "closed": self.closed,
+            "under_pressure": self.under_pressure,
+            "queued_frames": sum(1 for frame in self._frames if not frame.dropped),
+            "queued_bytes": self.queued_bytes,
+            "lag_ms": self.lag.summary(),
+            **self.stats,
+        }
+
+
+# Queue of each websocket; entries go away with the websocket
+_queues: "weakref.WeakKeyDictionary[Any, OutboundQueue]" = weakref.WeakKeyDictionary()
+
+
+def attach_outbound_queue(websocket: Any, queue: OutboundQueue) -> None:
+    """Route the frames sessions send on ``websocket`` through ``queue``."""
+    _queues[websocket] = queue
+
+
+def get_outbound_queue(websocket: Any) -> Optional[OutboundQueue]:
+    """The queue of ``websocket``, None if it has none (frames are then sent directly)."""
+    if websocket is None:
+        return None
+    return _queues.get(websocket)
+
+
+def all_outbound_queues() -> Dict[str, Dict[str, Any]]:
+    """Stats of the queues of all open connections."""
+    return {queue.name or str(id(queue)): queue.get_stats() for queue in list(_queues.values())}
+
+
+# Settings used for new queues
+_queue_config: Optional[OutboundQueueConfig] = None
+
+
+def get_outbound_queue_config() -> OutboundQueueConfig:
+    """Get the settings used for new outbound queues."""
+    global _queue_config
+    if _queue_config is None:
+        _queue_config = OutboundQueueConfig()
+    return _queue_config
+
+
+def configure_outbound_queue(settings: Optional[Dict[str, Any]]) -> OutboundQueueConfig:
+    """Replace the settings used for new outbound queues."""
+    global _queue_config
+    _queue_config = OutboundQueueConfig.from_dict(settings)
+    logger.info(f"Outbound queue configured: {_queue_config}")
+    return _queue_config
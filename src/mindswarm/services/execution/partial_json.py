@@ -0,0 +1,358 @@
+"""
+Incremental parsing of JSON that arrives in chunks.
+
+Structured responses ({"analysis": ..., "commentary": ..., "final": ...})
+stream in as deltas. Re-parsing the accumulated text on every delta, after
+balancing its braces or falling back to a regex for the ``final`` field, is
+quadratic in the response length. IncrementalJSONParser keeps its state
+between chunks, so every character is scanned once. It reports field-level
+events as the value grows, and the (partial) value can be read at any time.
+
+Parsing stops after the first complete top-level value. Anything after it
+(e.g. a second object a model concatenated to the first) is not parsed.
+
+Key Components:
+- IncrementalJSONParser: Chunk-by-chunk JSON parser with a readable partial value
+- JSONEvent / JSONEventType: Keys, string deltas and completed values, by path
+- parse_json_prefix(): First complete JSON value of a text and where it ends
+
+Usage:
+    parser = IncrementalJSONParser()
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if event.type is JSONEventType.STRING_DELTA and event.path == ("final",):
+                display(parser.value["final"])
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, List, Optional, Tuple, Union
+
+from ai_whisperer.services.execution.stream_buffer import StreamBuffer
+
+JSONPath = Tuple[Union[str, int], ...]
+
+_WHITESPACE = frozenset(" \t\r\n")
+_LITERAL_START = frozenset("-0123456789tfn")
+_LITERAL_CHARS = frozenset("+-.0123456789eEtruefalsn")
+_LITERALS = {"true": True, "false": False, "null": None}
+_STRING_RUN = re.compile(r'[^"\\]*')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# What a container expects next
+_KEY_OR_END = 0  # Object: first key or "}"
+_KEY = 1  # Object: key after ","
+_COLON = 2  # Object: ":" after a key
+_VALUE = 3  # Object member value, or array element after ","
+_VALUE_OR_END = 4  # Array: first element or "]"
+_COMMA_OR_END = 5  # After a member or element
+
+
+class JSONEventType(str, Enum):
+    """Kinds of parse events."""
+    KEY = "key"  # An object key was read; path ends with the key
+    STRING_DELTA = "string_delta"  # Text was appended to the string at path
+    VALUE = "value"  # The value at path is complete (scalars, strings, closed containers)
+
+
+@dataclass
+class JSONEvent:
+    """One parse event. ``value`` is the key, the appended text or the completed value."""
+    type: JSONEventType
+    path: JSONPath
+    value: Any
+
+
+class _Frame:
+    """An open object or array."""
+
+    __slots__ = ("container", "key", "expect")
+
+    def __init__(self, container, expect: int):
+        self.container = container
+        self.key: Optional[str] = None  # Object: key of the member being read
+        self.expect = expect
+
+    def slot(self) -> Union[str, int]:
+        """Key or index of the member or element being read."""
+        return self.key if isinstance(self.container, dict) else len(self.container) - 1
+
+
+class IncrementalJSONParser:
+    """
+    Parse one JSON value fed in arbitrary chunks.
+
+    feed() raises json.JSONDecodeError on invalid input; the parser is unusable
+    afterwards. ``value`` is the value parsed so far: open containers hold the
+    members read so far and an unterminated string its text so far. Control
+    characters in strings are accepted, like json.loads(..., strict=False).
+    """
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._root: Any = None
+        self._started = False  # The first non-whitespace character was read
+        self.done = False  # The top-level value is complete
+        self.consumed = 0  # Characters fed up to the end of the top-level value (or so far)
+        self.error: Optional[json.JSONDecodeError] = None
+        # Token being read across chunks
+        self._string: Optional[StreamBuffer] = None
+        self._string_is_key = False
+        self._escape = ""  # Pending escape sequence: "\\", or "\\u" plus hex digits
+        self._high_surrogate = ""
+        self._delta: List[str] = []  # String text appended by the current chunk
+        self._literal: Optional[List[str]] = None
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    @property
+    def value(self) -> Any:
+        """The (partial) top-level value."""
+        if self._string is not None and not self._string_is_key:
+            text = self._string.getvalue()
+            if self._stack:
+                frame = self._stack[-1]
+                frame.container[frame.slot()] = text
+            else:
+                return text
+        return self._root
+
+    def feed(self, text: str) -> List[JSONEvent]:
+        """Parse the next chunk and return the events it produced."""
+        if self.error is not None:
+            raise self.error
+        events: List[JSONEvent] = []
+        if self.done:
+            return events
+        try:
+            index = self._parse(text, events)
+        except json.JSONDecodeError as e:
+            self.error = e
+            raise
+        self.consumed += index
+        return events
+
+    def close(self) -> List[JSONEvent]:
+        """Signal the end of the input; completes a top-level number and checks the value is complete."""
+        events: List[JSONEvent] = []
+        if self._literal is not None:
+            self._finish_literal(events, "", 0)
+        if not self.done:
+            raise json.JSONDecodeError("Unexpected end of JSON input", "", 0)
+        return events
+
+    def _parse(self, text: str, events: List[JSONEvent]) -> int:
+        index = 0
+        length = len(text)
+        while index < length and not self.done:
+            if self._string is not None:
+                index = self._read_string(text, index, events)
+                continue
+            if self._literal is not None:
+                end = index
+                while end < length and text[end] in _LITERAL_CHARS:
+                    end += 1
+                self._literal.append(text[index:end])
+                index = end
+                if index < length:
+                    self._finish_literal(events, text, index)
+                continue
+            char = text[index]
+            if char not in _WHITESPACE:
+                self._structural(char, text, index, events)
+            index += 1
+        return index
+
+    def _structural(self, char: str, text: str, index: int, events: List[JSONEvent]) -> None:
+        if not self._stack:
+            self._started = True
+            self._start_value(char, text, index, events)
+            return
+
+        frame = self._stack[-1]
+        expect = frame.expect
+        if expect == _COMMA_OR_END:
+            is_object = isinstance(frame.container, dict)
+            closer = "}" if is_object else "]"
+            if char == ",":
+                frame.expect = _KEY if is_object else _VALUE
+            elif char == closer:
+                self._close_container(events)
+            else:
+                raise json.JSONDecodeError(f"Expecting ',' or '{closer}'", text, index)
+        elif expect in (_KEY_OR_END, _KEY):
+            if char == '"':
+                self._string = StreamBuffer()
+                self._string_is_key = True
+            elif char == "}" and expect == _KEY_OR_END:
+                self._close_container(events)
+            else:
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, index)
+        elif expect == _COLON:
+            if char != ":":
+                raise json.JSONDecodeError("Expecting ':' delimiter", text, index)
+            frame.expect = _VALUE
+        elif char == "]" and expect == _VALUE_OR_END:
+            self._close_container(events)
+        else:
+            self._start_value(char, text, index, events)
+
+    def _start_value(self, char: str, text: str, index: int, events: List[JSONEvent]) -> None:
+        if char == "{":
+            self._attach({})
+            self._stack.append(_Frame(self._current_container(), _KEY_OR_END))
+        elif char == "[":
+            self._attach([])
+            self._stack.append(_Frame(self._current_container(), _VALUE_OR_END))
+        elif char == '"':
+            self._attach("")
+            self._string = StreamBuffer()
+            self._string_is_key = False
+        elif char in _LITERAL_START:
+            self._literal = [char]
+        else:
+            raise json.JSONDecodeError("Expecting value", text, index)
+
+    def _current_container(self):
+        """The container just attached by _attach()."""
+        if not self._stack:
+            return self._root
+        frame = self._stack[-1]
+        return frame.container[frame.slot()]
+
+    def _attach(self, value: Any) -> None:
+        """Place a value that is being read (container or string) into its parent."""
+        if not self._stack:
+            self._root = value
+            return
+        container = self._stack[-1].container
+        if isinstance(container, dict):
+            container[self._stack[-1].key] = value
+        else:
+            container.append(value)
+
+    def _complete(self, value: Any, attached: bool, events: List[JSONEvent]) -> None:
+        """A value is complete: store it (unless attached while read) and emit its event."""
+        if not self._stack:
+            self._root = value
+            self.done = True
+            events.append(JSONEvent(JSONEventType.VALUE, (), value))
+            return
+        frame = self._stack[-1]
+        if attached:
+            frame.container[frame.slot()] = value
+        else:
+            self._attach(value)
+        frame.expect = _COMMA_OR_END
+        events.append(JSONEvent(JSONEventType.VALUE, self._path(), value))
+
+    def _close_container(self, events: List[JSONEvent]) -> None:
+        frame = self._stack.pop()
+        self._complete(frame.container, True, events)
+
+    def _path(self) -> JSONPath:
+        return tuple(frame.slot() for frame in self._stack)
+
+    def _read_string(self, text: str, index: int, events: List[JSONEvent]) -> int:
+        """Read string content up to the closing quote or the end of the chunk."""
+        length = len(text)
+        self._delta = []
+        while index < length:
+            if self._escape:
+                index = self._read_escape(text, index)
+                continue
+            run = _STRING_RUN.match(text, index)
+            end = run.end()
+            if end > index:
+                self._append(text[index:end])
+                index = end
+            if index >= length:
+                break
+            if text[index] == '"':
+                self._finish_string(events)
+                return index + 1
+            self._escape = "\\"
+            index += 1
+        if self._delta and not self._string_is_key:
+            events.append(JSONEvent(JSONEventType.STRING_DELTA, self._path(), "".join(self._delta)))
+        return index
+
+    def _read_escape(self, text: str, index: int) -> int:
+        char = text[index]
+        if self._escape == "\\":
+            if char == "u":
+                self._escape = "\\u"
+            elif char in _ESCAPES:
+                self._escape = ""
+                self._append(_ESCAPES[char])
+            else:
+                raise json.JSONDecodeError("Invalid \\escape", text, index)
+            return index + 1
+        if char not in "0123456789abcdefABCDEF":
+            raise json.JSONDecodeError("Invalid \\uXXXX escape", text, index)
+        self._escape += char
+        if len(self._escape) == 6:
+            code = int(self._escape[2:], 16)
+            self._escape = ""
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = chr(code)
+            else:
+                self._append(chr(code))
+        return index + 1
+
+    def _append(self, text: str) -> None:
+        if self._high_surrogate:
+            pair = self._high_surrogate + text[:1]
+            self._high_surrogate = ""
+            try:
+                text = pair.encode("utf-16", "surrogatepass").decode("utf-16") + text[1:]
+            except UnicodeDecodeError:  # Lone surrogate, kept as is like json.loads does
+                text = pair + text[1:]
+        self._string.append(text)
+        self._delta.append(text)
+
+    def _finish_string(self, events: List[JSONEvent]) -> None:
+        if self._high_surrogate:
+            high_surrogate, self._high_surrogate = self._high_surrogate, ""
+            self._append(high_surrogate)
+        value = self._string.getvalue()
+        self._string = None
+        if self._string_is_key:
+            frame = self._stack[-1]
+            frame.key = value
+            frame.expect = _COLON
+            events.append(JSONEvent(JSONEventType.KEY, self._path(), value))
+            return
+        if self._delta:
+            events.append(JSONEvent(JSONEventType.STRING_DELTA, self._path(), "".join(self._delta)))
+        self._complete(value, True, events)
+
+    def _finish_literal(self, events: List[JSONEvent], text: str, index: int) -> None:
+        token = "".join(self._literal)
+        self._literal = None
+        if token in _LITERALS:
+            value = _LITERALS[token]
+        else:
+            try:
+                value = json.loads(token)
+            except json.JSONDecodeError:
+                raise json.JSONDecodeError(f"Invalid literal {token!r}", text, index) from None
+        self._complete(value, False, events)
+
+
+def parse_json_prefix(text: str) -> Tuple[Any, int]:
+    """
+    Parse the first complete JSON value of ``text``.
+
+    Returns the value and the index just after it; anything after it is ignored.
+    Raises json.JSONDecodeError if the text does not start with a complete value.
+    """
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    if not parser.done:
+        parser.close()
+    return parser.value, parser.consumed
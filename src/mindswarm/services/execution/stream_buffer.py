@@ -0,0 +1,178 @@
+"""
+Linear-time accumulation and time-windowed coalescing of streamed text.
+
+StatelessAILoop receives one delta per SSE event. Accumulating them with
+``+=`` copies the response on every delta, and awaiting the stream callback
+per delta means one websocket frame and one event loop round trip per token.
+
+Key Components:
+- StreamBuffer: O(1) append, joined lazily and cached until the next append
+- StreamCoalescerConfig: Flush window (time and bytes)
+- ChunkCoalescer: Batches deltas for a stream callback, flushing when the
+  window elapses or enough bytes are pending
+- get_stream_coalescer_config() / configure_stream_coalescing(): Process-wide settings
+
+Usage:
+    coalescer = ChunkCoalescer(on_stream_chunk)
+    async for chunk in stream:
+        await coalescer.push(chunk.delta_content)
+    await coalescer.aclose()
+
+Configuration (config/main.yaml):
+    stream_coalescing:
+      window_ms: 16
+      max_bytes: 256
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, fields
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StreamBuffer:
+    """Append-only text buffer that joins its parts only when read."""
+
+    __slots__ = ("_parts", "_length")
+
+    def __init__(self, initial: str = ""):
+        self._parts: List[str] = [initial] if initial else []
+        self._length = len(initial)
+
+    def append(self, text: str) -> None:
+        if text:
+            self._parts.append(text)
+            self._length += len(text)
+
+    def getvalue(self) -> str:
+        """The accumulated text. Repeated reads without appends do not join again."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def clear(self) -> None:
+        self._parts = []
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    def __str__(self) -> str:
+        return self.getvalue()
+
+
+@dataclass
+class StreamCoalescerConfig:
+    """Settings for coalescing stream callbacks."""
+    enabled: bool = True
+    window_ms: float = 16.0  # Longest a delta waits before it is flushed
+    max_bytes: int = 256  # Flush as soon as this much text is pending (counted in characters)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'StreamCoalescerConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class ChunkCoalescer:
+    """
+    Batches text deltas for an async stream callback.
+
+    Pending text is flushed to the callback once ``max_bytes`` are pending, or
+    ``window_ms`` after the first pending delta, whichever comes first; a timer
+    covers pauses in the stream. Callback invocations never overlap and keep
+    the order of the deltas. Call aclose() when the stream ends to flush the rest.
+    """
+
+    def __init__(self, callback: Callable[[str], Awaitable[Any]],
+                 config: Optional[StreamCoalescerConfig] = None):
+        self.callback = callback
+        self.config = config or get_stream_coalescer_config()
+        self._pending = StreamBuffer()
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        self.deltas = 0
+        self.flushes = 0
+
+    async def push(self, text: str) -> None:
+        """Queue a delta, flushing if the byte window is full."""
+        if not text:
+            return
+        self.deltas += 1
+        if not self.config.enabled:
+            self.flushes += 1
+            await self.callback(text)
+            return
+        self._pending.append(text)
+        if len(self._pending) >= self.config.max_bytes:
+            await self.flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.config.window_ms / 1000.0, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        if self._pending:
+            self._timer_task = asyncio.ensure_future(self._flush_from_timer())
+
+    async def _flush_from_timer(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Error flushing coalesced stream chunk: {e}")
+
+    async def flush(self) -> None:
+        """Send all pending text to the callback now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            if not self._pending:
+                return
+            text = self._pending.getvalue()
+            self._pending.clear()
+            self.flushes += 1
+            await self.callback(text)
+
+    async def aclose(self) -> None:
+        """Flush the remaining text and wait for any timer-triggered flush."""
+        await self.flush()
+        if self._timer_task is not None and not self._timer_task.done():
+            await self._timer_task
+
+    def cancel(self) -> None:
+        """Drop pending text and stop the timer (for a failed stream)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._timer_task is not None and not self._timer_task.done():
+            self._timer_task.cancel()
+        self._pending.clear()
+
+
+# Process-wide settings
+_coalescer_config: Optional[StreamCoalescerConfig] = None
+
+
+def get_stream_coalescer_config() -> StreamCoalescerConfig:
+    """Get the process-wide stream coalescing settings."""
+    global _coalescer_config
+    if _coalescer_config is None:
+        _coalescer_config = StreamCoalescerConfig()
+    return _coalescer_config
+
+
+def configure_stream_coalescing(settings: Optional[Dict[str, Any]]) -> StreamCoalescerConfig:
+    """Replace the process-wide stream coalescing settings with ``settings``."""
+    global _coalescer_config
+    _coalescer_config = StreamCoalescerConfig.from_dict(settings)
+    logger.info(f"Stream coalescing configured: {_coalescer_config}")
+    return _coalescer_config
@@ -25,11 +25,51 @@ Related:
 
 from typing import Any, Dict, List
 
+import json
 import logging
 from ai_whisperer.services.ai.tool_calling import ToolCall
 
 logger = logging.getLogger(__name__)
 
+
+class _ArgumentsScanner:
+    """
+    Tracks whether streamed tool call arguments form a complete JSON object.
+
+    Only the new fragment is scanned on each feed, so detection stays linear
+    in the length of the arguments; json.loads runs once, when the outermost
+    object closes.
+    """
+
+    __slots__ = ("depth", "in_string", "escaped", "closed")
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.closed = False
+
+    def feed(self, fragment: str) -> bool:
+        """Scan ``fragment``; returns True if the outermost object closed in it."""
+        for char in fragment:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    self.closed = True
+                    return True
+        return False
+
 class ToolCallAccumulator:
     """
     Accumulates streaming tool call chunks into complete tool calls.
@@ -41,11 +81,19 @@ class ToolCallAccumulator:
     
     def __init__(self):
         self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self._scanners: Dict[int, _ArgumentsScanner] = {}
+        self._complete: set = set()
+        
+    def add_chunk(self, delta_tool_calls: List[Dict[str, Any]]) -> List[int]:
+        """
+        Add a chunk of tool call data.
         
-    def add_chunk(self, delta_tool_calls: List[Dict[str, Any]]) -> None:
-        """Add a chunk of tool call data"""
+        Returns:
+            Indices of the tool calls whose arguments became complete JSON in this chunk
+        """
+        completed = []
         if not delta_tool_calls:
-            return
+            return completed
             
         for tc in delta_tool_calls:
             index = tc.get("index", 0)
@@ -63,7 +111,34 @@ class ToolCallAccumulator:
             
             # Accumulate arguments
             if "function" in tc and "arguments" in tc["function"]:
-                self.tool_calls[index]["function"]["arguments"] += tc["function"]["arguments"]
+                fragment = tc["function"]["arguments"] or ""
+                self.tool_calls[index]["function"]["arguments"] += fragment
+                if index not in self._complete and self._check_complete(index, fragment):
+                    completed.append(index)
+        
+        return completed
+    
+    def _check_complete(self, index: int, fragment: str) -> bool:
+        scanner = self._scanners.setdefault(index, _ArgumentsScanner())
+        if scanner.closed or not scanner.feed(fragment):
+            return False
+        tool_call = self.tool_calls[index]
+        if not (tool_call.get("id") and tool_call["function"].get("name")):
+            return False
+        try:
+            json.loads(tool_call["function"]["arguments"])
+        except json.JSONDecodeError:
+            return False
+        self._complete.add(index)
+        return True
+    
+    def is_complete(self, index: int) -> bool:
+        """Whether the arguments of tool call ``index`` are known to be complete JSON"""
+        return index in self._complete
+    
+    def get_tool_call(self, index: int) -> Dict[str, Any]:
+        """Get the accumulated tool call at ``index`` as a raw dictionary"""
+        return self.tool_calls[index]
     
     def get_tool_calls(self) -> List[Dict[str, Any]]:
         """Get the accumulated tool calls as raw dictionaries"""
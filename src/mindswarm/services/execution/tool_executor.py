@@ -0,0 +1,319 @@
+"""
+Concurrent execution of the tool calls from one model turn.
+
+StatelessAILoop hands the parsed tool calls of a turn to the ToolExecutor.
+Each call waits only for the earlier calls it conflicts with, according to the
+ToolConcurrency class its tool declares, so independent calls overlap: a turn
+that reads five files takes as long as the slowest read. Results are returned
+in the original call order.
+
+Async tools run as tasks on the event loop. Sync tools run in a dedicated,
+bounded thread pool so that a workspace scan or command does not block
+streaming for every other session; only tools that declare
+requires_event_loop run on the loop thread. Every call has a timeout, and
+cancelling the turn cancels its pending calls. A sync call that has already
+started cannot be interrupted: its result is discarded and its thread is
+released when it returns.
+
+Read-only calls can be started speculatively while the model is still
+streaming the rest of the turn; StatelessAILoop holds their results until the
+stream finishes and cancels them if it fails.
+
+Key Components:
+- ToolExecutorConfig: Pool size and per-tool timeouts
+- ToolInvocation: A parsed tool call ready to run
+- ToolExecutor: Dependency-ordered concurrent execution with queueing metrics
+- get_tool_executor() / configure_tool_executor(): Singleton access
+
+Configuration (config/main.yaml):
+    tool_execution:
+      max_workers: 8
+      default_timeout: 300
+      tool_timeouts:
+        execute_command: 900
+      speculative_reads: true
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Optional
+
+from ai_whisperer.core.exceptions import ToolTimeoutError
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
+from ai_whisperer.tools.tool_dispatch import get_tool_dispatch
+from ai_whisperer.services.execution.turn_metrics import record_span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolExecutorConfig:
+    """Settings for tool execution."""
+    max_workers: int = 8  # Threads for sync tools
+    default_timeout: Optional[float] = 300.0  # Seconds per call; None disables
+    tool_timeouts: Dict[str, Optional[float]] = field(default_factory=dict)
+    speculative_reads: bool = True  # Start read-only calls before the stream ends
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ToolExecutorConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class ToolInvocation:
+    """A tool call with its tool resolved and arguments parsed."""
+    tool: AITool
+    arguments: Dict[str, Any]
+    keys: List[str] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self.tool.name
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return self.tool.concurrency
+
+
+def _conflicts(earlier: ToolInvocation, later: ToolInvocation) -> bool:
+    """Whether ``later`` has to wait for ``earlier`` to finish."""
+    if ToolConcurrency.EXCLUSIVE in (earlier.concurrency, later.concurrency):
+        return True
+    if earlier.concurrency == later.concurrency == ToolConcurrency.READ_ONLY:
+        return False
+    # A write conflicts with any call on the same path; without known paths, with every call
+    if not earlier.keys or not later.keys:
+        return True
+    return not set(earlier.keys).isdisjoint(later.keys)
+
+
+class ToolExecutor:
+    """Runs the tool calls of a turn concurrently where their tools allow it."""
+
+    def __init__(self, config: Optional[ToolExecutorConfig] = None):
+        self.config = config or ToolExecutorConfig()
+        self._pool = ThreadPoolExecutor(max_workers=self.config.max_workers, thread_name_prefix="tool")
+        self._lock = threading.Lock()  # Stats are updated from worker threads
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "timeouts": 0, "cancelled": 0, "speculative": 0,
+            "queued": 0, "running": 0,
+            "queue_wait_total": 0.0, "queue_wait_max": 0.0,
+            "run_time_total": 0.0, "run_time_max": 0.0,
+        })
+
+    async def execute_all(self, invocations: List[Optional[ToolInvocation]], parallel: bool = True,
+                          started: Optional[Dict[int, asyncio.Future]] = None) -> List[Any]:
+        """
+        Execute ``invocations`` and return their results in the same order.
+
+        None entries are skipped (their result is None). A failed call's entry is
+        the exception it raised. With ``parallel`` False every call waits for the
+        previous one, as for models that expect sequential tool execution.
+        ``started`` maps call indices to calls already running (see speculate()),
+        which are awaited instead of being run again.
+        """
+        tasks: List[Optional[asyncio.Task]] = []
+        scheduled: List[tuple] = []
+        started = started or {}
+        for index, invocation in enumerate(invocations):
+            if invocation is None:
+                tasks.append(None)
+                continue
+            if index in started:
+                task = started[index]
+            else:
+                if parallel:
+                    deps = [task for earlier, task in scheduled if _conflicts(earlier, invocation)]
+                else:
+                    deps = [scheduled[-1][1]] if scheduled else []
+                task = asyncio.ensure_future(self._run_after(deps, invocation))
+            tasks.append(task)
+            scheduled.append((invocation, task))
+
+        running = [task for task in tasks if task is not None]
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        return [task.exception() or task.result() if task is not None else None for task in tasks]
+
+    def speculate(self, invocation: ToolInvocation, earlier: List[Optional[ToolInvocation]]) -> Optional[asyncio.Task]:
+        """
+        Start a call before the model has finished streaming the turn.
+
+        Only READ_ONLY calls whose earlier calls are all known and READ_ONLY
+        are started, so running early cannot observe or race a write from the
+        same turn. Returns the running task, or None if the call has to wait
+        for execute_all(). The caller cancels the task if the turn fails.
+        """
+        if not self.config.speculative_reads:
+            return None
+        if any(call is None or call.concurrency != ToolConcurrency.READ_ONLY for call in [*earlier, invocation]):
+            return None
+        with self._lock:
+            self._stats[invocation.name]["speculative"] += 1
+        logger.info(f"   ⚡ Speculatively starting {invocation.name} while the response streams")
+        return asyncio.ensure_future(self._run_after([], invocation))
+
+    async def _run_after(self, deps: List[asyncio.Task], invocation: ToolInvocation) -> Any:
+        if deps:
+            await asyncio.wait(deps)
+        started = time.perf_counter()
+        result = await self.run(invocation.tool, invocation.arguments)
+        elapsed = time.perf_counter() - started
+        record_span(f"tool:{invocation.name}", elapsed)
+        logger.info(f"   ✅ Tool {invocation.name} completed in {elapsed:.3f}s")
+        return result
+
+    def timeout_for(self, tool_name: str) -> Optional[float]:
+        """Seconds a call to ``tool_name`` may take, or None for no limit."""
+        return self.config.tool_timeouts.get(tool_name, self.config.default_timeout) or None
+
+    async def run(self, tool: AITool, arguments: Dict[str, Any]) -> Any:
+        """
+        Run a single tool call with whichever calling convention the tool supports.
+
+        Raises ToolTimeoutError if the call exceeds its timeout.
+        """
+        name = tool.name
+        timeout = self.timeout_for(name)
+        stats = self._stats[name]
+        with self._lock:
+            stats["calls"] += 1
+
+        is_async = get_tool_dispatch(tool).is_async
+        if is_async:
+            work = _call_async(tool, arguments)
+        elif tool.requires_event_loop:
+            return self._timed(name, time.perf_counter(), functools.partial(_call_sync, tool, arguments))
+        else:
+            with self._lock:
+                stats["queued"] += 1
+            call = functools.partial(self._timed, name, time.perf_counter(),
+                                     functools.partial(_call_sync, tool, arguments))
+            future = self._pool.submit(contextvars.copy_context().run, call)
+            # Cancelling the wrapper cancels the call if it has not started yet
+            work = asyncio.wrap_future(future)
+
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(work, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                stats["timeouts"] += 1
+                self._unqueue_if_cancelled(name, work)
+            raise ToolTimeoutError(f"Tool '{name}' timed out after {timeout:g}s") from None
+        except asyncio.CancelledError:
+            with self._lock:
+                stats["cancelled"] += 1
+                self._unqueue_if_cancelled(name, work)
+            raise
+        except Exception:
+            if is_async:  # Sync tool errors are counted in _timed
+                with self._lock:
+                    stats["errors"] += 1
+            raise
+        if is_async:
+            self._record_run(name, time.perf_counter() - started)
+        return result
+
+    def _timed(self, name: str, submitted: float, call: Callable[[], Any]) -> Any:
+        """Run ``call`` (usually in a worker thread), recording queue wait and run time."""
+        started = time.perf_counter()
+        stats = self._stats[name]
+        with self._lock:
+            if stats["queued"]:
+                stats["queued"] -= 1
+            stats["running"] += 1
+            wait = started - submitted
+            stats["queue_wait_total"] += wait
+            stats["queue_wait_max"] = max(stats["queue_wait_max"], wait)
+        try:
+            return call()
+        except Exception:
+            with self._lock:
+                stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                stats["running"] -= 1
+            self._record_run(name, time.perf_counter() - started)
+
+    def _record_run(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats[name]
+            stats["run_time_total"] += seconds
+            stats["run_time_max"] = max(stats["run_time_max"], seconds)
+
+    def _unqueue_if_cancelled(self, name: str, work: Any) -> None:
+        # A call cancelled before a worker picked it up never reaches _timed
+        if isinstance(work, asyncio.Future) and work.cancelled() and self._stats[name]["queued"]:
+            self._stats[name]["queued"] -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-tool call counts, queue waits and run times for monitoring."""
+        with self._lock:
+            tools = {}
+            for name, stats in self._stats.items():
+                calls = stats["calls"] or 1
+                tools[name] = {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "timeouts": stats["timeouts"],
+                    "cancelled": stats["cancelled"],
+                    "speculative": stats["speculative"],
+                    "queued": stats["queued"],
+                    "running": stats["running"],
+                    "queue_wait_avg_ms": round(stats["queue_wait_total"] / calls * 1000, 2),
+                    "queue_wait_max_ms": round(stats["queue_wait_max"] * 1000, 2),
+                    "run_time_avg_ms": round(stats["run_time_total"] / calls * 1000, 2),
+                    "run_time_max_ms": round(stats["run_time_max"] * 1000, 2),
+                }
+            return {
+                "max_workers": self.config.max_workers,
+                "queued": sum(t["queued"] for t in tools.values()),
+                "running": sum(t["running"] for t in tools.values()),
+                "tools": tools,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the thread pool without waiting for running tools."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _call_async(tool: AITool, arguments: Dict[str, Any]) -> Any:
+    return await get_tool_dispatch(tool).call(tool, arguments)
+
+
+def _call_sync(tool: AITool, arguments: Dict[str, Any]) -> Any:
+    return get_tool_dispatch(tool).call(tool, arguments)
+
+
+# Singleton accessor
+_tool_executor: Optional[ToolExecutor] = None
+
+
+def get_tool_executor() -> ToolExecutor:
+    """Get the process-wide tool executor."""
+    global _tool_executor
+    if _tool_executor is None:
+        _tool_executor = ToolExecutor()
+    return _tool_executor
+
+
+def configure_tool_executor(settings: Optional[Dict[str, Any]]) -> ToolExecutor:
+    """Replace the process-wide tool executor with one built from ``settings``."""
+    global _tool_executor
+    if _tool_executor is not None:
+        _tool_executor.shutdown()
+    _tool_executor = ToolExecutor(ToolExecutorConfig.from_dict(settings))
+    logger.info(f"Tool executor configured: {_tool_executor.config}")
+    return _tool_executor
@@ -0,0 +1,175 @@
+"""
+Per-session memoization of idempotent read-only tool results.
+
+Agents often repeat read_file, get_file_content, list_directory or
+search_files calls with the same arguments within one continuation chain.
+Tools that declare a ToolCachePolicy have their results reused, keyed by tool
+name, canonicalized arguments and the modification times of the files or
+directories the call names, so an edit made outside the session is picked up
+on the next call. Any tool call that is not READ_ONLY clears the cache of its
+session, since it may have changed the workspace.
+
+Each AILoopManager (one per session) owns a ToolResultCache, which it shares
+with the AI loops of the session's agents.
+
+Key Components:
+- ToolResultCacheConfig: Size limits (enabled by default)
+- ToolResultCache: LRU of tool results with per-tool hit statistics
+- get_tool_result_cache_config() / configure_tool_result_cache(): Process-wide settings
+
+Configuration (config/main.yaml):
+    tool_result_cache:
+      enabled: true
+      max_entries: 256
+"""
+
+import copy
+import json
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Tuple
+
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
+from ai_whisperer.utils.path import PathManager
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ToolResultCacheConfig:
+    """Settings for the per-session tool result cache."""
+    enabled: bool = True
+    max_entries: int = 256
+    max_result_chars: int = 512 * 1024  # Larger results are not kept
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'ToolResultCacheConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class ToolResultCache:
+    """LRU cache of tool results for one session."""
+
+    def __init__(self, config: Optional[ToolResultCacheConfig] = None):
+        self.config = config or get_tool_result_cache_config()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key_for(self, tool: AITool, arguments: Dict[str, Any]) -> Optional[Tuple]:
+        """
+        Get the cache key for a call, or None if the call cannot be cached.
+
+        Arguments starting with an underscore (agent context added by the loop)
+        are not part of the key.
+        """
+        policy = tool.cache_policy
+        if not self.config.enabled or policy is None or tool.concurrency != ToolConcurrency.READ_ONLY:
+            return None
+        canonical_args = {k: v for k, v in arguments.items() if not k.startswith("_")}
+        try:
+            canonical = json.dumps(canonical_args, sort_keys=True, separators=(",", ":"), default=str)
+        except (TypeError, ValueError):
+            return None
+        stamps = tuple(self._stamp(canonical_args.get(arg) or policy.default_path) for arg in policy.path_args)
+        return (tool.name, canonical, stamps)
+
+    @staticmethod
+    def _stamp(path: Optional[str]) -> Optional[Tuple[str, int, int]]:
+        """Modification time and size of ``path`` (relative to the workspace), or None if it is missing."""
+        if not isinstance(path, str):
+            return None
+        if not os.path.isabs(path):
+            workspace = PathManager.get_instance().workspace_path
+            if workspace:
+                path = os.path.join(str(workspace), path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (os.path.normpath(path), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, key: Tuple) -> Tuple[bool, Any]:
+        """Look up a result. Returns (hit, result); the result is a copy."""
+        tool_name = key[0]
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at and expires_at < time.time():
+                del self._entries[key]
+            else:
+                self._entries.move_to_end(key)
+                self._stats[tool_name]["hits"] += 1
+                return True, copy.deepcopy(result)
+        self._stats[tool_name]["misses"] += 1
+        return False, None
+
+    def put(self, key: Tuple, tool: AITool, result: Any) -> bool:
+        """Store a successful result. Errors and oversized results are not cached."""
+        if isinstance(result, dict) and (result.get("error") or result.get("success") is False):
+            return False
+        try:
+            size = len(json.dumps(result, default=str))
+        except (TypeError, ValueError):
+            return False
+        if size > self.config.max_result_chars:
+            return False
+        ttl = tool.cache_policy.ttl_seconds
+        self._entries[key] = (time.time() + ttl if ttl else 0.0, copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return True
+
+    def invalidate(self) -> None:
+        """Drop every entry (after a call that may have modified the workspace)."""
+        if self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit rates per tool for monitoring."""
+        hits = sum(s["hits"] for s in self._stats.values())
+        lookups = hits + sum(s["misses"] for s in self._stats.values())
+        tools = {}
+        for name, stats in self._stats.items():
+            tool_lookups = stats["hits"] + stats["misses"]
+            tools[name] = {**stats, "hit_rate": round(stats["hits"] / tool_lookups, 4) if tool_lookups else 0.0}
+        return {
+            "enabled": self.config.enabled,
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "tools": tools,
+        }
+
+
+# Process-wide settings
+_cache_config: Optional[ToolResultCacheConfig] = None
+
+
+def get_tool_result_cache_config() -> ToolResultCacheConfig:
+    """Get the settings used for new session tool result caches."""
+    global _cache_config
+    if _cache_config is None:
+        _cache_config = ToolResultCacheConfig()
+    return _cache_config
+
+
+def configure_tool_result_cache(settings: Optional[Dict[str, Any]]) -> ToolResultCacheConfig:
+    """Replace the settings used for new session tool result caches."""
+    global _cache_config
+    _cache_config = ToolResultCacheConfig.from_dict(settings)
+    logger.info(f"Tool result cache configured: {_cache_config}")
+    return _cache_config
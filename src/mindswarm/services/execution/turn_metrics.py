@@ -0,0 +1,332 @@
+"""
+Per-turn latency breakdown.
+
+A TurnTimer is started for each turn (by StatelessInteractiveSession, or by
+StatelessAgent when it runs outside a session) and is the current timer, a
+context variable, for everything the turn awaits: tasks it starts and tool
+worker threads see it too. Components record spans on the current timer; when
+no turn is being timed, recording is a no-op.
+
+Spans (several per turn are possible, e.g. one per tool call):
+- context: retrieving and fitting the conversation history
+- payload_build: building the request payload
+- payload_encode: encoding the payload into the request body (once per upstream request)
+- queue_wait: waiting for the request scheduler to admit the request
+- ttft: from opening the response stream to its first delta (includes queue_wait)
+- stream: the whole model response stream
+- tool:<name>: each tool call
+- channel_routing: routing responses through the channel system
+- websocket_send: each frame sent (or queued, see outbound_queue) to the client
+- total: the whole turn
+
+Finished turns are aggregated into per-model and per-agent histograms, along
+with their generation speed in tokens per second (estimated from the streamed
+text).
+
+Key Components:
+- TurnTimer: Spans and token counts of one turn
+- turn_timing() / start_turn_timer(): Timing a turn
+- timed_span() / record_span(): Recording spans on the current turn
+- LatencyHistogram: Fixed-bucket histogram with percentile estimates
+- TurnMetrics: Histograms and recent turns; get_turn_metrics() / configure_turn_metrics()
+
+Usage:
+    with turn_timing(session_id=session_id, agent_id="A", model=model):
+        with timed_span("context"):
+            messages = context.retrieve_messages()
+
+Configuration (config/main.yaml):
+    turn_metrics:
+      enabled: true
+      recent_turns: 100
+"""
+
+import bisect
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bucket upper bounds in milliseconds; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000, 120000, 300000)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; percentiles are reported as bucket upper bounds."""
+
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 2) if self.count else 0.0,
+            "p50": round(self.percentile(0.50), 2),
+            "p95": round(self.percentile(0.95), 2),
+            "p99": round(self.percentile(0.99), 2),
+            "max": round(self.max, 2),
+        }
+
+
+class TurnTimer:
+    """Spans recorded during one turn. Safe to record from tool worker threads."""
+
+    def __init__(self, session_id: Optional[str] = None, agent_id: Optional[str] = None,
+                 model: Optional[str] = None):
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.session_id = session_id
+        self.agent_id = agent_id
+        self.model = model
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: Dict[str, List[float]] = defaultdict(list)  # Span name -> durations in seconds
+        self.tokens = 0
+        self.generation_seconds = 0.0  # Streaming time after the first delta
+        self.total_seconds: Optional[float] = None
+        self._context_token = None  # Resets the current timer, see start_turn_timer()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans[name].append(seconds)
+
+    def add_generation(self, tokens: int, seconds: float) -> None:
+        """Count ``tokens`` streamed over ``seconds`` (after the first delta)."""
+        with self._lock:
+            self.tokens += tokens
+            self.generation_seconds += seconds
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if not self.tokens or self.generation_seconds <= 0:
+            return None
+        return self.tokens / self.generation_seconds
+
+    def finish(self) -> None:
+        self.total_seconds = time.perf_counter() - self._started
+        self.record("total", self.total_seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = {
+                name: {
+                    "count": len(durations),
+                    "total_ms": round(sum(durations) * 1000, 2),
+                    "max_ms": round(max(durations) * 1000, 2),
+                }
+                for name, durations in self.spans.items()
+            }
+        tokens_per_second = self.tokens_per_second
+        return {
+            "turn_id": self.turn_id,
+            "session_id": self.session_id,
+            "agent_id": self.agent_id,
+            "model": self.model,
+            "started_at": self.started_at,
+            "total_ms": round(self.total_seconds * 1000, 2) if self.total_seconds is not None else None,
+            "tokens": self.tokens,
+            "tokens_per_second": round(tokens_per_second, 1) if tokens_per_second else None,
+            "spans": spans,
+        }
+
+
+_current_timer: ContextVar[Optional[TurnTimer]] = ContextVar("turn_timer", default=None)
+
+
+def current_turn_timer() -> Optional[TurnTimer]:
+    """The timer of the turn running in this context, if any."""
+    return _current_timer.get()
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Record a span on the current turn (no-op outside a timed turn)."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record(name, seconds)
+
+
+@contextmanager
+def timed_span(name: str):
+    """Time the enclosed code as span ``name`` of the current turn."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.record(name, time.perf_counter() - started)
+
+
+def start_turn_timer(session_id: Optional[str] = None, agent_id: Optional[str] = None,
+                     model: Optional[str] = None) -> Optional[TurnTimer]:
+    """
+    Start timing a turn in the current context; pair with finish_turn_timer().
+
+    Returns None (nothing to finish) inside a turn that is already being timed,
+    which is joined instead, filling in its agent and model if they were
+    unknown, or when turn metrics are disabled.
+    """
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.agent_id = timer.agent_id or agent_id
+        timer.model = timer.model or model
+        return None
+    if not get_turn_metrics().config.enabled:
+        return None
+    timer = TurnTimer(session_id=session_id, agent_id=agent_id, model=model)
+    timer._context_token = _current_timer.set(timer)
+    return timer
+
+
+def finish_turn_timer(timer: Optional[TurnTimer]) -> None:
+    """Stop timing a turn started by start_turn_timer() and record it."""
+    if timer is None:
+        return
+    _current_timer.reset(timer._context_token)
+    timer.finish()
+    get_turn_metrics().record_turn(timer)
+
+
+@contextmanager
+def turn_timing(session_id: Optional[str] = None, agent_id: Optional[str] = None,
+                model: Optional[str] = None):
+    """Time the enclosed code as a turn (or as part of the turn already being timed)."""
+    timer = start_turn_timer(session_id=session_id, agent_id=agent_id, model=model)
+    try:
+        yield timer or _current_timer.get()
+    finally:
+        finish_turn_timer(timer)
+
+
+@dataclass
+class TurnMetricsConfig:
+    """Settings for turn latency metrics."""
+    enabled: bool = True
+    recent_turns: int = 100  # Turn breakdowns kept for inspection
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'TurnMetricsConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class TurnMetrics:
+    """Per-model and per-agent latency histograms of finished turns."""
+
+    def __init__(self, config: Optional[TurnMetricsConfig] = None):
+        self.config = config or TurnMetricsConfig()
+        self._lock = threading.Lock()
+        # (dimension, key, span) -> histogram; dimension is "model" or "agent"
+        self._histograms: Dict[Tuple[str, str, str], LatencyHistogram] = {}
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=self.config.recent_turns)
+        self.turns = 0
+
+    def record_turn(self, timer: TurnTimer) -> None:
+        summary = timer.summary()
+        with timer._lock:
+            spans = {name: list(durations) for name, durations in timer.spans.items()}
+        tokens_per_second = timer.tokens_per_second
+        with self._lock:
+            self.turns += 1
+            self._recent.append(summary)
+            for dimension, key in (("model", timer.model), ("agent", timer.agent_id)):
+                key = key or "unknown"
+                for name, durations in spans.items():
+                    histogram = self._histogram(dimension, key, name, LATENCY_BUCKETS_MS)
+                    for seconds in durations:
+                        histogram.observe(seconds * 1000)
+                if tokens_per_second:
+                    self._histogram(dimension, key, "tokens_per_second",
+                                    TOKENS_PER_SECOND_BUCKETS).observe(tokens_per_second)
+        logger.debug(f"Turn {summary['turn_id']} of {timer.agent_id} ({timer.model}) took {summary['total_ms']}ms")
+
+    def _histogram(self, dimension: str, key: str, name: str, bounds: Sequence[float]) -> LatencyHistogram:
+        histogram = self._histograms.get((dimension, key, name))
+        if histogram is None:
+            histogram = self._histograms[(dimension, key, name)] = LatencyHistogram(bounds)
+        return histogram
+
+    def get_stats(self, model: Optional[str] = None, agent: Optional[str] = None,
+                  session_id: Optional[str] = None, recent: int = 10) -> Dict[str, Any]:
+        """
+        Get span histograms (milliseconds; tokens_per_second as is) per model and
+        per agent, and the breakdowns of the most recent turns. ``model``,
+        ``agent`` (case-insensitive) and ``session_id`` narrow the result.
+        """
+        agent = agent.lower() if agent else None
+        by_model: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        by_agent: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        with self._lock:
+            for (dimension, key, name), histogram in sorted(self._histograms.items()):
+                if dimension == "model" and (model is None or key == model):
+                    by_model[key][name] = histogram.summary()
+                elif dimension == "agent" and (agent is None or key.lower() == agent):
+                    by_agent[key][name] = histogram.summary()
+            turns = [
+                turn for turn in self._recent
+                if (model is None or turn["model"] == model)
+                and (agent is None or (turn["agent_id"] or "").lower() == agent)
+                and (session_id is None or turn["session_id"] == session_id)
+            ]
+        return {
+            "enabled": self.config.enabled,
+            "turns": self.turns,
+            "by_model": dict(by_model),
+            "by_agent": dict(by_agent),
+            "recent_turns": turns[-recent:] if recent > 0 else [],
+        }
+
+
+# Singleton accessor
+_turn_metrics: Optional[TurnMetrics] = None
+
+
+def get_turn_metrics() -> TurnMetrics:
+    """Get the process-wide turn metrics."""
+    global _turn_metrics
+    if _turn_metrics is None:
+        _turn_metrics = TurnMetrics()
+    return _turn_metrics
+
+
+def configure_turn_metrics(settings: Optional[Dict[str, Any]]) -> TurnMetrics:
+    """Replace the process-wide turn metrics with empty metrics built from ``settings``."""
+    global _turn_metrics
+    _turn_metrics = TurnMetrics(TurnMetricsConfig.from_dict(settings))
+    logger.info(f"Turn metrics configured: {_turn_metrics.config}")
+    return _turn_metrics
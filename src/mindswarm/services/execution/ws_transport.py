@@ -0,0 +1,178 @@
+"""
+Negotiated framing of outbound websocket frames.
+
+Every StreamingUpdate partial repeats the JSON-RPC envelope and the whole text
+streamed so far, including the ``analysis`` and ``commentary`` of structured
+responses. A client can negotiate leaner framing with the ``transport.negotiate``
+JSON-RPC method:
+
+- permessage-deflate: Negotiated by the websocket handshake itself when the
+  server allows it (``permessage_deflate``) and the client offers it.
+- encoding "msgpack": Frames are sent as MessagePack binary frames instead of
+  JSON text frames (needs the optional ``msgpack`` package; declined without it).
+  Text frames are always JSON, so clients can decode by frame type.
+- delta: A partial that extends the previous partial of the same agent is sent
+  as a StreamingDelta frame carrying only the new suffix:
+  {"method": "StreamingDelta", "params": {"sessionId", "agentId", "offset",
+  "append", "metadataAppend"?}}. ``offset`` is the length of the text the
+  suffix goes after; a client whose buffer has another length should drop the
+  delta and wait for the next full frame. Channel messages and responses end a
+  stream, so the next partial after them is sent in full.
+
+Clients that do not negotiate keep plain JSON-RPC text frames. Framing applies
+when a frame leaves the connection's OutboundQueue, so deltas are computed
+against what the client actually received after partials were collapsed.
+
+Key Components:
+- WebsocketTransportConfig: Which options clients may negotiate
+- TransportOptions: The options of one connection
+- negotiate_transport(): Accepted options for a client's request
+- FrameEncoder: Encodes the frames of one connection
+- get_ws_transport_config() / configure_ws_transport(): Server-wide settings
+
+Usage:
+    options = negotiate_transport({"encoding": "msgpack", "delta": True})
+    queue.set_encoder(FrameEncoder(options))
+
+Configuration (config/main.yaml):
+    ws_transport:
+      permessage_deflate: true
+      allow_msgpack: true
+      allow_delta: true
+"""
+
+import json
+import logging
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Metadata fields of structured partials that grow like the content does
+DELTA_METADATA_FIELDS = ("analysis", "commentary")
+
+
+@dataclass
+class WebsocketTransportConfig:
+    """Settings for the framing options clients may negotiate."""
+    permessage_deflate: bool = True  # Accept permessage-deflate offered in the handshake
+    allow_msgpack: bool = True
+    allow_delta: bool = True
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> 'WebsocketTransportConfig':
+        """Create config from a dict, ignoring unknown keys."""
+        data = data or {}
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+@dataclass
+class TransportOptions:
+    """Framing options of one connection."""
+    encoding: str = "json"  # "json" or "msgpack"
+    delta: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _msgpack_available() -> bool:
+    try:
+        import msgpack  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def negotiate_transport(requested: Optional[Dict[str, Any]],
+                        config: Optional[WebsocketTransportConfig] = None) -> TransportOptions:
+    """The options to use for a client that requested ``requested``; unsupported ones are declined."""
+    config = config or get_ws_transport_config()
+    requested = requested or {}
+    options = TransportOptions()
+    if requested.get("encoding") == "msgpack":
+        if config.allow_msgpack and _msgpack_available():
+            options.encoding = "msgpack"
+        else:
+            logger.info("Client requested msgpack framing; declined")
+    options.delta = bool(requested.get("delta")) and config.allow_delta
+    return options
+
+
+class FrameEncoder:
+    """Encodes the outbound frames of one connection with its negotiated options."""
+
+    def __init__(self, options: TransportOptions):
+        self.options = options
+        self._packb = None
+        if options.encoding == "msgpack":
+            import msgpack
+            self._packb = msgpack.packb
+        # Last partial sent per (session, agent): content and growing metadata fields
+        self._streams: Dict[Tuple[Any, Any], Dict[str, str]] = {}
+
+    def encode(self, payload: Dict[str, Any]) -> Union[str, bytes]:
+        if self.options.delta:
+            payload = self._delta(payload)
+        if self._packb is not None:
+            return self._packb(payload, use_bin_type=True)
+        return json.dumps(payload)
+
+    def _delta(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        method = payload.get("method")
+        if method != "StreamingUpdate":
+            if method == "ChannelMessageNotification" or "id" in payload:
+                self._streams.clear()  # The stream ended; clients reset their buffers
+            return payload
+        params = payload.get("params") or {}
+        content = params.get("content")
+        if not params.get("isPartial") or not isinstance(content, str):
+            self._streams.clear()
+            return payload
+
+        key = (params.get("sessionId"), params.get("agentId"))
+        metadata = params.get("metadata") or {}
+        current = {"content": content}
+        for name in DELTA_METADATA_FIELDS:
+            if isinstance(metadata.get(name), str):
+                current[name] = metadata[name]
+        previous = self._streams.get(key)
+        self._streams[key] = current
+
+        # Only a pure extension of what the client holds can be sent as a suffix
+        if (previous is None or set(previous) != set(current)
+                or any(not current[name].startswith(previous[name]) for name in current)
+                or set(metadata) - set(DELTA_METADATA_FIELDS)):
+            return payload
+        delta = {
+            "sessionId": params.get("sessionId"),
+            "agentId": params.get("agentId"),
+            "offset": len(previous["content"]),
+            "append": content[len(previous["content"]):],
+        }
+        metadata_append = {name: current[name][len(previous[name]):] for name in DELTA_METADATA_FIELDS
+                           if name in current and len(current[name]) > len(previous[name])}
+        if metadata_append:
+            delta["metadataAppend"] = metadata_append
+        return {"method": "StreamingDelta", "params": delta}
+
+
+# Server-wide settings
+_transport_config: Optional[WebsocketTransportConfig] = None
+
+
+def get_ws_transport_config() -> WebsocketTransportConfig:
+    """Get the framing options clients may negotiate."""
+    global _transport_config
+    if _transport_config is None:
+        _transport_config = WebsocketTransportConfig()
+    return _transport_config
+
+
+def configure_ws_transport(settings: Optional[Dict[str, Any]]) -> WebsocketTransportConfig:
+    """Replace the framing options clients may negotiate."""
+    global _transport_config
+    _transport_config = WebsocketTransportConfig.from_dict(settings)
+    logger.info(f"Websocket transport configured: {_transport_config}")
+    return _transport_config
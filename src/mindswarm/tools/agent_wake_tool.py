@@ -14,6 +14,11 @@ class AgentWakeTool(AITool):
     def name(self) -> str:
         """Return the tool name."""
         return "agent_wake"
+
+    @property
+    def requires_event_loop(self) -> bool:
+        """Schedules work on the running event loop, so it cannot run in a worker thread."""
+        return True
     
     @property    
     def description(self) -> str:
@@ -9,6 +9,7 @@ import logging
 from typing import Dict, List, Any, Optional
 
 from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.services.execution.turn_metrics import get_turn_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +78,8 @@ Use this tool to inspect which AI models are being used by different agents in t
 - Temperature and token settings
 - Which agents use custom vs default configurations
 - Current active agent in the session
+- Tool result cache hit rates (repeated read-only tool calls served from cache)
+- Latency of recent turns: time to first token, streaming, tool calls and websocket sends
 
 This tool is essential for verifying that per-agent AI loops are working correctly.
 """
@@ -148,6 +151,18 @@ This tool is essential for verifying that per-agent AI loops are working correct
                 "inspected": True
             }
             
+            # Tool result cache hit rates for the session
+            tool_result_cache = getattr(ai_loop_manager, 'tool_result_cache', None)
+            if tool_result_cache is not None:
+                result["tool_result_cache"] = tool_result_cache.get_stats()
+            
+            # Latency breakdown of the session's recent turns
+            result["latency"] = get_turn_metrics().get_stats(
+                agent=agent_id,
+                session_id=getattr(session, 'session_id', None),
+                recent=5,
+            )
+            
             # If specific agent requested
             if agent_id:
                 agent_id = agent_id.upper()
@@ -27,7 +27,7 @@ from typing import Any, Dict, List
 
 import json
 import logging
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ..extensions.agents.task_decomposer import TaskDecomposer
 from ..extensions.agents.agent_e_exceptions import DependencyCycleError
 
@@ -43,6 +43,10 @@ class AnalyzeDependenciesTool(AITool):
     @property
     def name(self) -> str:
         return "analyze_dependencies"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
     
     @property
     def description(self) -> str:
@@ -29,7 +29,7 @@ import json
 from pathlib import Path
 from collections import defaultdict
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -152,6 +152,10 @@ class AnalyzeLanguagesTool(AITool):
     @property
     def name(self) -> str:
         return "analyze_languages"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
     
     @property
     def description(self) -> str:
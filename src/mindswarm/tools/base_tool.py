@@ -8,6 +8,8 @@ integrates with the OpenRouter API for AI model interactions.
 
 Key Components:
 - AITool: 
+- ToolConcurrency: Side-effect classes used to run tool calls concurrently
+- ToolCachePolicy: Opt-in memoization of idempotent read-only tools
 
 Usage:
     tool = AITool()
@@ -21,8 +23,41 @@ Related:
 
 """
 
+import os
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+
+
+class ToolConcurrency(str, Enum):
+    """
+    Side-effect class of a tool, used when several tool calls from one turn
+    are executed concurrently.
+
+    READ_ONLY calls run alongside anything except EXCLUSIVE calls and writes to
+    the same path. WORKSPACE_WRITE calls are serialized with other calls on the
+    same paths. EXCLUSIVE calls run alone.
+    """
+    READ_ONLY = "read_only"
+    WORKSPACE_WRITE = "workspace_write"
+    EXCLUSIVE = "exclusive"
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """
+    Declares that a READ_ONLY tool's results may be reused within a session.
+
+    Results are keyed by the tool name, the canonicalized arguments and the
+    modification times of the files or directories named by ``path_args``
+    (``default_path`` when the argument is omitted). Results that also depend
+    on files not named in the arguments should set ``ttl_seconds``.
+    """
+    path_args: Tuple[str, ...] = ("path",)
+    default_path: Optional[str] = None
+    ttl_seconds: Optional[float] = None
+
 
 class AITool(ABC):
     """
@@ -73,6 +108,39 @@ class AITool(ABC):
         """
         return []
 
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        """
+        The side-effect class of the tool. Defaults to EXCLUSIVE, so a tool
+        only runs concurrently with other calls once it opts in.
+        """
+        return ToolConcurrency.EXCLUSIVE
+
+    @property
+    def requires_event_loop(self) -> bool:
+        """
+        Whether a synchronous execute() has to run on the event loop thread (for
+        example because it schedules tasks on the running loop). Other sync
+        tools run in the tool executor's thread pool.
+        """
+        return False
+
+    @property
+    def cache_policy(self) -> Optional[ToolCachePolicy]:
+        """
+        How results of this tool may be memoized per session, or None (the
+        default) if every call has to run.
+        """
+        return None
+
+    def concurrency_keys(self, arguments: Dict[str, Any]) -> List[str]:
+        """
+        The workspace paths a call touches, used to serialize writes to the same
+        path. Defaults to the normalized 'path' argument, if any.
+        """
+        path = arguments.get("path")
+        return [os.path.normpath(path)] if isinstance(path, str) and path else []
+
     def get_openrouter_tool_definition(self) -> Dict[str, Any]:
         """
         Generates the tool definition in a format compatible with the Openrouter API
@@ -20,12 +20,15 @@ Dependencies:
 
 """
 
+import os
+import signal
 import subprocess
 import logging
 import sys
 from typing import Dict, Any, Optional, List
 
 from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.services.execution.cancellation import current_cancellation_token
 import threading # Import threading for Event
 
 logger = logging.getLogger(__name__)
@@ -78,6 +81,20 @@ class ExecuteCommandTool(AITool):
         Returns: A dictionary with 'stdout', 'stderr', and 'returncode'.
         """
 
+    @staticmethod
+    def _terminate(process: subprocess.Popen) -> None:
+        """Terminate a running command (and, on Windows, its process tree)."""
+        if process.poll() is not None:
+            return
+        try:
+            if sys.platform == "win32":
+                subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+            else:
+                os.killpg(process.pid, signal.SIGTERM)
+            logger.info(f"Terminated command (pid {process.pid}) of a cancelled turn")
+        except Exception as e:
+            logger.error(f"Error terminating cancelled command: {e}")
+
     def execute(self, command: str, cwd: str = ".", shutdown_event: Optional[threading.Event] = None, **kwargs) -> Dict[str, Any]:
         """
         Executes a shell command and returns the output, error, and return code.
@@ -92,6 +109,7 @@ class ExecuteCommandTool(AITool):
         stdout_output = ""
         stderr_output = ""
         returncode = None
+        remove_cancel_callback = None
 
         try:
             # Use Popen for non-blocking execution and polling
@@ -102,9 +120,17 @@ class ExecuteCommandTool(AITool):
                 stderr=subprocess.PIPE,
                 text=True, # Capture stdout/stderr as text
                 cwd=cwd,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0 # Allows sending Ctrl+C on Windows
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == "win32" else 0, # Allows sending Ctrl+C on Windows
+                start_new_session=sys.platform != "win32" # Own process group, so cancellation reaches the shell's children
             )
 
+            # Stop the command as soon as its turn is cancelled; the polling loop
+            # below may be blocked reading output and would only notice later
+            token = current_cancellation_token()
+            if token is not None:
+                shutdown_event = shutdown_event or token.event
+                remove_cancel_callback = token.add_callback(lambda: self._terminate(process))
+
             # Poll the process and check for shutdown event
             while process.poll() is None:
                 if shutdown_event and shutdown_event.is_set():
@@ -177,6 +203,8 @@ class ExecuteCommandTool(AITool):
                 "returncode": 1 # Generic error code
             }
         finally:
+            if remove_cancel_callback:
+                remove_cancel_callback()
             # Ensure process is cleaned up if it was started
             if process and process.poll() is None:
                  try:
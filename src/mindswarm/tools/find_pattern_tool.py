@@ -29,7 +29,7 @@ import re
 import logging
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -49,6 +49,10 @@ class FindPatternTool(AITool):
     @property
     def name(self) -> str:
         return "find_pattern"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
         
     @property
     def description(self) -> str:
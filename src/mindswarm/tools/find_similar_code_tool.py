@@ -28,7 +28,7 @@ from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 from collections import defaultdict
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -161,6 +161,10 @@ class FindSimilarCodeTool(AITool):
     @property
     def name(self) -> str:
         return "find_similar_code"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
     
     @property
     def description(self) -> str:
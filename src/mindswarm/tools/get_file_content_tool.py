@@ -28,7 +28,7 @@ import logging
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolCachePolicy, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 from ai_whisperer.core.exceptions import FileRestrictionError
 
@@ -41,6 +41,14 @@ class GetFileContentTool(AITool):
     @property
     def name(self) -> str:
         return "get_file_content"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
+
+    @property
+    def cache_policy(self) -> ToolCachePolicy:
+        return ToolCachePolicy()
     
     @property
     def description(self) -> str:
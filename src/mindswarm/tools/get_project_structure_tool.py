@@ -28,7 +28,7 @@ import logging
 from pathlib import Path
 from collections import defaultdict
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -174,6 +174,10 @@ class GetProjectStructureTool(AITool):
     @property
     def name(self) -> str:
         return "get_project_structure"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
     
     @property
     def description(self) -> str:
@@ -5,7 +5,7 @@ import logging
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
-from ai_whisperer.tools.base_tool import AITool as BaseTool
+from ai_whisperer.tools.base_tool import AITool as BaseTool, ToolCachePolicy, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 from ai_whisperer.core.exceptions import FileRestrictionError
 
@@ -18,6 +18,15 @@ class ListDirectoryTool(BaseTool):
     @property
     def name(self) -> str:
         return "list_directory"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
+
+    @property
+    def cache_policy(self) -> ToolCachePolicy:
+        # Recursive listings also depend on subdirectories, so entries expire
+        return ToolCachePolicy(default_path=".", ttl_seconds=30.0)
     
     @property
     def description(self) -> str:
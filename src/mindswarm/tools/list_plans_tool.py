@@ -26,7 +26,7 @@ import json
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -37,6 +37,10 @@ class ListPlansTool(AITool):
     @property
     def name(self) -> str:
         return "list_plans"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
     
     @property
     def description(self) -> str:
@@ -113,6 +113,10 @@ class MessageInjectorTool(AITool):
     @property
     def name(self) -> str:
         return "message_injector"
+
+    @property
+    def requires_event_loop(self) -> bool:
+        return True
     
     @property
     def description(self) -> str:
@@ -4,7 +4,7 @@ import logging
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolCachePolicy, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 from ai_whisperer.core.exceptions import FileRestrictionError
 
@@ -18,6 +18,14 @@ class ReadFileTool(AITool):
     def name(self) -> str:
         return 'read_file'
 
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
+
+    @property
+    def cache_policy(self) -> ToolCachePolicy:
+        return ToolCachePolicy()
+
     @property
     def description(self) -> str:
         return 'Reads the content of a specified file within the workspace directory.'
@@ -27,7 +27,7 @@ import json
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -38,6 +38,10 @@ class ReadRFCTool(AITool):
     @property
     def name(self) -> str:
         return "read_rfc"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
     
     @property
     def description(self) -> str:
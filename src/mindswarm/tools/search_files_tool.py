@@ -30,7 +30,7 @@ import logging
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolCachePolicy, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 from ai_whisperer.core.exceptions import FileRestrictionError
 
@@ -43,6 +43,15 @@ class SearchFilesTool(AITool):
     @property
     def name(self) -> str:
         return "search_files"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
+
+    @property
+    def cache_policy(self) -> ToolCachePolicy:
+        # Searches depend on every file in the workspace, so entries expire
+        return ToolCachePolicy(path_args=(), ttl_seconds=30.0)
     
     @property
     def description(self) -> str:
@@ -0,0 +1,204 @@
+"""
+Signature-based dispatch and argument validation for tool calls.
+
+Tools implement execute() with one of two calling conventions: a single
+``arguments`` dict (RFC tools, read_file) or keyword arguments (write_file,
+execute_command). Callers used to try ``execute(arguments=...)`` and fall back
+to ``execute(**arguments)`` on TypeError, which also re-ran tools whose own
+body raised a TypeError. Arguments were never checked against
+parameters_schema, so a malformed call only failed inside the tool.
+
+ToolDispatch inspects a tool's execute() signature and compiles a jsonschema
+validator for its parameters once, when the tool is registered. Model-supplied
+arguments are coerced where the intent is unambiguous (``"10"`` for an
+integer, ``"true"`` for a boolean, a JSON-encoded array) and then validated;
+invalid calls fail with a ToolArgumentError listing every problem, which is
+returned to the model instead of running the tool.
+
+Arguments starting with an underscore (agent context added by the loop) are
+not validated, and are dropped for keyword tools that cannot accept them.
+
+Key Components:
+- ToolCallingConvention: How execute() takes its arguments
+- ToolDispatch: Compiled signature and validator of one tool
+- get_tool_dispatch(): Cached ToolDispatch for a tool instance
+
+Usage:
+    dispatch = get_tool_dispatch(tool)
+    arguments = dispatch.prepare(arguments)  # Raises ToolArgumentError
+    result = dispatch.call(tool, arguments)  # Await it for async tools
+"""
+
+import inspect
+import json
+import logging
+import re
+import weakref
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Optional
+
+import jsonschema
+
+from ai_whisperer.core.exceptions import ToolArgumentError
+from ai_whisperer.tools.base_tool import AITool
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 10
+_INTEGER = re.compile(r"^[+-]?\d+$")
+
+
+class ToolCallingConvention(str, Enum):
+    """How a tool's execute() receives its arguments."""
+    ARGUMENTS = "arguments"  # execute(arguments={...})
+    KEYWORDS = "keywords"  # execute(**arguments)
+
+
+@dataclass
+class ToolDispatch:
+    """The calling convention and argument validator of one tool."""
+    tool_name: str
+    convention: ToolCallingConvention
+    is_async: bool
+    accepts_var_kwargs: bool = True
+    parameters: FrozenSet[str] = frozenset()  # Named keyword parameters of execute()
+    required_parameters: FrozenSet[str] = frozenset()  # Keyword parameters without a default
+    schema: Dict[str, Any] = field(default_factory=dict)
+    validator: Optional[Any] = None  # Compiled jsonschema validator, None if the schema is invalid
+
+    @classmethod
+    def compile(cls, tool: AITool) -> 'ToolDispatch':
+        """Inspect ``tool.execute`` and compile the validator for its parameters_schema."""
+        name = tool.name
+        try:
+            signature = inspect.signature(tool.execute)
+        except (TypeError, ValueError):
+            signature = None
+
+        convention = ToolCallingConvention.KEYWORDS
+        accepts_var_kwargs = True
+        parameters: FrozenSet[str] = frozenset()
+        required: FrozenSet[str] = frozenset()
+        if signature is not None:
+            params = signature.parameters
+            if "arguments" in params:
+                convention = ToolCallingConvention.ARGUMENTS
+            accepts_var_kwargs = any(p.kind is inspect.Parameter.VAR_KEYWORD for p in params.values())
+            named = [p for p in params.values()
+                     if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)]
+            parameters = frozenset(p.name for p in named)
+            required = frozenset(p.name for p in named if p.default is inspect.Parameter.empty)
+
+        schema = tool.parameters_schema or {}
+        validator = None
+        try:
+            validator_class = jsonschema.validators.validator_for(schema, default=jsonschema.Draft7Validator)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema)
+        except jsonschema.SchemaError as e:
+            logger.warning(f"Tool '{name}' has an invalid parameters_schema, arguments are not validated: {e.message}")
+
+        return cls(
+            tool_name=name,
+            convention=convention,
+            is_async=inspect.iscoroutinefunction(tool.execute),
+            accepts_var_kwargs=accepts_var_kwargs,
+            parameters=parameters,
+            required_parameters=required,
+            schema=schema,
+            validator=validator,
+        )
+
+    def prepare(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Coerce and validate the arguments of a call.
+
+        Returns a new dict with coerced values; context arguments (``_`` keys)
+        are passed through unchanged. Raises ToolArgumentError if the arguments
+        do not match the tool's parameters.
+        """
+        if not isinstance(arguments, dict):
+            raise ToolArgumentError(self.tool_name, [{
+                "path": "(root)", "message": f"arguments must be a JSON object, got {type(arguments).__name__}",
+            }])
+        supplied = {k: v for k, v in arguments.items() if not k.startswith("_")}
+        supplied = _coerce(supplied, self.schema)
+
+        errors = []
+        if self.validator is not None:
+            for error in sorted(self.validator.iter_errors(supplied), key=lambda e: list(e.absolute_path)):
+                errors.append({
+                    "path": "/".join(str(part) for part in error.absolute_path) or "(root)",
+                    "message": error.message,
+                })
+        if self.convention is ToolCallingConvention.KEYWORDS:
+            if not self.accepts_var_kwargs:
+                for key in sorted(set(supplied) - self.parameters):
+                    errors.append({"path": key, "message": f"unexpected argument '{key}'"})
+            for key in sorted(self.required_parameters - set(supplied)):
+                if not any(e["message"].startswith(f"'{key}' is a required property") for e in errors):
+                    errors.append({"path": "(root)", "message": f"'{key}' is a required property"})
+        if errors:
+            raise ToolArgumentError(self.tool_name, errors[:MAX_REPORTED_ERRORS])
+
+        return {**arguments, **supplied}
+
+    def call(self, tool: AITool, arguments: Dict[str, Any]) -> Any:
+        """Invoke ``tool.execute`` with its calling convention (returns a coroutine for async tools)."""
+        if self.convention is ToolCallingConvention.ARGUMENTS:
+            return tool.execute(arguments=arguments)
+        if not self.accepts_var_kwargs:
+            arguments = {k: v for k, v in arguments.items() if k in self.parameters}
+        return tool.execute(**arguments)
+
+
+def _coerce(value: Any, schema: Dict[str, Any]) -> Any:
+    """Convert ``value`` to the type ``schema`` expects when the conversion is unambiguous."""
+    if not isinstance(schema, dict):
+        return value
+    expected = schema.get("type")
+    types = expected if isinstance(expected, list) else [expected] if expected else []
+
+    if isinstance(value, str) and types and "string" not in types:
+        text = value.strip()
+        if "integer" in types and _INTEGER.match(text):
+            return int(text)
+        if "number" in types:
+            try:
+                return float(text)
+            except ValueError:
+                pass
+        if "boolean" in types and text.lower() in ("true", "false"):
+            return text.lower() == "true"
+        if ("array" in types and text.startswith("[")) or ("object" in types and text.startswith("{")):
+            try:
+                value = json.loads(text)
+            except json.JSONDecodeError:
+                return value
+    elif "string" in types and isinstance(value, (int, float)) and not isinstance(value, bool) \
+            and not {"integer", "number"} & set(types):
+        return str(value)
+
+    if isinstance(value, dict) and isinstance(schema.get("properties"), dict):
+        properties = schema["properties"]
+        return {k: _coerce(v, properties[k]) if k in properties else v for k, v in value.items()}
+    if isinstance(value, list) and isinstance(schema.get("items"), dict):
+        return [_coerce(item, schema["items"]) for item in value]
+    return value
+
+
+# Compiled dispatch per tool instance; tools are registered once and live for the process
+_dispatches: "weakref.WeakKeyDictionary[AITool, ToolDispatch]" = weakref.WeakKeyDictionary()
+
+
+def get_tool_dispatch(tool: AITool) -> ToolDispatch:
+    """Get the compiled ToolDispatch of ``tool``, compiling it on first use."""
+    try:
+        dispatch = _dispatches.get(tool)
+    except TypeError:  # Unhashable tool instance, compile per call
+        return ToolDispatch.compile(tool)
+    if dispatch is None:
+        dispatch = ToolDispatch.compile(tool)
+        _dispatches[tool] = dispatch
+    return dispatch
@@ -5,8 +5,10 @@ This replaces the original tool_registry.py with on-demand loading.
 
 import logging
 import importlib
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
+from ai_whisperer.services.ai.tool_calling import EncodedToolDefinitions
 from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.tool_dispatch import get_tool_dispatch
 from ai_whisperer.tools.tool_set import ToolSetManager
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,9 @@ class LazyToolRegistry:
         self._loaded_tools: Set[str] = set()
         self._tool_set_manager = ToolSetManager()
         self._path_manager = None
+        # Bumped whenever the set of loaded tools changes; keys the encoded definition cache
+        self._version = 0
+        self._encoded_definitions: Dict[Tuple, EncodedToolDefinitions] = {}
         self._initialized = True
         
         # Initialize tool specifications (without importing)
@@ -392,9 +397,11 @@ class LazyToolRegistry:
             # Create instance
             tool = tool_class()
             
-            # Register it
+            # Register it, compiling its dispatch and argument validator up front
+            get_tool_dispatch(tool)
             self._registered_tools[tool_name] = tool
             self._loaded_tools.add(tool_name)
+            self._bump_version()
             
             logger.debug(f"Lazy loaded tool '{tool_name}' from {spec['module']}")
             return tool
@@ -406,8 +413,10 @@ class LazyToolRegistry:
     def register_tool(self, tool: AITool) -> None:
         """Register a tool instance."""
         tool_name = tool.name
+        get_tool_dispatch(tool)  # Inspect the calling convention and compile the validator once
         self._registered_tools[tool_name] = tool
         self._loaded_tools.add(tool_name)
+        self._bump_version()
         logger.debug(f"Registered tool: {tool_name}")
     
     def get_tool(self, name: str) -> Optional[AITool]:
@@ -515,6 +524,7 @@ class LazyToolRegistry:
         if tool_name in self._registered_tools:
             del self._registered_tools[tool_name]
             self._loaded_tools.discard(tool_name)
+            self._bump_version()
             logger.info(f"Tool '{tool_name}' unregistered successfully.")
         else:
             logger.warning(f"Tool '{tool_name}' not found in registry.")
@@ -523,6 +533,7 @@ class LazyToolRegistry:
         """Clears all registered tools."""
         self._registered_tools.clear()
         self._loaded_tools.clear()
+        self._bump_version()
         logger.info("All registered tools have been cleared.")
     
     def get_tool_by_name(self, name: str) -> Optional[AITool]:
@@ -532,8 +543,49 @@ class LazyToolRegistry:
     def get_all_tool_definitions(self) -> List[Dict[str, Any]]:
         """
         Returns a list of Openrouter-compatible JSON definitions for all tools.
+
+        The list is cached until the registry changes and must not be modified.
+        """
+        key = ("all",)
+        cached = self._encoded_definitions.get((self._version, key))
+        if cached is None:
+            tools = sorted(self.get_all_tools().values(), key=lambda tool: tool.name)
+            cached = self._store_encoded_definitions(key, tools)
+        return cached
+
+    def get_encoded_tool_definitions(self, tool_sets: Optional[List[str]] = None,
+                                     tags: Optional[List[str]] = None,
+                                     allow_tools: Optional[List[str]] = None,
+                                     deny_tools: Optional[List[str]] = None) -> EncodedToolDefinitions:
+        """Get the pre-encoded tool definitions for an agent's tool configuration.
+
+        Takes the same arguments as get_tools_for_agent(). Results are cached per
+        configuration until a tool is registered, loaded or unregistered, so the
+        definitions are built and JSON-encoded once rather than on every turn.
+        Tools are ordered by name so the encoding is stable.
         """
-        return [tool.get_openrouter_tool_definition() for tool in self.get_all_tools().values()]
+        key = tuple(tuple(sorted(value)) if value else () for value in (tool_sets, tags, allow_tools, deny_tools))
+        cached = self._encoded_definitions.get((self._version, key))
+        if cached is None:
+            tools = sorted(self.get_tools_for_agent(tool_sets, tags, allow_tools, deny_tools),
+                           key=lambda tool: tool.name)
+            cached = self._store_encoded_definitions(key, tools)
+        return cached
+
+    def _store_encoded_definitions(self, key: Tuple, tools: List[AITool]) -> EncodedToolDefinitions:
+        encoded = EncodedToolDefinitions([tool.get_openrouter_tool_definition() for tool in tools])
+        # Building may lazily load tools, so store under the version as it is now
+        self._encoded_definitions[(self._version, key)] = encoded
+        return encoded
+
+    @property
+    def version(self) -> int:
+        """Changes whenever the loaded tools or the tool sets change."""
+        return self._version
+
+    def _bump_version(self) -> None:
+        self._version += 1
+        self._encoded_definitions.clear()
     
     def get_filtered_tools(self, criteria: Dict[str, Any]) -> List[AITool]:
         """
@@ -580,6 +632,7 @@ class LazyToolRegistry:
             config_path: Path to tool_sets.yaml file. If None, uses default location.
         """
         self._tool_set_manager = ToolSetManager(config_path)
+        self._bump_version()  # Filtered definitions depend on the tool sets
         logger.info("Tool set manager initialized")
     
     def get_tool_set_manager(self) -> Optional[ToolSetManager]:
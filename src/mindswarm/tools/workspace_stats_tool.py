@@ -26,7 +26,7 @@ import logging
 from pathlib import Path
 from collections import defaultdict
 import time
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 from ai_whisperer.utils.path import PathManager
 
 logger = logging.getLogger(__name__)
@@ -45,6 +45,10 @@ class WorkspaceStatsTool(AITool):
     @property
     def name(self) -> str:
         return "workspace_stats"
+
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.READ_ONLY
         
     @property
     def description(self) -> str:
@@ -25,7 +25,7 @@ import logging
 import pathlib
 from typing import Any, Dict, Optional, List
 
-from ai_whisperer.tools.base_tool import AITool
+from ai_whisperer.tools.base_tool import AITool, ToolConcurrency
 # Delegate system removed
 from ai_whisperer.utils.path import PathManager
 from ai_whisperer.core.exceptions import FileRestrictionError
@@ -37,6 +37,10 @@ class WriteFileTool(AITool):
     def name(self) -> str:
         return "write_file"
 
+    @property
+    def concurrency(self) -> ToolConcurrency:
+        return ToolConcurrency.WORKSPACE_WRITE
+
     @property
     def description(self) -> str:
         return "Writes content to a specified file path within the output directory. Overwrites the file if it exists. Creates parent directories if they do not exist."